@@ -0,0 +1,87 @@
+"""Profile a single request of a staff user with cProfile.
+
+A staff user adds the X-Profile header or the _profile query parameter to a request; it then runs under cProfile
+and leaves two files in PROFILING_DIR, tagged with the URL name and the view class: a .prof file for pstats or
+snakeviz and a .collapsed file with folded stacks for flamegraph tools. Without PROFILING_DIR (the default) the
+middleware removes itself from the stack, so other requests do not pass through it at all.
+"""
+import cProfile
+import os
+import pstats
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAMETER = '_profile'
+MAX_DEPTH = 200
+# Folded stacks below this many microseconds are left out of the .collapsed file.
+MIN_MICROSECONDS = 1
+
+
+def _frame(function):
+    filename, line, name = function
+    return '{}:{}:{}'.format(filename, line, name).replace(';', ',')
+
+
+def collapsed_stacks(stats):
+    """Folded stacks ("frame;frame;frame microseconds") reconstructed from the caller edges of a profile.
+
+    cProfile keeps callers, not full stacks, so the time of a function is divided over the paths to it in
+    proportion to the cumulative time of each caller edge.
+    """
+    callees = {}
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((function, cumulative))
+    roots = [function for function, (_, _, _, _, callers) in stats.stats.items() if set(callers) <= {function}]
+    lines = []
+
+    def visit(function, path, share):
+        _, _, total_time, cumulative_time, _ = stats.stats[function]
+        path = path + [_frame(function)]
+        own = int(total_time * share * 1e6)
+        if own >= MIN_MICROSECONDS:
+            lines.append('{} {}'.format(';'.join(path), own))
+        if len(path) >= MAX_DEPTH:
+            return
+        for callee, cumulative in callees.get(function, []):
+            callee_cumulative = stats.stats[callee][3]
+            callee_share = share * cumulative / callee_cumulative if callee_cumulative else 0
+            # Recursion is folded into the first occurrence of the function on the path.
+            if callee_share * callee_cumulative * 1e6 >= MIN_MICROSECONDS and _frame(callee) not in path:
+                visit(callee, path, callee_share)
+
+    for root in roots:
+        visit(root, [], 1)
+    return lines
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (HEADER in request.META or QUERY_PARAMETER in request.GET) or not request.user.is_staff:
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        response = profile.runcall(self.get_response, request)
+        name = self.write(profile, request)
+        response['X-Profile'] = name
+        return response
+
+    def write(self, profile, request):
+        match = request.resolver_match
+        view = match and getattr(match.func, 'view_class', match.func)
+        name = '{}-{}-{}-{}'.format(time.strftime('%Y%m%d-%H%M%S'), os.getpid(),
+                                    match.url_name if match and match.url_name else 'unknown',
+                                    view.__name__ if view else 'unknown')
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILING_DIR, name)
+        profile.dump_stats(path + '.prof')
+        with open(path + '.collapsed', 'w') as collapsed:
+            collapsed.writelines(line + '\n' for line in collapsed_stacks(pstats.Stats(profile)))
+        return name
@@ -1,8 +1,5 @@
 import os
-import sys
-
-
-IS_TEST = sys.argv[1] == 'test'
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -41,6 +38,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'absence.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -100,10 +98,6 @@ def csp(items=None):
     return csp_result
 
 
-if IS_TEST:
-    INSTALLED_APPS.remove('debug_toolbar')
-    MIDDLEWARE.remove('debug_toolbar.middleware.DebugToolbarMiddleware')
-
 ROOT_URLCONF = 'absence.urls'
 
 TEMPLATES = [
@@ -176,11 +170,44 @@ STATICFILES_DIRS = [
 
 LOGIN_REDIRECT_URL = 'index'
 
+# Refuse leave registrations that would make the remaining hours negative
+LEAVE_PREVENT_OVERDRAW = False
+
+# Yearly leave hours of a full-time contract under the collective agreement, for pro-rata entitlements
+FULL_TIME_HOURS_PER_WEEK = 40
+FULL_TIME_LEAVE_HOURS = 200
+
+# Warn when a registration brings more than this percentage of a group's members out on one day; per group name
+# overrides go in ABSENCE_THRESHOLD_PERCENTAGES. Groups smaller than ABSENCE_THRESHOLD_MIN_MEMBERS are not checked.
+ABSENCE_THRESHOLD_PERCENTAGE = 30
+ABSENCE_THRESHOLD_PERCENTAGES = {}
+ABSENCE_THRESHOLD_MIN_MEMBERS = 5
+
+# Where requests profiled by staff (X-Profile header or ?_profile) are written; None, the default, disables
+# profiling entirely. Set ABSENCE_PROFILING_DIR in the environment to enable it.
+PROFILING_DIR = os.environ.get('ABSENCE_PROFILING_DIR') or None
+
+# Build the URL resolver and compile the templates when absence.wsgi is imported (see absence.warmup). Off with
+# DEBUG, so the autoreloading development server restarts quickly; ABSENCE_WARM_UP=1 or ABSENCE_WARM_UP=0 in the
+# environment overrides the default. A settings_local that changes DEBUG should set WARM_UP_WORKERS as well.
+WARM_UP_WORKERS = os.environ.get('ABSENCE_WARM_UP', '0' if DEBUG else '1') != '0'
+
+# Server-sent balance changes of the admin overview. Every open overview holds a worker for up to
+# BALANCE_CHANGES_TIMEOUT seconds, so serve these requests from threaded (gunicorn --threads, uwsgi --enable-threads
+# with threads) or async workers; on a small pool of sync workers a few open tabs take up every worker. The ledger
+# is read every BALANCE_CHANGES_POLL_INTERVAL seconds, and clients reconnect no sooner than that.
+BALANCE_CHANGES_TIMEOUT = 55
+BALANCE_CHANGES_POLL_INTERVAL = 15
+
+# Memory-mapped balance snapshots shared by all worker processes on this host; the version is kept in the database
+BALANCE_SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), 'absence-balances')
+
 
 try:
     from .settings_local import *
 except ImportError as e:
-    print("Importing local_settings.py causes exception: " + str(e))
+    if e.name != 'absence.settings_local':
+        print("Importing local_settings.py causes exception: " + str(e))
 
 
 CSP_TARGETS = {
@@ -0,0 +1,59 @@
+"""Preload a worker before it serves requests.
+
+Call warm_up() in the process that forks the workers (gunicorn --preload imports absence.wsgi there), so the URL
+resolver and the compiled templates are built once and shared copy-on-write by every worker.
+"""
+import gc
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.template import engines
+from django.urls import URLPattern, URLResolver, get_resolver
+
+
+def _compile_patterns(resolver):
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            count += _compile_patterns(pattern)
+        elif isinstance(pattern, URLPattern):
+            count += 1
+    return count
+
+
+def resolve_urls():
+    resolver = get_resolver()
+    # Building the reverse lookup tables is what the first reverse() or {% url %} call would otherwise pay for.
+    resolver.reverse_dict
+    return _compile_patterns(resolver)
+
+
+def template_names():
+    directories = [directory for template in settings.TEMPLATES for directory in template['DIRS']]
+    directories += [os.path.join(app.path, 'templates') for app in apps.get_app_configs()
+                    if app.path.startswith(settings.BASE_DIR)]
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith('.html'):
+                    yield os.path.relpath(os.path.join(root, name), directory).replace(os.sep, '/')
+
+
+def compile_templates():
+    engine = engines['django']
+    names = sorted(set(template_names()))
+    for name in names:
+        engine.get_template(name)
+    return len(names)
+
+
+def warm_up():
+    urls = resolve_urls()
+    templates = compile_templates()
+    # Objects created so far live until exit; keeping them out of the collector stops it from touching (and
+    # thereby copying) the shared pages in every worker.
+    gc.collect()
+    gc.freeze()
+    return urls, templates
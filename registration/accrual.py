@@ -0,0 +1,46 @@
+"""Add the yearly allowance of accruing entitlements to their leave hours in monthly shares.
+
+Every entitlement remembers how many months it has accrued, so a run only adds the months since the last run and
+running it again adds nothing. After m months an entitlement has accrued accrual_hours * m // 12 hours; rounding
+the running total instead of every share makes twelve months add up to exactly the allowance.
+"""
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from . import balances, ledger
+from .models import Entitlement, LedgerEvent
+
+
+def _due_months(today):
+    return Case(When(year__lt=today.year, then=Value(12)), default=Value(today.month), output_field=IntegerField())
+
+
+def _accrued_hours(months):
+    # Both operands are integers, so this is integer division in SQL.
+    return ExpressionWrapper(F('accrual_hours') * months / 12, output_field=IntegerField())
+
+
+def pending(today, catch_up=False):
+    """The accruing entitlements that are behind; earlier years only in catch-up mode."""
+    behind = Q(year=today.year, accrued_months__lt=today.month)
+    if catch_up:
+        behind |= Q(year__lt=today.year, accrued_months__lt=12)
+    return Entitlement.objects.filter(behind, accrual_hours__gt=0)
+
+
+@transaction.atomic
+def accrue(today=None, catch_up=False):
+    """Accrue every pending month up to and including the current one in one UPDATE; returns the rows changed."""
+    today = today or timezone.localdate()
+    entitlements = pending(today, catch_up)
+    due_months = _due_months(today)
+    hours = _accrued_hours(due_months) - _accrued_hours(F('accrued_months'))
+    deltas = list(entitlements.select_for_update().annotate(delta=hours).values_list('pk', 'delta'))
+    if not deltas:
+        return 0
+    entitlements.update(leave_hours=F('leave_hours') + hours, accrued_months=due_months,
+                        updated_at=timezone.now(), version=F('version') + 1)
+    ledger.record_many(LedgerEvent(entitlement_id=pk, leave_hours_delta=delta) for pk, delta in deltas)
+    balances.bump_on_commit()
+    return len(deltas)
@@ -1,22 +1,140 @@
-from django.contrib import admin
-from .models import Entitlement, LeaveRegistration
+import csv
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+
+from . import balances, ledger
+from .models import Contract, Entitlement, LeaveRegistration, LedgerEvent
+
+
+class UserFilter(admin.SimpleListFilter):
+    title = 'user'
+    parameter_name = 'username'
+    template = 'admin/registration/input_filter.html'
+    user_lookup = 'user__username__istartswith'
+
+    def lookups(self, request, model_admin):
+        # A free text input replaces the per-user list, so there is nothing to look up.
+        return ((None, None),)
+
+    def choices(self, changelist):
+        query_string = changelist.get_query_string(remove=[self.parameter_name])
+        return ({
+            'query_string': query_string,
+            'parameter_name': self.parameter_name,
+            'value': self.value() or '',
+            'hidden_params': [
+                (key, value) for key, value in changelist.params.items() if key != self.parameter_name
+            ],
+        },)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.user_lookup: self.value()})
+        return queryset
+
+
+class EntitlementUserFilter(UserFilter):
+    user_lookup = 'entitlement__user__username__istartswith'
+
+
+class AdjustLeaveHoursActionForm(ActionForm):
+    hours = forms.IntegerField(required=False, label='Uren')
+
+
+def export_as_csv(fields):
+    def export(modeladmin, request, queryset):
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="{}.csv"'.format(modeladmin.model._meta.model_name)
+        writer = csv.writer(response)
+        writer.writerow(fields)
+        writer.writerows(queryset.values_list(*fields).iterator())
+        return response
+
+    export.short_description = 'Exporteer geselecteerde regels als CSV'
+    return export
 
 
 class EntitlementAdmin(admin.ModelAdmin):
-    list_display = ('user', 'year', 'leave_hours')
-    list_filter = ('user', 'year')
+    list_display = ('user', 'year', 'leave_hours', 'used_leave_hours', 'remainder_leave_hours')
+    list_filter = (UserFilter, 'year')
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    autocomplete_fields = ('user',)
+    show_full_result_count = False
+    action_form = AdjustLeaveHoursActionForm
+    actions = ['adjust_leave_hours', 'export_csv']
+
+    def get_queryset(self, request):
+        return super(EntitlementAdmin, self).get_queryset(request) \
+            .annotate_used_leave_hours() \
+            .annotate(remainder_leave_hours=F('leave_hours') - F('used_leave_hours'))
+
+    def used_leave_hours(self, obj):
+        return obj.used_leave_hours
+
+    used_leave_hours.short_description = 'Used'
+    used_leave_hours.admin_order_field = 'used_leave_hours'
+
+    def remainder_leave_hours(self, obj):
+        return obj.remainder_leave_hours
+
+    remainder_leave_hours.short_description = 'Remaining'
+    remainder_leave_hours.admin_order_field = 'remainder_leave_hours'
+
+    def adjust_leave_hours(self, request, queryset):
+        try:
+            hours = int(request.POST.get('hours', ''))
+        except ValueError:
+            self.message_user(request, 'Vul het aantal uren in om het verlofsaldo aan te passen.', messages.ERROR)
+            return
+        entitlement_ids = list(queryset.values_list('pk', flat=True))
+        with transaction.atomic():
+            updated = Entitlement.objects.filter(pk__in=entitlement_ids) \
+                .update(leave_hours=F('leave_hours') + hours, updated_at=timezone.now(), version=F('version') + 1)
+            ledger.record_many(LedgerEvent(entitlement_id=pk, leave_hours_delta=hours) for pk in entitlement_ids)
+            balances.bump_on_commit()
+        self.message_user(request, 'Verlofsaldo van {} regels aangepast met {} uur.'.format(updated, hours))
+
+    adjust_leave_hours.short_description = 'Pas verlofsaldo aan met het opgegeven aantal uren'
+
+    export_csv = export_as_csv(('user__username', 'year', 'leave_hours', 'used_leave_hours', 'remainder_leave_hours'))
 
 
 class LeaveRegistrationAdmin(admin.ModelAdmin):
-    list_display = ('_user', 'from_date', 'end_date', 'amount_of_hours')
-    list_filter = ('entitlement__user',)
+    list_display = ('_user', 'from_date', 'end_date', 'amount_of_hours', 'leave_type', 'status')
+    list_filter = (EntitlementUserFilter, 'entitlement__year', 'leave_type', 'status')
     list_select_related = ('entitlement', 'entitlement__user')
+    search_fields = ('entitlement__user__username', 'entitlement__user__first_name', 'entitlement__user__last_name')
+    autocomplete_fields = ('entitlement',)
+    date_hierarchy = 'from_date'
+    show_full_result_count = False
+    actions = ['export_csv']
 
     def _user(self, obj):
         return obj.entitlement.user
 
     _user.short_description = 'User'
+    _user.admin_order_field = 'entitlement__user__username'
+
+    export_csv = export_as_csv(('entitlement__user__username', 'from_date', 'end_date', 'amount_of_hours',
+                                'leave_type', 'status'))
+
+
+class ContractAdmin(admin.ModelAdmin):
+    list_display = ('user', 'hours_per_week', 'start_date', 'end_date')
+    list_filter = (UserFilter,)
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    autocomplete_fields = ('user',)
+    date_hierarchy = 'start_date'
 
 
+admin.site.register(Contract, ContractAdmin)
 admin.site.register(Entitlement, EntitlementAdmin)
 admin.site.register(LeaveRegistration, LeaveRegistrationAdmin)
@@ -0,0 +1,45 @@
+import datetime
+
+from django.db import transaction
+
+from .models import DayAllocation, LeaveRegistration
+
+
+def leave_days(from_date, end_date):
+    days = [from_date + datetime.timedelta(days=offset) for offset in range((end_date - from_date).days + 1)]
+    working_days = [day for day in days if day.weekday() < 5]
+    return working_days or days or [from_date]
+
+
+def allocate(leave_registration_id, user_id, from_date, end_date, amount_of_hours):
+    days = leave_days(from_date, end_date)
+    hours, remainder = divmod(amount_of_hours, len(days))
+    return [
+        DayAllocation(leave_registration_id=leave_registration_id, user_id=user_id, date=day,
+                      hours=hours + (1 if i < remainder else 0))
+        for i, day in enumerate(days)
+    ]
+
+
+def _registration_values(registrations):
+    return registrations.values_list('id', 'entitlement__user_id', 'from_date', 'end_date', 'amount_of_hours')
+
+
+@transaction.atomic
+def sync(leave_registration_id):
+    DayAllocation.objects.filter(leave_registration_id=leave_registration_id).delete()
+    registrations = LeaveRegistration.objects.counted().filter(pk=leave_registration_id)
+    for registration in _registration_values(registrations):
+        DayAllocation.objects.bulk_create(allocate(*registration))
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    DayAllocation.objects.all().delete()
+    batch = []
+    for registration in _registration_values(LeaveRegistration.objects.counted()).iterator():
+        batch.extend(allocate(*registration))
+        if len(batch) >= batch_size:
+            DayAllocation.objects.bulk_create(batch)
+            batch = []
+    DayAllocation.objects.bulk_create(batch)
@@ -0,0 +1,29 @@
+from django.db import transaction
+
+from . import balances, ledger
+from .models import DayAllocation, Entitlement, LeaveRegistration, LedgerEvent
+
+
+@transaction.atomic
+def decide(leave_registrations, status):
+    """Approve or reject the requested registrations among leave_registrations; returns how many were decided.
+
+    The requested rows are locked first, so a concurrent decision on the same registrations waits and then
+    finds them decided, instead of recording the rejection in the ledger a second time.
+    """
+    rows = list(LeaveRegistration.objects.select_for_update()
+                .filter(pk__in=leave_registrations.values('pk'), status=LeaveRegistration.REQUESTED)
+                .values_list('id', 'entitlement_id', 'amount_of_hours'))
+    if not rows:
+        return 0
+    registration_ids = [registration_id for registration_id, _, _ in rows]
+    Entitlement.objects.filter(pk__in={entitlement_id for _, entitlement_id, _ in rows}).touch()
+    balances.bump_on_commit()
+    if status == LeaveRegistration.REJECTED:
+        DayAllocation.objects.filter(leave_registration__in=registration_ids).delete()
+        ledger.record_many(
+            LedgerEvent(entitlement_id=entitlement_id, leave_registration_id=registration_id,
+                        used_hours_delta=-amount_of_hours)
+            for registration_id, entitlement_id, amount_of_hours in rows)
+    LeaveRegistration.objects.filter(pk__in=registration_ids).update(status=status)
+    return len(rows)
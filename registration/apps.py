@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class RegistrationConfig(AppConfig):
     name = 'registration'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
@@ -0,0 +1,66 @@
+from django.db import connection, transaction
+
+from . import balances
+from .models import AbsenceAlert, ArchivedEntitlement, ArchivedLeaveRegistration, DayAllocation, Entitlement, \
+    LeaveRegistration, used_leave_type_hours_name
+
+TOTAL_FIELDS = ['used_leave_hours', 'approved_leave_hours', 'pending_leave_hours'] + [
+    used_leave_type_hours_name(leave_type) for leave_type, _ in LeaveRegistration.LEAVE_TYPE_CHOICES]
+ENTITLEMENT_FIELDS = ['id', 'user_id', 'year', 'leave_hours', 'extra_statutory_leave_hours', 'special_leave_hours',
+                      'unpaid_leave_hours']
+REGISTRATION_FIELDS = ['id', 'entitlement_id', 'from_date', 'end_date', 'amount_of_hours', 'status', 'leave_type']
+
+
+class ArchivedYear(ValueError):
+    pass
+
+
+def archived_years(user_id=None):
+    entitlements = ArchivedEntitlement.objects.all() if user_id is None else \
+        ArchivedEntitlement.objects.filter(user_id=user_id)
+    return set(entitlements.values_list('year', flat=True).distinct())
+
+
+def check_not_archived(years):
+    """Refuse writes to entitlements of archived years; archive_years would fail on them the next time."""
+    archived = sorted(set(ArchivedEntitlement.objects.filter(year__in=set(years))
+                          .values_list('year', flat=True).distinct()))
+    if archived:
+        raise ArchivedYear('Verlofuren van een gearchiveerd jaar kunnen niet meer worden gewijzigd: {}'.format(
+            ', '.join(str(year) for year in archived)))
+
+
+def _delete(model, pks, batch_size):
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start:start + batch_size]
+            cursor.execute('DELETE FROM {} WHERE {} IN ({})'.format(table, column, ', '.join(['%s'] * len(batch))),
+                           batch)
+
+
+@transaction.atomic
+def archive(before, batch_size=500):
+    """Move the entitlements of the years before `before` and their registrations to the archive tables."""
+    entitlements = Entitlement.objects.filter(year__lt=before)
+    rows = entitlements.annotate_used_leave_hours().annotate_leave_type_hours() \
+        .values_list(*ENTITLEMENT_FIELDS + TOTAL_FIELDS)
+    archived = ArchivedEntitlement.objects.bulk_create(
+        (ArchivedEntitlement(**dict(zip(ENTITLEMENT_FIELDS + TOTAL_FIELDS, row))) for row in rows),
+        batch_size=batch_size)
+    registrations = LeaveRegistration.objects.filter(entitlement__year__lt=before)
+    archived_registrations = ArchivedLeaveRegistration.objects.bulk_create(
+        (ArchivedLeaveRegistration(**dict(zip(REGISTRATION_FIELDS, row)))
+         for row in registrations.values_list(*REGISTRATION_FIELDS).iterator()),
+        batch_size=batch_size)
+    # Nothing listens to the deletes of alerts and allocations, so these are single DELETE statements.
+    AbsenceAlert.objects.filter(leave_registration__entitlement__year__lt=before).delete()
+    DayAllocation.objects.filter(leave_registration__entitlement__year__lt=before).delete()
+    # Registrations and entitlements do have receivers; their ledger events are history the archive totals already
+    # summarise, so their rows go without them. The ledger itself stays; archived entitlements keep their ids, so
+    # its events and snapshots still answer balances at earlier moments.
+    _delete(LeaveRegistration, [registration.pk for registration in archived_registrations], batch_size)
+    _delete(Entitlement, [entitlement.pk for entitlement in archived], batch_size)
+    balances.bump_on_commit()
+    return len(archived), len(archived_registrations)
@@ -0,0 +1,164 @@
+"""Read-only balance snapshot shared by all worker processes through a memory-mapped file.
+
+The snapshot holds one fixed-size record per entitlement of the active years. Writes store a new random token
+in the database (after commit); a reader that sees a different token rebuilds the snapshot into a temporary
+file and renames it over the old one, so other workers always map a complete file. Because the token lives in
+the database, other hosts and restored databases never match a snapshot built from other data.
+"""
+import collections
+import hashlib
+import mmap
+import os
+import struct
+import uuid
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .ledger import Balance
+from .models import BalanceSnapshotVersion, Entitlement, LeaveRegistration, used_leave_type_hours_name
+
+HEADER = struct.Struct('<8s32sqq')
+MAGIC = b'BALANCE3'
+LEAVE_TYPE_FIELDS = [used_leave_type_hours_name(leave_type) for leave_type, _ in LeaveRegistration.LEAVE_TYPE_CHOICES]
+RECORD = np.dtype([('user_id', '<i8'), ('year', '<i4'), ('leave_hours', '<i4'), ('used_hours', '<i4')]
+                  + [(field, '<i4') for field in LEAVE_TYPE_FIELDS])
+
+Snapshot = collections.namedtuple('Snapshot', ['version', 'first_year', 'records'])
+
+_snapshots = {}
+
+
+def active_years(today=None):
+    year = (today or timezone.localdate()).year
+    return range(year - 1, year + 2)
+
+
+def _directory():
+    # Every database gets its own snapshot, so test runs never share files with the development server.
+    database = hashlib.md5(str(connection.settings_dict['NAME']).encode()).hexdigest()[:12]
+    return os.path.join(settings.BALANCE_SNAPSHOT_DIR, database)
+
+
+def version():
+    return BalanceSnapshotVersion.objects.filter(pk=1).values_list('token', flat=True).first() or ''
+
+
+def bump():
+    token = uuid.uuid4().hex
+    if BalanceSnapshotVersion.objects.filter(pk=1).update(token=token):
+        return
+    try:
+        with transaction.atomic():
+            BalanceSnapshotVersion.objects.create(pk=1, token=token)
+    except IntegrityError:
+        # Another process created the row between our update and insert.
+        BalanceSnapshotVersion.objects.filter(pk=1).update(token=token)
+
+
+def bump_on_commit():
+    transaction.on_commit(bump)
+
+
+def build(years):
+    rows = Entitlement.objects.filter(year__in=years) \
+        .annotate_used_leave_hours() \
+        .annotate_leave_type_hours() \
+        .order_by('user_id', 'year') \
+        .values_list('user_id', 'year', 'leave_hours', 'used_leave_hours', *LEAVE_TYPE_FIELDS)
+    return np.array(list(rows), dtype=RECORD)
+
+
+def rebuild(today=None):
+    # Read the version before querying, so writes during the rebuild leave the new file outdated.
+    current = version()
+    years = active_years(today)
+    records = build(years)
+    os.makedirs(_directory(), exist_ok=True)
+    path = os.path.join(_directory(), 'balances')
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'wb') as snapshot:
+        snapshot.write(HEADER.pack(MAGIC, current.encode(), years[0], len(records)))
+        snapshot.write(records.tobytes())
+    os.replace(temporary, path)
+    return current
+
+
+def _open(path):
+    try:
+        with open(path, 'rb') as snapshot:
+            mapped = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    magic, current, first_year, count = HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        return None
+    return Snapshot(current.rstrip(b'\0').decode(), first_year,
+                    np.frombuffer(mapped, dtype=RECORD, count=count, offset=HEADER.size))
+
+
+def get_snapshot(today=None):
+    path = os.path.join(_directory(), 'balances')
+    current = version()
+    first_year = active_years(today)[0]
+
+    def is_fresh(snapshot):
+        return snapshot is not None and snapshot.version == current and snapshot.first_year == first_year
+
+    snapshot = _snapshots.get(path)
+    if not is_fresh(snapshot):
+        snapshot = _open(path)
+        if not is_fresh(snapshot):
+            rebuild(today)
+            snapshot = _open(path)
+        _snapshots[path] = snapshot
+    return snapshot
+
+
+def _find(snapshot, user_id, year, today):
+    if year not in active_years(today):
+        return None
+    records = snapshot.records
+    start = np.searchsorted(records['user_id'], user_id, side='left')
+    end = np.searchsorted(records['user_id'], user_id, side='right')
+    for record in records[start:end]:
+        if record['year'] == year:
+            return record
+    return None
+
+
+def get_balance(user_id, year, today=None):
+    record = _find(get_snapshot(today), user_id, year, today)
+    if record is None:
+        return None
+    leave_hours, used_hours = int(record['leave_hours']), int(record['used_hours'])
+    return Balance(leave_hours, used_hours, leave_hours - used_hours)
+
+
+def attach_used_hours(entitlements, today=None):
+    """Set the used hours, in total and per leave type, as if the entitlements were annotated.
+
+    This is the explicit way to read the snapshot: views call it on entitlements they did not annotate.
+    """
+    fields = ['used_leave_hours'] + LEAVE_TYPE_FIELDS
+    snapshot = get_snapshot(today)
+    missing = []
+    for entitlement in entitlements:
+        record = _find(snapshot, entitlement.user_id, entitlement.year, today)
+        if record is None:
+            missing.append(entitlement)
+            continue
+        for field, value in zip(fields, record.tolist()[3:]):
+            setattr(entitlement, field, value)
+    if missing:
+        used_hours = {row[0]: row[1:] for row in Entitlement.objects
+                      .filter(pk__in=[entitlement.pk for entitlement in missing])
+                      .annotate_used_leave_hours()
+                      .annotate_leave_type_hours()
+                      .values_list('pk', *fields)}
+        for entitlement in missing:
+            for field, value in zip(fields, used_hours.get(entitlement.pk, [0] * len(fields))):
+                setattr(entitlement, field, value)
+    return entitlements
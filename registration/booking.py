@@ -0,0 +1,55 @@
+"""Saving leave registrations with optimistic concurrency control on the entitlement balance.
+
+The balance is read together with the entitlement's version. The write first claims the entitlement with a
+conditional UPDATE on that version, optionally also requiring enough remaining hours, and only then saves the
+registration. A writer that lost the race re-reads and tries again; nobody locks the entitlement table. The
+version a saved registration claimed is left on it as claimed_version.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Entitlement, LeaveRegistration
+
+RETRIES = 3
+
+
+class ConcurrentUpdate(Exception):
+    pass
+
+
+class InsufficientBalance(Exception):
+    pass
+
+
+def _read_balance(entitlement_id, leave_registration_id):
+    # Hours used by the other registrations, so an update does not count its own previous hours.
+    other_used_hours = Coalesce(Sum('leaveregistration__amount_of_hours', filter=Q(
+        leaveregistration__status__in=LeaveRegistration.COUNTED_STATUSES) & ~Q(
+        leaveregistration__pk=leave_registration_id)), 0)
+    return Entitlement.objects.filter(pk=entitlement_id) \
+        .annotate(other_used_hours=other_used_hours) \
+        .values_list('version', 'other_used_hours') \
+        .get()
+
+
+def save_leave_registration(leave_registration, prevent_overdraw=None, retries=RETRIES):
+    if prevent_overdraw is None:
+        prevent_overdraw = settings.LEAVE_PREVENT_OVERDRAW
+    entitlement_id = leave_registration.entitlement_id
+    hours = leave_registration.get_counted_hours()
+    for _ in range(retries):
+        version, other_used_hours = _read_balance(entitlement_id, leave_registration.pk)
+        claim = Entitlement.objects.filter(pk=entitlement_id, version=version)
+        if prevent_overdraw and hours:
+            claim = claim.filter(leave_hours__gte=other_used_hours + hours)
+        with transaction.atomic():
+            if claim.update(version=F('version') + 1, updated_at=timezone.now()):
+                leave_registration.claimed_version = version + 1
+                leave_registration.save()
+                return leave_registration
+        if prevent_overdraw and Entitlement.objects.filter(pk=entitlement_id, version=version).exists():
+            raise InsufficientBalance('Er zijn niet genoeg verlofuren over voor deze registratie.')
+    raise ConcurrentUpdate('Het verlofsaldo is tegelijkertijd gewijzigd. Probeer het opnieuw.')
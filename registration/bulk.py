@@ -0,0 +1,72 @@
+"""Set or adjust the leave hours of every member of a group for one year in two statements."""
+import collections
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery
+from django.utils import timezone
+
+from . import archive, balances, ledger
+from .models import Entitlement, LedgerEvent
+
+SET = 'set'
+ADJUST = 'adjust'
+MODE_CHOICES = (
+    (SET, 'Zet op'),
+    (ADJUST, 'Pas aan met'),
+)
+
+Change = collections.namedtuple('Change', ['user_id', 'username', 'entitlement_id', 'leave_hours',
+                                           'new_leave_hours', 'other_leave_hours'])
+
+
+def _new_leave_hours(mode, hours, leave_hours):
+    if mode == SET:
+        return hours
+    return (leave_hours or 0) + hours
+
+
+def preview(group, year, mode, hours):
+    """The current and the new leave hours of every member of the group, read in one query."""
+    entitlements = Entitlement.objects.filter(user=OuterRef('pk'), year=year)
+    rows = User.objects.filter(groups=group) \
+        .annotate(entitlement_id=Subquery(entitlements.values('pk'), output_field=IntegerField()),
+                  leave_hours=Subquery(entitlements.values('leave_hours'), output_field=IntegerField()),
+                  other_leave_hours=Subquery(entitlements.annotate(
+                      other_leave_hours=F('extra_statutory_leave_hours') + F('special_leave_hours')
+                      + F('unpaid_leave_hours')).values('other_leave_hours'), output_field=IntegerField())) \
+        .order_by('username') \
+        .values_list('pk', 'username', 'entitlement_id', 'leave_hours', 'other_leave_hours')
+    return [Change(user_id, username, entitlement_id, leave_hours, _new_leave_hours(mode, hours, leave_hours),
+                   other_leave_hours or 0)
+            for user_id, username, entitlement_id, leave_hours, other_leave_hours in rows]
+
+
+def invalid(changes):
+    """The changes that would leave less hours than are already assigned to the other leave types."""
+    return [change for change in changes if change.new_leave_hours < change.other_leave_hours]
+
+
+@transaction.atomic
+def apply(group, year, mode, hours):
+    archive.check_not_archived([year])
+    changes = preview(group, year, mode, hours)
+    missing = [change for change in changes if change.entitlement_id is None]
+    existing = [change for change in changes if change.entitlement_id is not None
+                and change.new_leave_hours != change.leave_hours]
+    Entitlement.objects.bulk_create(
+        Entitlement(user_id=change.user_id, year=year, leave_hours=change.new_leave_hours) for change in missing)
+    new_leave_hours = hours if mode == SET else F('leave_hours') + hours
+    Entitlement.objects.filter(pk__in=[change.entitlement_id for change in existing]) \
+        .update(leave_hours=new_leave_hours, updated_at=timezone.now(), version=F('version') + 1)
+    # Not every backend returns the primary keys of bulk-created rows.
+    created_ids = dict(Entitlement.objects.filter(year=year, user_id__in=[change.user_id for change in missing])
+                       .values_list('user_id', 'pk')) if missing else {}
+    ledger.record_many(
+        [LedgerEvent(entitlement_id=created_ids[change.user_id], leave_hours_delta=change.new_leave_hours)
+         for change in missing]
+        + [LedgerEvent(entitlement_id=change.entitlement_id,
+                       leave_hours_delta=change.new_leave_hours - change.leave_hours)
+           for change in existing])
+    balances.bump_on_commit()
+    return len(missing), len(existing)
@@ -0,0 +1,77 @@
+"""How many members of a group are absent on each day of a year.
+
+The counters are the day allocations in the database, shared by every worker: saving, moving, rejecting or
+deleting a registration replaces the allocations of that registration only, so a change is applied to its own
+range and nothing has to be rebuilt or invalidated. A heatmap is one grouped query of the distinct members with
+an allocation per day; the absence threshold check runs the same count for the leave days of the new registration.
+"""
+import collections
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models import Count
+
+from . import allocation
+from .models import AbsenceAlert, DayAllocation
+
+Heatmap = collections.namedtuple('Heatmap', ['year', 'members', 'absent'])
+Breach = collections.namedtuple('Breach', ['group_id', 'group_name', 'date', 'absent', 'members', 'threshold'])
+
+
+def _days(year):
+    return (datetime.date(year + 1, 1, 1) - datetime.date(year, 1, 1)).days
+
+
+def get_heatmap(group_id, year):
+    first_day = datetime.date(year, 1, 1)
+    absent = np.zeros(_days(year), dtype=np.int32)
+    for date, count in DayAllocation.objects.between(first_day, datetime.date(year, 12, 31)) \
+            .filter(user__groups=group_id).values('date').annotate(absent=Count('user', distinct=True)) \
+            .order_by().values_list('date', 'absent'):
+        absent[(date - first_day).days] = count
+    return Heatmap(year, User.objects.filter(groups=group_id).count(), absent)
+
+
+def get_threshold(group_name):
+    return settings.ABSENCE_THRESHOLD_PERCENTAGES.get(group_name, settings.ABSENCE_THRESHOLD_PERCENTAGE)
+
+
+def breaches(user_id, from_date, end_date):
+    """The days of the range on which the user's absence would bring one of their groups over its threshold.
+
+    The other members absent per day are counted from their day allocations in the database, for the days of
+    the range only, so the answer never depends on a worker's cache.
+    """
+    groups = list(Group.objects.filter(user=user_id).order_by('name').values_list('pk', 'name'))
+    members = dict(User.groups.through.objects.filter(group__in=[pk for pk, _ in groups])
+                   .values('group_id').annotate(members=Count('user_id')).order_by()
+                   .values_list('group_id', 'members'))
+    groups = [(group_id, group_name) for group_id, group_name in groups
+              if members.get(group_id, 0) >= settings.ABSENCE_THRESHOLD_MIN_MEMBERS]
+    if not groups:
+        return []
+    # The user's own allocations are left out: the new registration replaces them and counts them once.
+    absent = {(group_id, date): count for group_id, date, count in DayAllocation.objects.between(from_date, end_date)
+              .filter(user__groups__in=[pk for pk, _ in groups]).exclude(user=user_id)
+              .values('user__groups', 'date').annotate(absent=Count('user', distinct=True)).order_by()
+              .values_list('user__groups', 'date', 'absent')}
+    found = []
+    for group_id, group_name in groups:
+        threshold, count = get_threshold(group_name), members[group_id]
+        for date in allocation.leave_days(from_date, end_date):
+            day_absent = absent.get((group_id, date), 0) + 1
+            if 100 * day_absent > threshold * count:
+                found.append(Breach(group_id, group_name, date, day_absent, count, threshold))
+    return found
+
+
+@transaction.atomic
+def record_breaches(leave_registration, found):
+    """Replace the alerts of the registration that have not gone out yet, so an edit is reported once."""
+    AbsenceAlert.objects.filter(leave_registration=leave_registration, notified_at__isnull=True).delete()
+    return AbsenceAlert.objects.bulk_create(
+        AbsenceAlert(leave_registration=leave_registration, group_id=breach.group_id, date=breach.date,
+                     absent=breach.absent, members=breach.members) for breach in found)
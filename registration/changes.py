@@ -0,0 +1,56 @@
+"""Change feed for the admin balance overview, read from the append-only ledger."""
+import json
+import time
+
+from django.db.models import Max
+
+from .models import Entitlement, LedgerEvent
+
+RETRY = 3000
+# A client further behind than this reloads the page instead of receiving the changed rows.
+MAX_PENDING_EVENTS = 10000
+
+
+def latest_event_id():
+    return LedgerEvent.objects.aggregate(last_event_id=Max('id'))['last_event_id'] or 0
+
+
+def changed_rows(year, after, last_event_id=None):
+    """The last event id and the rows of the entitlements of the year with events after `after` up to it."""
+    if last_event_id is None:
+        last_event_id = latest_event_id()
+    if last_event_id <= after:
+        return after, []
+    changed = LedgerEvent.objects.filter(id__gt=after, id__lte=last_event_id, entitlement__year=year) \
+        .values('entitlement_id') \
+        .distinct()
+    entitlements = Entitlement.objects.filter(pk__in=changed) \
+        .annotate_used_leave_hours() \
+        .order_by('pk')
+    rows = [{'id': entitlement.pk, 'used': entitlement.get_used_hours(),
+             'remaining': entitlement.get_remainder_hours(), 'color': entitlement.get_color()}
+            for entitlement in entitlements]
+    return last_event_id, rows
+
+
+def stream(year, after, timeout, poll_interval):
+    yield 'retry: {}\n\n'.format(max(RETRY, int(poll_interval * 1000)))
+    deadline = time.monotonic() + timeout
+    while True:
+        last_event_id = latest_event_id()
+        if last_event_id - after > MAX_PENDING_EVENTS:
+            # Too far behind to catch up row by row: restart the client from the latest event.
+            yield 'id: {}\nevent: reload\ndata: reload\n\n'.format(last_event_id)
+            return
+        last_event_id, rows = changed_rows(year, after, last_event_id)
+        if rows:
+            yield 'id: {}\ndata: {}\n\n'.format(last_event_id, json.dumps(rows))
+        elif last_event_id != after:
+            # Nothing changed in this year; only move the client's Last-Event-ID forward.
+            yield 'id: {}\n\n'.format(last_event_id)
+        else:
+            yield ': idle\n\n'
+        after = last_event_id
+        if time.monotonic() >= deadline:
+            return
+        time.sleep(poll_interval)
@@ -1,19 +1,32 @@
+from django.db.models import Case, IntegerField, Value, When
+
 from registration.models import Entitlement
 from datetime import datetime
 
 
+def get_default_entitlement(entitlements):
+    current_year = datetime.today().year
+    entitlement = None
+    for candidate in entitlements:
+        if candidate.year == current_year:
+            return candidate
+        if entitlement is None or candidate.year > entitlement.year:
+            entitlement = candidate
+    return entitlement
+
+
 def default_entitlement(request):
     if not request.user.is_authenticated:
         entitlement = None
+    elif 'default_entitlement' in vars(request):
+        # The view already picked it from the entitlements it loaded.
+        entitlement = request.default_entitlement
     else:
         current_year = datetime.today().year
-        try:
-            entitlement = Entitlement.objects.get(user=request.user, year=current_year)
-        except Entitlement.DoesNotExist:
-            try:
-                entitlement = Entitlement.objects.order_by('year').filter(user=request.user).last()
-            except IndexError:
-                entitlement = None
+        entitlement = Entitlement.objects.filter(user=request.user) \
+            .order_by(Case(When(year=current_year, then=Value(0)), default=Value(1), output_field=IntegerField()),
+                      '-year') \
+            .first()
     return {
         'default_entitlement': entitlement
     }
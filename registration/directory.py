@@ -0,0 +1,154 @@
+"""Synchronise users from a directory export, writing only the users that changed.
+
+Every synced user has a DirectoryRecord with a hash of the attributes the sync last wrote. A run reads the export
+as a stream, compares the hash of each person with the stored one and writes the new and changed users in batches
+of bulk operations; managed users that are no longer in the export are deactivated. New accounts get an unusable
+password instead of a hashed one, so creating them costs no key stretching.
+"""
+import base64
+import collections
+import csv
+import hashlib
+import itertools
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import search
+from .models import DirectoryRecord
+
+BATCH_SIZE = 1000
+FIELDS = ('username', 'first_name', 'last_name', 'email')
+LDIF_ATTRIBUTES = {'uid': 'username', 'givenname': 'first_name', 'sn': 'last_name', 'mail': 'email'}
+
+Person = collections.namedtuple('Person', FIELDS)
+DirectorySync = collections.namedtuple('DirectorySync', ['created', 'updated', 'deactivated', 'unchanged'])
+
+
+def _person(values):
+    if not isinstance(values, dict):
+        raise ValueError('Invalid record: {!r}'.format(values))
+    if not (values.get('username') or '').strip():
+        return None
+    return Person(**{field: str(values.get(field) or '').strip()[:User._meta.get_field(field).max_length]
+                     for field in FIELDS})
+
+
+def read_csv(lines):
+    """People from CSV lines with a header row naming the username, first_name, last_name and email columns."""
+    return filter(None, map(_person, csv.DictReader(lines)))
+
+
+def read_json(lines):
+    """People from JSON lines, one object per line, or from a single JSON array."""
+    lines = iter(lines)
+    first = next((line for line in lines if line.strip()), '')
+    if first.lstrip().startswith('['):
+        rows = json.loads(''.join(itertools.chain([first], lines)))
+    else:
+        rows = (json.loads(line) for line in itertools.chain([first], lines) if line.strip())
+    return filter(None, map(_person, rows))
+
+
+def _ldif_entries(lines):
+    entry = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line.startswith(' ') and entry:
+            entry[-1] += line[1:]
+        elif not line:
+            if entry:
+                yield entry
+            entry = []
+        elif not line.startswith('#'):
+            entry.append(line)
+    if entry:
+        yield entry
+
+
+def read_ldif(lines):
+    """People from LDIF entries with uid, givenName, sn and mail attributes."""
+    for entry in _ldif_entries(lines):
+        values = {}
+        for line in entry:
+            name, _, value = line.partition(':')
+            field = LDIF_ATTRIBUTES.get(name.strip().lower())
+            if field is None or field in values:
+                continue
+            # A double colon marks a base64 value, used for anything that is not plain ASCII.
+            values[field] = base64.b64decode(value[1:]).decode('utf-8') if value.startswith(':') else value.strip()
+        person = _person(values)
+        if person is not None:
+            yield person
+
+
+READERS = {'csv': read_csv, 'json': read_json, 'ldif': read_ldif}
+
+
+def content_hash(person):
+    return hashlib.sha1('\x1f'.join(person).encode('utf-8')).hexdigest()
+
+
+def _create(people):
+    users = []
+    for person, _ in people:
+        user = User(**person._asdict())
+        user.set_unusable_password()
+        users.append(user)
+    User.objects.bulk_create(users)
+    # Not every backend returns the primary keys of bulk-created rows.
+    user_ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'pk'))
+    for user in users:
+        user.pk = user_ids[user.username]
+    DirectoryRecord.objects.bulk_create(DirectoryRecord(user_id=user.pk, content_hash=digest)
+                                        for user, (_, digest) in zip(users, people))
+    search.index_users(users)
+    return len(users)
+
+
+def _update(people):
+    users = [User(pk=pk, is_active=True, **person._asdict()) for pk, person, _ in people]
+    User.objects.bulk_update(users, ['first_name', 'last_name', 'email', 'is_active'])
+    DirectoryRecord.objects.filter(user__in=[user.pk for user in users]).delete()
+    DirectoryRecord.objects.bulk_create(DirectoryRecord(user_id=pk, content_hash=digest) for pk, _, digest in people)
+    search.index_users(users)
+    return len(users)
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    return iter(lambda: list(itertools.islice(iterator, size)), [])
+
+
+@transaction.atomic
+def sync(people, deactivate_missing=True, batch_size=BATCH_SIZE):
+    known = {username: (pk, is_active, digest) for username, pk, is_active, digest
+             in User.objects.values_list('username', 'pk', 'is_active', 'directory_record__content_hash').iterator()}
+    seen = set()
+    counts = collections.Counter()
+    for batch in _batches(people, batch_size):
+        new, changed = [], []
+        for person in batch:
+            if person.username in seen:
+                continue
+            seen.add(person.username)
+            digest = content_hash(person)
+            current = known.get(person.username)
+            if current is None:
+                new.append((person, digest))
+            elif current[2] != digest or not current[1]:
+                changed.append((current[0], person, digest))
+            else:
+                counts['unchanged'] += 1
+        if new:
+            counts['created'] += _create(new)
+        if changed:
+            counts['updated'] += _update(changed)
+    if deactivate_missing:
+        # Only users the sync manages; accounts created by hand stay as they are.
+        missing = [pk for username, (pk, is_active, digest) in known.items()
+                   if digest is not None and is_active and username not in seen]
+        for batch in _batches(missing, batch_size):
+            counts['deactivated'] += User.objects.filter(pk__in=batch).update(is_active=False)
+    return DirectorySync(counts['created'], counts['updated'], counts['deactivated'], counts['unchanged'])
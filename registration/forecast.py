@@ -0,0 +1,103 @@
+import datetime
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .models import Entitlement, LeaveRegistration
+
+FORECAST_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _year_fraction_elapsed(year, today):
+    first_day = datetime.date(year, 1, 1)
+    days_in_year = (datetime.date(year + 1, 1, 1) - first_day).days
+    elapsed = (today - first_day).days + 1
+    return min(max(elapsed / days_in_year, 0.0), 1.0)
+
+
+def _totals(values, index, size):
+    return np.bincount(index, weights=values, minlength=size)
+
+
+def build_year_forecast(year, today=None):
+    today = today or datetime.date.today()
+    rows = list(
+        Entitlement.objects.filter(year=year)
+        .order_by('id')
+        .values_list('id', 'user_id', 'user__username', 'leave_hours',
+                     'leaveregistration__from_date', 'leaveregistration__amount_of_hours',
+                     'leaveregistration__status')
+    )
+    if not rows:
+        return {'year': year, 'date': today, 'users': [], 'groups': [], 'organisation': None}
+
+    entitlement_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    from_dates = np.array([row[4].toordinal() if row[4] else 0 for row in rows], dtype=np.int64)
+    hours = np.array([row[5] if row[6] in LeaveRegistration.COUNTED_STATUSES else 0 for row in rows],
+                     dtype=np.float64)
+
+    # One row per entitlement, plus one extra row for every additional registration it has.
+    _, first_rows, index = np.unique(entitlement_ids, return_index=True, return_inverse=True)
+    size = len(first_rows)
+    user_ids = np.array([rows[i][1] for i in first_rows], dtype=np.int64)
+    usernames = [rows[i][2] for i in first_rows]
+    leave_hours = np.array([rows[i][3] for i in first_rows], dtype=np.float64)
+
+    is_taken = (from_dates > 0) & (from_dates <= today.toordinal())
+    taken = _totals(np.where(is_taken, hours, 0.0), index, size)
+    planned = _totals(np.where(is_taken, 0.0, hours), index, size)
+
+    fraction = _year_fraction_elapsed(year, today)
+    pace = taken / fraction if fraction else np.zeros(size)
+    projected_used = np.maximum(taken + planned, pace)
+    remainder = leave_hours - taken - planned
+    projected_remainder = leave_hours - projected_used
+    exceeding = projected_remainder < 0
+
+    memberships = list(
+        User.groups.through.objects.filter(user_id__in=user_ids.tolist())
+        .values_list('user_id', 'group__name')
+    )
+    group_names = sorted({name for _, name in memberships})
+    user_position = {user_id: i for i, user_id in enumerate(user_ids.tolist())}
+    group_position = {name: i for i, name in enumerate(group_names)}
+    member_index = np.array([user_position[user_id] for user_id, _ in memberships], dtype=np.int64)
+    group_index = np.array([group_position[name] for _, name in memberships], dtype=np.int64)
+
+    def group_totals(values):
+        return _totals(values[member_index], group_index, len(group_names))
+
+    columns = {
+        'leave_hours': leave_hours,
+        'taken_hours': taken,
+        'planned_hours': planned,
+        'remainder_hours': remainder,
+        'projected_remainder_hours': projected_remainder,
+    }
+    users = [
+        dict({key: float(values[i]) for key, values in columns.items()},
+             user_id=int(user_ids[i]), username=usernames[i], exceeding=bool(exceeding[i]))
+        for i in np.argsort(projected_remainder, kind='stable')
+    ]
+    group_columns = {key: group_totals(values) for key, values in columns.items()}
+    group_exceeding = group_totals(exceeding.astype(np.float64))
+    group_members = group_totals(np.ones(size))
+    groups = [
+        dict({key: float(values[i]) for key, values in group_columns.items()},
+             name=name, members=int(group_members[i]), exceeding=int(group_exceeding[i]))
+        for i, name in enumerate(group_names)
+    ]
+    organisation = dict({key: float(values.sum()) for key, values in columns.items()},
+                        members=size, exceeding=int(exceeding.sum()))
+    return {'year': year, 'date': today, 'users': users, 'groups': groups, 'organisation': organisation}
+
+
+def get_year_forecast(year, today=None):
+    today = today or datetime.date.today()
+    key = 'year-forecast:{}:{}:{}'.format(year, today.isoformat(), Entitlement.objects.filter(year=year).data_version())
+    forecast = cache.get(key)
+    if forecast is None:
+        forecast = build_year_forecast(year, today)
+        cache.set(key, forecast, FORECAST_CACHE_TIMEOUT)
+    return forecast
@@ -1,18 +1,22 @@
 import datetime
 
-from django.contrib.auth.models import User
-from django.forms import ModelForm, DateInput, forms, CheckboxSelectMultiple
+from django.contrib.auth.models import Group, User
+from django.forms import Form, ModelForm, DateField, DateInput, forms, CheckboxSelectMultiple, ChoiceField, \
+    IntegerField, ModelChoiceField, BooleanField, HiddenInput
 
+from . import archive, bulk
 from .models import LeaveRegistration, Entitlement
 
 
 class LeaveRegistrationForm(ModelForm):
     required_css_class = 'required'
+    # Only shown once the registration would bring a group over its absence threshold.
+    confirm_peak_absence = BooleanField(required=False, widget=HiddenInput, label='Toch opslaan')
 
     class Meta:
         model = LeaveRegistration
         fields = [
-            'from_date', 'end_date', 'amount_of_hours'
+            'from_date', 'end_date', 'amount_of_hours', 'leave_type'
         ]
         widgets = {
             'from_date': DateInput(attrs={'type': 'date'}),
@@ -22,6 +26,10 @@ class LeaveRegistrationForm(ModelForm):
     def __init__(self, years, *args, **kwargs):
         self.years = years
         super(LeaveRegistrationForm, self).__init__(*args, **kwargs)
+        self.fields['leave_type'].required = False
+
+    def clean_leave_type(self):
+        return self.cleaned_data.get('leave_type') or LeaveRegistration.STATUTORY
 
     def clean(self):
         from_date = self.cleaned_data.get('from_date')
@@ -81,5 +89,57 @@ class AdminEntitlementForm(ModelForm):
     class Meta:
         model = Entitlement
         fields = [
-            'leave_hours'
+            'leave_hours', 'extra_statutory_leave_hours', 'special_leave_hours', 'unpaid_leave_hours',
+            'accrual_hours'
         ]
+
+    def __init__(self, *args, **kwargs):
+        super(AdminEntitlementForm, self).__init__(*args, **kwargs)
+        self.fields['accrual_hours'].required = False
+
+    def clean_accrual_hours(self):
+        return self.cleaned_data.get('accrual_hours') or 0
+
+    def clean(self):
+        leave_hours = self.cleaned_data.get('leave_hours')
+        other_leave_hours = sum(self.cleaned_data.get(field) or 0 for field in (
+            'extra_statutory_leave_hours', 'special_leave_hours', 'unpaid_leave_hours'))
+        if leave_hours is not None and other_leave_hours > leave_hours:
+            raise forms.ValidationError(
+                "De uren per verlofsoort zijn samen meer dan het verlofsaldo.")
+        return self.cleaned_data
+
+
+class BalanceDateForm(Form):
+    balance_date = DateField(label='Saldo op datum', widget=DateInput(attrs={'type': 'date'}),
+                             help_text='Na het opnieuw opbouwen van het grootboek telt elke verlofregistratie met '
+                                       'de huidige uren vanaf het moment van aanmaken; eerdere wijzigingen zijn '
+                                       'dan niet meer terug te zien.')
+
+
+class ApprovalGroupForm(Form):
+    group = ModelChoiceField(queryset=Group.objects.all(), required=False)
+
+
+class BulkEntitlementForm(Form):
+    required_css_class = 'required'
+    group = ModelChoiceField(queryset=Group.objects.order_by('name'), label='Groep')
+    year = IntegerField(label='Jaar')
+    mode = ChoiceField(choices=bulk.MODE_CHOICES, label='Wijziging')
+    hours = IntegerField(label='Uren')
+
+    def clean(self):
+        if self.errors:
+            return self.cleaned_data
+        try:
+            archive.check_not_archived([self.cleaned_data['year']])
+        except archive.ArchivedYear as error:
+            raise forms.ValidationError(str(error))
+        self.changes = bulk.preview(self.cleaned_data['group'], self.cleaned_data['year'],
+                                    self.cleaned_data['mode'], self.cleaned_data['hours'])
+        invalid = bulk.invalid(self.changes)
+        if invalid:
+            raise forms.ValidationError(
+                "Het verlofsaldo wordt lager dan de uren per verlofsoort voor: {}.".format(
+                    ', '.join(change.username for change in invalid)))
+        return self.cleaned_data
@@ -0,0 +1,41 @@
+import datetime
+
+from django.core import signing
+from django.utils import timezone
+
+USER_FEED_SALT = 'registration.ical.user'
+GROUP_FEED_SALT = 'registration.ical.group'
+
+
+def feed_token(pk, salt):
+    return signing.dumps(pk, salt=salt)
+
+
+def feed_pk(token, salt):
+    return signing.loads(token, salt=salt)
+
+
+def escape(text):
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def calendar_lines(name, registrations):
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield 'PRODID:-//Yellenge//Verlof Uren//NL\r\n'
+    yield 'X-WR-CALNAME:{}\r\n'.format(escape(name))
+    for registration_id, from_date, end_date, amount_of_hours, username, first_name, last_name in registrations:
+        full_name = '{} {}'.format(first_name, last_name).strip() or username
+        yield (
+            'BEGIN:VEVENT\r\n'
+            'UID:leave-registration-{id}@verlof-uren\r\n'
+            'DTSTAMP:{stamp}\r\n'
+            'DTSTART;VALUE=DATE:{start:%Y%m%d}\r\n'
+            'DTEND;VALUE=DATE:{end:%Y%m%d}\r\n'
+            'SUMMARY:{summary}\r\n'
+            'TRANSP:TRANSPARENT\r\n'
+            'END:VEVENT\r\n'
+        ).format(id=registration_id, stamp=stamp, start=from_date, end=end_date + datetime.timedelta(days=1),
+                 summary=escape('Verlof {} ({} uur)'.format(full_name, amount_of_hours)))
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,98 @@
+import collections
+import datetime
+import functools
+import json
+import logging
+import time
+import traceback
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+VISIBILITY_TIMEOUT = 5 * 60
+RETRY_DELAY = 30
+POLL_INTERVAL = 2
+CLAIM_CANDIDATES = 10
+
+logger = logging.getLogger(__name__)
+
+ResultType = collections.namedtuple('ResultType', ['content_type', 'extension'])
+TEXT = ResultType('text/plain', 'txt')
+
+_tasks = {}
+_result_types = {}
+
+
+def task(func=None, content_type=TEXT.content_type, extension=TEXT.extension):
+    """Register func as a task; @task(content_type=..., extension=...) sets how its result is downloaded."""
+    if func is None:
+        return functools.partial(task, content_type=content_type, extension=extension)
+    name = '{}.{}'.format(func.__module__, func.__name__)
+    _tasks[name] = func
+    _result_types[name] = ResultType(content_type, extension)
+    func.task_name = name
+    func.delay = lambda created_by=None, **arguments: enqueue(name, created_by=created_by, **arguments)
+    return func
+
+
+def result_type(name):
+    # Jobs of a task that no longer exists are served as plain text.
+    return _result_types.get(name, TEXT)
+
+
+def enqueue(name, created_by=None, max_attempts=3, **arguments):
+    return Job.objects.create(task=name, arguments=json.dumps(arguments), created_by=created_by,
+                              max_attempts=max_attempts)
+
+
+def _claimable(now):
+    queued = Q(status=Job.QUEUED, run_at__lte=now)
+    expired = Q(status=Job.RUNNING, locked_until__lt=now, attempts__lt=F('max_attempts'))
+    return Job.objects.filter(queued | expired)
+
+
+def claim(visibility_timeout=VISIBILITY_TIMEOUT):
+    now = timezone.now()
+    # Jobs whose worker disappeared after the last allowed attempt will never be claimed again.
+    Job.objects.filter(status=Job.RUNNING, locked_until__lt=now, attempts__gte=F('max_attempts')) \
+        .update(status=Job.FAILED, finished_at=now, error='Visibility timeout expired')
+    candidates = _claimable(now).order_by('run_at').values_list('pk', flat=True)[:CLAIM_CANDIDATES]
+    for pk in candidates:
+        locked_until = now + datetime.timedelta(seconds=visibility_timeout)
+        claimed = _claimable(now).filter(pk=pk).update(status=Job.RUNNING, locked_until=locked_until,
+                                                       attempts=F('attempts') + 1)
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    owned = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_until=job.locked_until)
+    try:
+        result = _tasks[job.task](**json.loads(job.arguments))
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.task)
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            owned.update(status=Job.FAILED, finished_at=timezone.now(), error=error)
+        else:
+            retry_at = timezone.now() + datetime.timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+            owned.update(status=Job.QUEUED, run_at=retry_at, locked_until=None, error=error)
+        return False
+    owned.update(status=Job.DONE, finished_at=timezone.now(), result='' if result is None else str(result))
+    return True
+
+
+def work(burst=False, visibility_timeout=VISIBILITY_TIMEOUT, poll_interval=POLL_INTERVAL):
+    processed = 0
+    while True:
+        job = claim(visibility_timeout)
+        if job is not None:
+            run(job)
+            processed += 1
+        elif burst:
+            return processed
+        else:
+            time.sleep(poll_interval)
@@ -0,0 +1,129 @@
+import collections
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedEntitlement, Entitlement, LeaveRegistration, LedgerEvent, LedgerSnapshot
+
+SNAPSHOT_INTERVAL = 50
+BATCH_SIZE = 500
+
+Balance = collections.namedtuple('Balance', ['leave_hours', 'used_hours', 'remainder_hours'])
+
+
+def record(entitlement_id, leave_hours_delta=0, used_hours_delta=0, leave_registration_id=None):
+    if not leave_hours_delta and not used_hours_delta:
+        return None
+    event = LedgerEvent.objects.create(entitlement_id=entitlement_id, leave_registration_id=leave_registration_id,
+                                       recorded_at=timezone.now(), leave_hours_delta=leave_hours_delta,
+                                       used_hours_delta=used_hours_delta)
+    snapshot = latest_snapshot(entitlement_id)
+    pending = LedgerEvent.objects.filter(entitlement_id=entitlement_id,
+                                         id__gt=snapshot.last_event_id if snapshot else 0)
+    if pending.count() >= SNAPSHOT_INTERVAL:
+        take_snapshot(entitlement_id, snapshot)
+    return event
+
+
+def record_many(events):
+    events = LedgerEvent.objects.bulk_create([event for event in events
+                                              if event.leave_hours_delta or event.used_hours_delta])
+    take_due_snapshots({event.entitlement_id for event in events})
+    return events
+
+
+def take_due_snapshots(entitlement_ids):
+    """Snapshot the entitlements that have SNAPSHOT_INTERVAL or more events after their latest snapshot.
+
+    The pending events are counted in one query per batch of entitlements, so set-based writers keep the
+    number of events balance_at scans bounded just like record() does.
+    """
+    entitlement_ids = sorted(entitlement_ids)
+    last_event_id = LedgerSnapshot.objects.filter(entitlement_id=OuterRef('entitlement_id')) \
+        .order_by('-recorded_at', '-last_event_id') \
+        .values('last_event_id')[:1]
+    due = []
+    for start in range(0, len(entitlement_ids), BATCH_SIZE):
+        due += LedgerEvent.objects.filter(entitlement_id__in=entitlement_ids[start:start + BATCH_SIZE]) \
+            .annotate(snapshot_event_id=Coalesce(Subquery(last_event_id, output_field=IntegerField()), 0)) \
+            .filter(id__gt=F('snapshot_event_id')) \
+            .values('entitlement_id') \
+            .annotate(pending=Count('id')) \
+            .filter(pending__gte=SNAPSHOT_INTERVAL) \
+            .order_by() \
+            .values_list('entitlement_id', flat=True)
+    for entitlement_id in due:
+        take_snapshot(entitlement_id, latest_snapshot(entitlement_id))
+    return len(due)
+
+
+def latest_snapshot(entitlement_id, moment=None):
+    snapshots = LedgerSnapshot.objects.filter(entitlement_id=entitlement_id)
+    if moment is not None:
+        snapshots = snapshots.filter(recorded_at__lte=moment)
+    return snapshots.order_by('-recorded_at', '-last_event_id').first()
+
+
+def _events_after(entitlement_id, snapshot):
+    events = LedgerEvent.objects.filter(entitlement_id=entitlement_id)
+    if snapshot is not None:
+        events = events.filter(recorded_at__gte=snapshot.recorded_at, id__gt=snapshot.last_event_id)
+    return events
+
+
+def take_snapshot(entitlement_id, previous=None):
+    pending = _events_after(entitlement_id, previous).aggregate(
+        leave_hours=Sum('leave_hours_delta'), used_hours=Sum('used_hours_delta'),
+        last_event_id=Max('id'), recorded_at=Max('recorded_at'))
+    if pending['last_event_id'] is None:
+        return previous
+    return LedgerSnapshot.objects.create(
+        entitlement_id=entitlement_id,
+        last_event_id=pending['last_event_id'],
+        recorded_at=pending['recorded_at'],
+        leave_hours=pending['leave_hours'] + (previous.leave_hours if previous else 0),
+        used_hours=pending['used_hours'] + (previous.used_hours if previous else 0),
+    )
+
+
+def balance_at(entitlement_id, moment):
+    snapshot = latest_snapshot(entitlement_id, moment)
+    totals = _events_after(entitlement_id, snapshot).filter(recorded_at__lte=moment).totals()
+    leave_hours = totals['leave_hours'] + (snapshot.leave_hours if snapshot else 0)
+    used_hours = totals['used_hours'] + (snapshot.used_hours if snapshot else 0)
+    return Balance(leave_hours, used_hours, leave_hours - used_hours)
+
+
+@transaction.atomic
+def rebuild():
+    """Replace the ledger with one event per entitlement and per counted registration, at their current hours.
+
+    A registration's event is recorded at its created_at (or, for registrations older than that field, at the
+    last change of its entitlement), an entitlement's at its last change or its first registration, whichever is
+    earlier. Balances at earlier moments stay answerable, but earlier values of a changed row are lost. The ledger
+    of archived entitlements is history that can no longer be rebuilt, so it is kept.
+    """
+    archived_ids = ArchivedEntitlement.objects.values('id')
+    LedgerSnapshot.objects.exclude(entitlement_id__in=archived_ids).delete()
+    LedgerEvent.objects.exclude(entitlement_id__in=archived_ids).delete()
+    entitlements = Entitlement.objects.annotate(first_registration=Min('leaveregistration__created_at')) \
+        .values_list('id', 'leave_hours', 'updated_at', 'first_registration')
+    LedgerEvent.objects.bulk_create(
+        (LedgerEvent(entitlement_id=entitlement_id, leave_hours_delta=leave_hours,
+                     recorded_at=min(filter(None, (updated_at, first_registration))))
+         for entitlement_id, leave_hours, updated_at, first_registration in entitlements.iterator()),
+        batch_size=500)
+    LedgerEvent.objects.bulk_create(
+        (LedgerEvent(entitlement_id=entitlement_id, leave_registration_id=registration_id,
+                     used_hours_delta=amount_of_hours, recorded_at=created_at or updated_at)
+         for registration_id, entitlement_id, amount_of_hours, created_at, updated_at
+         in LeaveRegistration.objects.counted().values_list('id', 'entitlement_id', 'amount_of_hours', 'created_at',
+                                                            'entitlement__updated_at').iterator()),
+        batch_size=500)
+    totals = LedgerEvent.objects.exclude(entitlement_id__in=archived_ids).values('entitlement_id').annotate(
+        leave_hours=Sum('leave_hours_delta'), used_hours=Sum('used_hours_delta'),
+        last_event_id=Max('id'), recorded_at=Max('recorded_at')).order_by()
+    LedgerSnapshot.objects.bulk_create((LedgerSnapshot(**snapshot) for snapshot in totals.iterator()),
+                                       batch_size=500)
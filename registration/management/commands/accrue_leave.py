@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registration import accrual
+
+
+class Command(BaseCommand):
+    help = 'Add the monthly share of the yearly allowance to every accruing entitlement; safe to run repeatedly'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Accrue up to and including the month of this date (YYYY-MM-DD)')
+        parser.add_argument('--catch-up', action='store_true',
+                            help='Also accrue the missed months of earlier years')
+
+    def handle(self, *args, **options):
+        try:
+            today = datetime.datetime.strptime(options['date'], '%Y-%m-%d').date() if options['date'] else None
+        except ValueError:
+            raise CommandError('Invalid date "{}", use YYYY-MM-DD'.format(options['date']))
+        accrued = accrual.accrue(today, catch_up=options['catch_up'])
+        self.stdout.write('Accrued leave hours for {} entitlements'.format(accrued))
@@ -0,0 +1,18 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from registration import archive
+
+
+class Command(BaseCommand):
+    help = 'Move closed years with their leave registrations to the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=int, default=datetime.date.today().year - 1,
+                            help='Archive all years before this year (default: last year)')
+
+    def handle(self, *args, **options):
+        entitlements, registrations = archive.archive(options['before'])
+        self.stdout.write('Archived {} entitlements and {} leave registrations before {}'.format(
+            entitlements, registrations, options['before']))
@@ -0,0 +1,52 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter through absence.wsgi, so every run measures a new process as a server starts it.
+STARTUP_SCRIPT = '''
+import json, os, sys, time
+start = time.perf_counter()
+os.environ['DJANGO_SETTINGS_MODULE'] = sys.argv[1]
+from absence.wsgi import application
+ready = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[2], 'QUERY_STRING': '', 'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'wsgi.url_scheme': 'http', 'wsgi.input': sys.stdin.buffer,
+    'wsgi.errors': sys.stderr,
+}
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({'startup': ready - start, 'first_response': done - ready, 'status': statuses[0]}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure the time to the first response of a new worker process, with and without warm-up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/login/')
+
+    def run(self, mode, path):
+        environment = dict(os.environ, ABSENCE_WARM_UP='1' if mode == 'warm' else '0')
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT, os.environ.get('DJANGO_SETTINGS_MODULE', 'absence.settings'), path],
+            cwd=settings.BASE_DIR, env=environment, stdout=subprocess.PIPE, check=True,
+            universal_newlines=True).stdout
+        return json.loads(output.splitlines()[-1])
+
+    def handle(self, *args, **options):
+        for mode in ('cold', 'warm'):
+            results = [self.run(mode, options['path']) for _ in range(options['runs'])]
+            self.stdout.write('{}: startup {:.1f} ms, first response {:.1f} ms, total {:.1f} ms ({})'.format(
+                mode,
+                statistics.median(result['startup'] for result in results) * 1000,
+                statistics.median(result['first_response'] for result in results) * 1000,
+                statistics.median(result['startup'] + result['first_response'] for result in results) * 1000,
+                results[0]['status']))
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+
+from registration import archive, bulk
+
+
+class Command(BaseCommand):
+    help = 'Set or adjust the leave hours of every member of a group for one year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('group', help='Name of the group')
+        parser.add_argument('year', type=int)
+        hours = parser.add_mutually_exclusive_group(required=True)
+        hours.add_argument('--set', type=int, dest='set_hours', help='Set the leave hours to this value')
+        hours.add_argument('--adjust', type=int, dest='adjust_hours', help='Add these hours (may be negative)')
+        parser.add_argument('--dry-run', action='store_true', help='Only show the affected rows')
+
+    def handle(self, *args, **options):
+        try:
+            group = Group.objects.get(name=options['group'])
+        except Group.DoesNotExist:
+            raise CommandError('Group "{}" does not exist'.format(options['group']))
+        if options['set_hours'] is not None:
+            mode, hours = bulk.SET, options['set_hours']
+        else:
+            mode, hours = bulk.ADJUST, options['adjust_hours']
+        try:
+            archive.check_not_archived([options['year']])
+        except archive.ArchivedYear as error:
+            raise CommandError(error)
+        changes = bulk.preview(group, options['year'], mode, hours)
+        invalid = bulk.invalid(changes)
+        if invalid:
+            raise CommandError('Leave hours would drop below the hours of the other leave types for: {}'.format(
+                ', '.join(change.username for change in invalid)))
+        if options['dry_run']:
+            for change in changes:
+                self.stdout.write('{}: {} -> {}'.format(
+                    change.username, '-' if change.leave_hours is None else change.leave_hours,
+                    change.new_leave_hours))
+            return
+        created, updated = bulk.apply(group, options['year'], mode, hours)
+        self.stdout.write('Created {} and updated {} entitlements for {} in {}'.format(
+            created, updated, group.name, options['year']))
@@ -0,0 +1,90 @@
+import collections
+import datetime
+import threading
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from registration import booking
+from registration.models import Entitlement, LeaveRegistration, LedgerEvent
+
+# The claim of booking.save_leave_registration and the touch of the post_save signal.
+VERSIONS_PER_SAVE = 2
+OUTCOMES = ('saved', 'conflict', 'insufficient balance', 'database locked')
+
+
+class Command(BaseCommand):
+    help = 'Register leave from many threads at once against one entitlement and check that no update is lost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=25, help='Registrations per thread')
+        parser.add_argument('--hours', type=int, default=8)
+        parser.add_argument('--leave-hours', type=int, default=1000)
+        parser.add_argument('--prevent-overdraw', action='store_true')
+
+    def write(self, entitlement, options, outcomes, versions, lock):
+        day = datetime.date(entitlement.year, 1, 1)
+        try:
+            for _ in range(options['writes']):
+                registration = LeaveRegistration(entitlement=entitlement, from_date=day, end_date=day,
+                                                  amount_of_hours=options['hours'])
+                try:
+                    booking.save_leave_registration(registration, prevent_overdraw=options['prevent_overdraw'])
+                    outcome = 'saved'
+                except booking.InsufficientBalance:
+                    outcome = 'insufficient balance'
+                except booking.ConcurrentUpdate:
+                    outcome = 'conflict'
+                except OperationalError as error:
+                    # sqlite gives up on a write lock after its timeout; the transaction was rolled back.
+                    if 'locked' not in str(error):
+                        raise
+                    outcome = 'database locked'
+                with lock:
+                    outcomes[outcome] += 1
+                    if outcome == 'saved':
+                        versions.append(registration.claimed_version)
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        user = User.objects.create(username='load-{}'.format(uuid.uuid4().hex[:12]))
+        entitlement = Entitlement.objects.create(user=user, year=datetime.date.today().year,
+                                                 leave_hours=options['leave_hours'])
+        initial_version = Entitlement.objects.values_list('version', flat=True).get(pk=entitlement.pk)
+        outcomes, versions, lock = collections.Counter(), [], threading.Lock()
+        try:
+            threads = [threading.Thread(target=self.write, args=(entitlement, options, outcomes, versions, lock))
+                       for _ in range(options['threads'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            saved = outcomes['saved']
+            final_version, used_hours = Entitlement.objects.annotate_used_leave_hours() \
+                .values_list('version', 'used_leave_hours').get(pk=entitlement.pk)
+            ledger_hours = LedgerEvent.objects.filter(entitlement=entitlement.pk).totals()['used_hours']
+            expected_hours = saved * options['hours']
+            expected_versions = list(range(initial_version + 1, initial_version + VERSIONS_PER_SAVE * saved,
+                                           VERSIONS_PER_SAVE))
+            checks = {
+                'unique versions': len(set(versions)) == len(versions),
+                'contiguous versions': sorted(versions) == expected_versions,
+                'final version': final_version == initial_version + VERSIONS_PER_SAVE * saved,
+                'ledger': ledger_hours == expected_hours,
+            }
+            for outcome in OUTCOMES:
+                self.stdout.write('{}: {}'.format(outcome, outcomes[outcome]))
+            self.stdout.write('versions claimed: {}, final version: {} (expected {})'.format(
+                len(versions), final_version - initial_version, VERSIONS_PER_SAVE * saved))
+            self.stdout.write('used hours: {} (expected {}), ledger: {}, lost updates: {}, overdrawn: {}'.format(
+                used_hours, expected_hours, ledger_hours, abs(expected_hours - used_hours),
+                'yes' if used_hours > options['leave_hours'] else 'no'))
+        finally:
+            user.delete()
+        failed = [check for check, passed in checks.items() if not passed]
+        if failed:
+            raise CommandError('Failed checks: {}'.format(', '.join(failed)))
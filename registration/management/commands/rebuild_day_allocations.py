@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from registration import allocation
+from registration.models import DayAllocation
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the per-day allocation table from all leave registrations'
+
+    def handle(self, *args, **options):
+        allocation.rebuild()
+        self.stdout.write('Rebuilt {} day allocations'.format(DayAllocation.objects.count()))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from registration import ledger
+from registration.models import LedgerEvent, LedgerSnapshot
+
+
+class Command(BaseCommand):
+    help = ('Replace the leave ledger with events and snapshots rebuilt from the current entitlements and '
+            'registrations. Events are dated when a registration was created and when an entitlement last changed, '
+            'so balances at earlier dates no longer show earlier values of rows that changed since.')
+
+    def handle(self, *args, **options):
+        ledger.rebuild()
+        self.stdout.write('Rebuilt ledger: {} events, {} snapshots'.format(
+            LedgerEvent.objects.count(), LedgerSnapshot.objects.count()))
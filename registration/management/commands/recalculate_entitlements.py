@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from registration import archive, prorata
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the pro-rata leave hours of every user with a contract in the year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int)
+        parser.add_argument('--full-time-leave-hours', type=int,
+                            help='Yearly leave hours of a full-time contract (default: FULL_TIME_LEAVE_HOURS)')
+        parser.add_argument('--full-time-hours-per-week', type=float,
+                            help='Hours per week of a full-time contract (default: FULL_TIME_HOURS_PER_WEEK)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the changes')
+
+    def handle(self, *args, **options):
+        try:
+            recalculation = prorata.recalculate(options['year'], options['full_time_leave_hours'],
+                                                options['full_time_hours_per_week'], dry_run=options['dry_run'])
+        except (archive.ArchivedYear, prorata.InvalidLeaveHours) as error:
+            raise CommandError(error)
+        self.stdout.write('{} entitlements for {}: {} created, {} updated, {} unchanged'.format(
+            'Would recalculate' if options['dry_run'] else 'Recalculated', options['year'], *recalculation))
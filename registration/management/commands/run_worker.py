@@ -0,0 +1,31 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from registration import jobs
+
+
+def _work(options):
+    connections.close_all()
+    return jobs.work(**options)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--burst', action='store_true', help='Stop when the queue is empty')
+        parser.add_argument('--visibility-timeout', type=int, default=jobs.VISIBILITY_TIMEOUT)
+        parser.add_argument('--poll-interval', type=float, default=jobs.POLL_INTERVAL)
+
+    def handle(self, *args, **options):
+        work_options = {key: options[key] for key in ('burst', 'visibility_timeout', 'poll_interval')}
+        if options['processes'] == 1:
+            processed = [jobs.work(**work_options)]
+        else:
+            connections.close_all()
+            with multiprocessing.Pool(options['processes']) as pool:
+                processed = pool.map(_work, [work_options] * options['processes'])
+        self.stdout.write('Processed {} jobs'.format(sum(processed)))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from registration import tasks
+
+
+class Command(BaseCommand):
+    help = 'Mail the managers the days that went over the absence threshold since the last digest'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Sent {} absence alerts'.format(tasks.send_absence_digest()))
@@ -0,0 +1,30 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registration import directory
+
+
+class Command(BaseCommand):
+    help = 'Create, update and deactivate users from an LDIF, CSV or JSON directory export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(directory.READERS),
+                            help='Format of the export (default: from the file extension)')
+        parser.add_argument('--keep-missing', action='store_true',
+                            help='Do not deactivate synced users that are missing from the export')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format == 'jsonl':
+            file_format = 'json'
+        if file_format not in directory.READERS:
+            raise CommandError('Unknown format "{}", use --format'.format(file_format))
+        try:
+            with open(options['path'], encoding='utf-8', newline='') as export:
+                result = directory.sync(directory.READERS[file_format](export),
+                                        deactivate_missing=not options['keep_missing'])
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        self.stdout.write('{} created, {} updated, {} deactivated, {} unchanged'.format(*result))
@@ -0,0 +1,33 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registration import sync
+
+
+class Command(BaseCommand):
+    help = 'Create or update entitlements from a CSV (username,year,leave_hours) or JSON file of the HR system'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='A .csv or .json file, or - to read CSV from standard input')
+
+    def read(self, path):
+        if path == '-':
+            return list(csv.DictReader(sys.stdin))
+        with open(path, newline='') as records:
+            if path.endswith('.json'):
+                return json.load(records)
+            return list(csv.DictReader(records))
+
+    def handle(self, *args, **options):
+        try:
+            records = sync.parse(self.read(options['path']))
+            upsert = sync.upsert_entitlements(records)
+        except (OSError, TypeError, ValueError) as error:
+            raise CommandError(error)
+        self.stdout.write('{} created, {} updated, {} unchanged'.format(
+            upsert.created, upsert.updated, upsert.unchanged))
+        if upsert.unknown:
+            self.stderr.write('Unknown users: {}'.format(', '.join(upsert.unknown)))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0004_remove_leaveregistration_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leaveregistration',
+            name='from_date',
+            field=models.DateField(db_index=True),
+        ),
+    ]
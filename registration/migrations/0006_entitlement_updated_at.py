@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0005_leaveregistration_from_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entitlement',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
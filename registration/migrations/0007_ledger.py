@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0006_entitlement_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.IntegerField()),
+                ('recorded_at', models.DateTimeField()),
+                ('leave_hours', models.IntegerField()),
+                ('used_hours', models.IntegerField()),
+                ('entitlement', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='registration.Entitlement')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_registration_id', models.IntegerField(null=True)),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('leave_hours_delta', models.IntegerField(default=0)),
+                ('used_hours_delta', models.IntegerField(default=0)),
+                ('entitlement', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='registration.Entitlement')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ledgersnapshot',
+            index=models.Index(fields=['entitlement', 'recorded_at'], name='registratio_entitle_3821ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerevent',
+            index=models.Index(fields=['entitlement', 'recorded_at'], name='registratio_entitle_fa7791_idx'),
+        ),
+    ]
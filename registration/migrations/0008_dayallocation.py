@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('registration', '0007_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayAllocation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hours', models.IntegerField()),
+                ('leave_registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='registration.LeaveRegistration')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dayallocation',
+            index=models.Index(fields=['date', 'user'], name='registratio_date_e8098b_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0009_job'),
+    ]
+
+    operations = [
+        # Registrations made before the approval workflow existed were final, so they start out approved.
+        migrations.AddField(
+            model_name='leaveregistration',
+            name='status',
+            field=models.CharField(choices=[('requested', 'Aangevraagd'), ('approved', 'Goedgekeurd'), ('rejected', 'Afgewezen')], default='approved', max_length=10),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='leaveregistration',
+            name='status',
+            field=models.CharField(choices=[('requested', 'Aangevraagd'), ('approved', 'Goedgekeurd'), ('rejected', 'Afgewezen')], default='requested', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='leaveregistration',
+            index=models.Index(fields=['status', 'from_date'], name='registratio_status_1db8ab_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0010_leaveregistration_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entitlement',
+            name='extra_statutory_leave_hours',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='entitlement',
+            name='special_leave_hours',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='entitlement',
+            name='unpaid_leave_hours',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='leaveregistration',
+            name='leave_type',
+            field=models.CharField(choices=[('statutory', 'Wettelijk'), ('extra_statutory', 'Bovenwettelijk'), ('special', 'Bijzonder'), ('unpaid', 'Onbetaald')], default='statutory', max_length=15),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('registration', '0011_leave_types'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEntitlement',
+            fields=[
+                ('year', models.IntegerField()),
+                ('leave_hours', models.IntegerField()),
+                ('extra_statutory_leave_hours', models.IntegerField(default=0)),
+                ('special_leave_hours', models.IntegerField(default=0)),
+                ('unpaid_leave_hours', models.IntegerField(default=0)),
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('used_leave_hours', models.IntegerField()),
+                ('approved_leave_hours', models.IntegerField()),
+                ('pending_leave_hours', models.IntegerField()),
+                ('statutory_used_leave_hours', models.IntegerField()),
+                ('extra_statutory_used_leave_hours', models.IntegerField()),
+                ('special_used_leave_hours', models.IntegerField()),
+                ('unpaid_used_leave_hours', models.IntegerField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'year')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedLeaveRegistration',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('from_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('amount_of_hours', models.IntegerField()),
+                ('status', models.CharField(choices=[('requested', 'Aangevraagd'), ('approved', 'Goedgekeurd'), ('rejected', 'Afgewezen')], max_length=10)),
+                ('leave_type', models.CharField(choices=[('statutory', 'Wettelijk'), ('extra_statutory', 'Bovenwettelijk'), ('special', 'Bijzonder'), ('unpaid', 'Onbetaald')], max_length=15)),
+                ('entitlement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='registration.ArchivedEntitlement')),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:44
+
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# A copy of registration.search.user_terms as it was when this migration was written, so later changes to the
+# search code do not change what this migration does.
+def normalize(value):
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ''.join(character for character in decomposed if not unicodedata.combining(character)).lower().strip()
+
+
+def user_terms(username, first_name, last_name, email):
+    terms = {normalize(username), normalize(email)}
+    for name in (first_name, last_name):
+        terms.update(normalize(name).split())
+    terms.discard('')
+    return sorted({term[:254] for term in terms})
+
+
+def index_existing_users(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserSearchTerm = apps.get_model('registration', 'UserSearchTerm')
+    UserSearchTerm.objects.bulk_create(
+        (UserSearchTerm(user_id=user_id, term=term)
+         for user_id, username, first_name, last_name, email
+         in User.objects.values_list('id', 'username', 'first_name', 'last_name', 'email').iterator()
+         for term in user_terms(username, first_name, last_name, email)),
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('registration', '0012_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=254)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='usersearchterm',
+            index=models.Index(fields=['term', 'user'], name='registratio_term_a5afba_idx'),
+        ),
+        migrations.RunPython(index_existing_users, migrations.RunPython.noop),
+    ]
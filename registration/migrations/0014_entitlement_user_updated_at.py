@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0013_usersearchterm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entitlement',
+            index=models.Index(fields=['user', 'updated_at'], name='registratio_user_id_9f4685_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0014_entitlement_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entitlement',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
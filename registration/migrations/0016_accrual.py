@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0015_entitlement_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entitlement',
+            name='accrual_hours',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='entitlement',
+            name='accrued_months',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
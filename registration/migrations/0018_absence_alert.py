@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('registration', '0017_contract'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbsenceAlert',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('absent', models.IntegerField()),
+                ('members', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notified_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='auth.Group')),
+                ('leave_registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='registration.LeaveRegistration')),
+            ],
+        ),
+    ]
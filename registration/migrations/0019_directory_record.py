@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('registration', '0018_absence_alert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=40)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='directory_record', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-19 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0019_directory_record'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshotVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0020_balance_snapshot_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaveregistration',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+    ]
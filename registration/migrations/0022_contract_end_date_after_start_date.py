@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 16:33
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registration', '0021_leaveregistration_created_at'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='contract',
+            constraint=models.CheckConstraint(check=models.Q(('end_date__isnull', True), ('end_date__gte', django.db.models.expressions.F('start_date')), _connector='OR'), name='contract_end_date_after_start_date'),
+        ),
+    ]
@@ -1,33 +1,132 @@
-from django.contrib.auth.models import User
+import collections
+import datetime
+
+from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce, TruncWeek
+from django.utils import timezone
+
+
+LeaveTypeBalance = collections.namedtuple(
+    'LeaveTypeBalance', ['leave_type', 'label', 'leave_hours', 'used_hours', 'remainder_hours', 'expires_on'])
+
+
+def used_leave_type_hours_name(leave_type):
+    return '{}_used_leave_hours'.format(leave_type)
+
+
+def _registered_hours(**filters):
+    return Coalesce(Sum('leaveregistration__amount_of_hours',
+                        filter=Q(**{'leaveregistration__{}'.format(key): value for key, value in filters.items()})), 0)
 
 
 class EntitlementQueryset(models.QuerySet):
     def annotate_used_leave_hours(self):
-        return self.annotate(used_leave_hours=Coalesce(Sum('leaveregistration__amount_of_hours'), 0))
+        return self.annotate(used_leave_hours=_registered_hours(status__in=LeaveRegistration.COUNTED_STATUSES),
+                             approved_leave_hours=_registered_hours(status=LeaveRegistration.APPROVED),
+                             pending_leave_hours=_registered_hours(status=LeaveRegistration.REQUESTED))
+
+    def annotate_leave_type_hours(self):
+        return self.annotate(**{
+            used_leave_type_hours_name(leave_type): _registered_hours(
+                status__in=LeaveRegistration.COUNTED_STATUSES, leave_type=leave_type)
+            for leave_type, _ in LeaveRegistration.LEAVE_TYPE_CHOICES
+        })
+
+    def change_stamp(self):
+        return self.aggregate(last_update=Max('updated_at'), count=Count('id'))
+
+    def data_version(self, change_stamp=None):
+        change_stamp = change_stamp or self.change_stamp()
+        last_update = change_stamp['last_update']
+        return '{}-{}'.format(change_stamp['count'], last_update.timestamp() if last_update else 0)
+
+    def touch(self):
+        return self.update(updated_at=timezone.now(), version=F('version') + 1)
 
 
 class EntitlementManager(models.Manager.from_queryset(EntitlementQueryset)):
     pass
 
 
-class Entitlement(models.Model):
+class BaseEntitlement(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     year = models.IntegerField()
     leave_hours = models.IntegerField()
+    # The part of leave_hours for each other leave type; the rest is statutory leave.
+    extra_statutory_leave_hours = models.IntegerField(default=0)
+    special_leave_hours = models.IntegerField(default=0)
+    unpaid_leave_hours = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def get_remainder_hours(self):
+        return self.leave_hours - self.get_used_hours()
+
+    def get_leave_type_hours(self):
+        leave_type_hours = {
+            LeaveRegistration.EXTRA_STATUTORY: self.extra_statutory_leave_hours,
+            LeaveRegistration.SPECIAL: self.special_leave_hours,
+            LeaveRegistration.UNPAID: self.unpaid_leave_hours,
+        }
+        leave_type_hours[LeaveRegistration.STATUTORY] = self.leave_hours - sum(leave_type_hours.values())
+        return leave_type_hours
+
+    def get_expiry_date(self, leave_type):
+        months = LeaveRegistration.LEAVE_TYPE_EXPIRY_MONTHS[leave_type]
+        try:
+            return datetime.date(self.year + 1 + months // 12, months % 12 + 1, 1) - datetime.timedelta(days=1)
+        except (ValueError, OverflowError):
+            return None
+
+    def get_leave_type_balances(self):
+        if not hasattr(self, used_leave_type_hours_name(LeaveRegistration.STATUTORY)):
+            raise AttributeError(
+                'Used hours per leave type not available on Entitlement instance. Annotate the Entitlement query with annotate_leave_type_hours()')
+        leave_type_hours = self.get_leave_type_hours()
+        balances = []
+        for leave_type, label in LeaveRegistration.LEAVE_TYPE_CHOICES:
+            used_hours = getattr(self, used_leave_type_hours_name(leave_type))
+            balances.append(LeaveTypeBalance(leave_type, label, leave_type_hours[leave_type], used_hours,
+                                             leave_type_hours[leave_type] - used_hours,
+                                             self.get_expiry_date(leave_type)))
+        return balances
+
+    def get_color(self):
+        amount = self.get_remainder_hours()
+        if amount < 0:
+            return 'red'
+        elif amount >= 25:
+            return 'green'
+        return 'orange'
+
+
+class Entitlement(BaseEntitlement):
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Incremented by every write that changes the balance; see registration.booking.
+    version = models.PositiveIntegerField(default=0)
+    # The yearly allowance added to leave_hours in monthly shares (0: entered by hand); see registration.accrual.
+    accrual_hours = models.PositiveIntegerField(default=0)
+    accrued_months = models.PositiveSmallIntegerField(default=0)
 
     objects = EntitlementManager()
 
     class Meta:
         unique_together = ('user', 'year',)
+        indexes = [models.Index(fields=['user', 'updated_at'])]
 
     def __str__(self):
         return '<Entitlement user={user} year={year}>'.format(user=self.user, year=self.year)
 
-    def get_remainder_hours(self):
-        return self.leave_hours - self.get_used_hours()
+    def save(self, *args, **kwargs):
+        # The version only moves forward through F() updates; never write back the value of a stale instance.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'version']
+        super(Entitlement, self).save(*args, **kwargs)
 
     def get_used_hours(self):
         if not hasattr(self, 'used_leave_hours'):
@@ -35,20 +134,249 @@ class Entitlement(models.Model):
                 'used_leave_hours not available on Entitlement instance. Annotate the Entitlement query with annotate_used_leave_hours()')
         return self.used_leave_hours
 
-    def get_color(self):
-        amount = self.get_remainder_hours()
-        if amount < 0:
-            return 'red'
-        elif amount >= 25:
-            return 'green'
-        return 'orange'
+
+class LeaveRegistrationQueryset(models.QuerySet):
+    def counted(self):
+        return self.filter(status__in=LeaveRegistration.COUNTED_STATUSES)
 
 
 class LeaveRegistration(models.Model):
+    REQUESTED = 'requested'
+    APPROVED = 'approved'
+    REJECTED = 'rejected'
+    STATUS_CHOICES = (
+        (REQUESTED, 'Aangevraagd'),
+        (APPROVED, 'Goedgekeurd'),
+        (REJECTED, 'Afgewezen'),
+    )
+    COUNTED_STATUSES = (REQUESTED, APPROVED)
+    STATUTORY = 'statutory'
+    EXTRA_STATUTORY = 'extra_statutory'
+    SPECIAL = 'special'
+    UNPAID = 'unpaid'
+    LEAVE_TYPE_CHOICES = (
+        (STATUTORY, 'Wettelijk'),
+        (EXTRA_STATUTORY, 'Bovenwettelijk'),
+        (SPECIAL, 'Bijzonder'),
+        (UNPAID, 'Onbetaald'),
+    )
+    # Months after the end of the entitlement year in which the remaining hours of each type expire
+    LEAVE_TYPE_EXPIRY_MONTHS = {
+        STATUTORY: 6,
+        EXTRA_STATUTORY: 60,
+        SPECIAL: 0,
+        UNPAID: 0,
+    }
+
     entitlement = models.ForeignKey(Entitlement, on_delete=models.CASCADE)
+    from_date = models.DateField(db_index=True)
+    end_date = models.DateField()
+    amount_of_hours = models.IntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=REQUESTED)
+    leave_type = models.CharField(max_length=15, choices=LEAVE_TYPE_CHOICES, default=STATUTORY)
+    # Empty for registrations made before it was added; see registration.ledger.rebuild.
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+
+    objects = LeaveRegistrationQueryset.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'from_date'])]
+
+    def __str__(self):
+        return str(self.id)
+
+    def get_counted_hours(self):
+        return self.amount_of_hours if self.status in self.COUNTED_STATUSES else 0
+
+
+class ArchivedEntitlement(BaseEntitlement):
+    """An entitlement of a closed year, with the totals of its registrations computed when it was archived."""
+    id = models.IntegerField(primary_key=True)
+    used_leave_hours = models.IntegerField()
+    approved_leave_hours = models.IntegerField()
+    pending_leave_hours = models.IntegerField()
+    statutory_used_leave_hours = models.IntegerField()
+    extra_statutory_used_leave_hours = models.IntegerField()
+    special_used_leave_hours = models.IntegerField()
+    unpaid_used_leave_hours = models.IntegerField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('user', 'year',)
+
+    def __str__(self):
+        return '<ArchivedEntitlement user={user} year={year}>'.format(user=self.user, year=self.year)
+
+    def get_used_hours(self):
+        return self.used_leave_hours
+
+
+class ArchivedLeaveRegistration(models.Model):
+    id = models.IntegerField(primary_key=True)
+    entitlement = models.ForeignKey(ArchivedEntitlement, on_delete=models.CASCADE)
     from_date = models.DateField()
     end_date = models.DateField()
     amount_of_hours = models.IntegerField()
+    status = models.CharField(max_length=10, choices=LeaveRegistration.STATUS_CHOICES)
+    leave_type = models.CharField(max_length=15, choices=LeaveRegistration.LEAVE_TYPE_CHOICES)
 
     def __str__(self):
         return str(self.id)
+
+
+class Contract(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='contracts')
+    hours_per_week = models.DecimalField(max_digits=4, decimal_places=2)
+    start_date = models.DateField()
+    # Open-ended when empty.
+    end_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['start_date', 'end_date'])]
+        constraints = [models.CheckConstraint(check=Q(end_date__isnull=True) | Q(end_date__gte=F('start_date')),
+                                              name='contract_end_date_after_start_date')]
+
+    def clean(self):
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': 'De einddatum ligt voor de begindatum.'})
+
+    def __str__(self):
+        return '<Contract user={user} hours_per_week={hours_per_week} start_date={start_date}>'.format(
+            user=self.user, hours_per_week=self.hours_per_week, start_date=self.start_date)
+
+
+class LedgerEventQueryset(models.QuerySet):
+    def totals(self):
+        return self.aggregate(leave_hours=Coalesce(Sum('leave_hours_delta'), 0),
+                              used_hours=Coalesce(Sum('used_hours_delta'), 0))
+
+
+class LedgerEvent(models.Model):
+    entitlement = models.ForeignKey(Entitlement, on_delete=models.DO_NOTHING, db_constraint=False)
+    leave_registration_id = models.IntegerField(null=True)
+    recorded_at = models.DateTimeField(default=timezone.now)
+    leave_hours_delta = models.IntegerField(default=0)
+    used_hours_delta = models.IntegerField(default=0)
+
+    objects = LedgerEventQueryset.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['entitlement', 'recorded_at'])]
+
+    def __str__(self):
+        return '<LedgerEvent entitlement={entitlement} recorded_at={recorded_at}>'.format(
+            entitlement=self.entitlement_id, recorded_at=self.recorded_at)
+
+
+class LedgerSnapshot(models.Model):
+    entitlement = models.ForeignKey(Entitlement, on_delete=models.DO_NOTHING, db_constraint=False)
+    last_event_id = models.IntegerField()
+    recorded_at = models.DateTimeField()
+    leave_hours = models.IntegerField()
+    used_hours = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['entitlement', 'recorded_at'])]
+
+    def __str__(self):
+        return '<LedgerSnapshot entitlement={entitlement} recorded_at={recorded_at}>'.format(
+            entitlement=self.entitlement_id, recorded_at=self.recorded_at)
+
+
+class DayAllocationQueryset(models.QuerySet):
+    def between(self, from_date, end_date):
+        return self.filter(date__gte=from_date, date__lte=end_date)
+
+    def hours_per_day(self):
+        return self.values('date').annotate(hours=Sum('hours')).order_by('date')
+
+    def hours_per_week(self):
+        return self.annotate(week=TruncWeek('date')).values('week').annotate(hours=Sum('hours')).order_by('week')
+
+
+class DayAllocation(models.Model):
+    leave_registration = models.ForeignKey(LeaveRegistration, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    hours = models.IntegerField()
+
+    objects = DayAllocationQueryset.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['date', 'user'])]
+
+    def __str__(self):
+        return '<DayAllocation user={user} date={date}>'.format(user=self.user_id, date=self.date)
+
+
+class AbsenceAlert(models.Model):
+    """A day on which a saved registration brought its user's group over the absence threshold."""
+    leave_registration = models.ForeignKey(LeaveRegistration, on_delete=models.CASCADE)
+    group = models.ForeignKey(Group, on_delete=models.CASCADE)
+    date = models.DateField()
+    absent = models.IntegerField()
+    members = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set once the alert went out in a manager digest.
+    notified_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return '<AbsenceAlert group={group} date={date}>'.format(group=self.group_id, date=self.date)
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    task = models.CharField(max_length=100)
+    arguments = models.TextField(default='{}')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return '<Job task={task} status={status}>'.format(task=self.task, status=self.status)
+
+
+class BalanceSnapshotVersion(models.Model):
+    """A single row whose token changes after every balance write; see registration.balances."""
+    token = models.CharField(max_length=32)
+
+    def __str__(self):
+        return '<BalanceSnapshotVersion token={token}>'.format(token=self.token)
+
+
+class DirectoryRecord(models.Model):
+    """Marks a user as managed by the directory sync, with a hash of the attributes it last wrote."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='directory_record')
+    content_hash = models.CharField(max_length=40)
+
+    def __str__(self):
+        return '<DirectoryRecord user={user}>'.format(user=self.user_id)
+
+
+class UserSearchTerm(models.Model):
+    """A normalized (lowercase, without accents) word of a user's username, name or e-mail address."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=254)
+
+    class Meta:
+        indexes = [models.Index(fields=['term', 'user'])]
@@ -0,0 +1,94 @@
+"""Pro-rata leave hours from the contracts of every user for one year, computed in one numpy pass.
+
+A contract adds the full-time leave hours times its share of a full-time week times the part of the year it
+covers; a user's leave hours are the rounded sum over their contracts in that year.
+"""
+import collections
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import archive, balances, ledger
+from .models import Contract, Entitlement, LedgerEvent
+
+Recalculation = collections.namedtuple('Recalculation', ['created', 'updated', 'unchanged'])
+
+
+class InvalidLeaveHours(ValueError):
+    pass
+
+
+def contracts_in(year):
+    return Contract.objects.filter(Q(end_date__isnull=True) | Q(end_date__gte=datetime.date(year, 1, 1)),
+                                   start_date__lte=datetime.date(year, 12, 31))
+
+
+def compute(year, full_time_leave_hours=None, full_time_hours_per_week=None):
+    """Map the id of every user with a contract in the year to their pro-rata leave hours."""
+    if full_time_leave_hours is None:
+        full_time_leave_hours = settings.FULL_TIME_LEAVE_HOURS
+    if full_time_hours_per_week is None:
+        full_time_hours_per_week = settings.FULL_TIME_HOURS_PER_WEEK
+    rows = list(contracts_in(year).values_list('user_id', 'hours_per_week', 'start_date', 'end_date'))
+    if not rows:
+        return {}
+    user_ids, hours_per_week, start_dates, end_dates = zip(*rows)
+    first_day, last_day = np.datetime64(datetime.date(year, 1, 1)), np.datetime64(datetime.date(year, 12, 31))
+    starts = np.maximum(np.array(start_dates, dtype='datetime64[D]'), first_day)
+    ends = np.array(end_dates, dtype='datetime64[D]')
+    ends[np.isnat(ends)] = last_day
+    ends = np.minimum(ends, last_day)
+    days = (ends - starts).astype(np.int64) + 1
+    shares = np.array(hours_per_week, dtype=np.float64) / full_time_hours_per_week \
+        * days / ((last_day - first_day).astype(np.int64) + 1)
+    users, index = np.unique(np.array(user_ids, dtype=np.int64), return_inverse=True)
+    leave_hours = np.floor(np.bincount(index, weights=shares) * full_time_leave_hours + 0.5).astype(np.int64)
+    return dict(zip(users.tolist(), leave_hours.tolist()))
+
+
+@transaction.atomic
+def recalculate(year, full_time_leave_hours=None, full_time_hours_per_week=None, dry_run=False):
+    """Write the pro-rata leave hours, creating missing entitlements and updating only the ones that change.
+
+    Accruing entitlements are left alone; their leave hours grow through registration.accrual. Like a bulk change,
+    the whole recalculation is refused when it would leave someone less hours than their other leave types hold.
+    """
+    archive.check_not_archived([year])
+    leave_hours = compute(year, full_time_leave_hours, full_time_hours_per_week)
+    existing = {entitlement.user_id: entitlement for entitlement in Entitlement.objects.filter(year=year)
+                .annotate(other_leave_hours=F('extra_statutory_leave_hours') + F('special_leave_hours')
+                          + F('unpaid_leave_hours'))
+                .only('pk', 'user_id', 'leave_hours', 'accrual_hours')}
+    missing = [Entitlement(user_id=user_id, year=year, leave_hours=hours)
+               for user_id, hours in leave_hours.items() if user_id not in existing]
+    changed = [(existing[user_id], hours) for user_id, hours in leave_hours.items()
+               if user_id in existing and not existing[user_id].accrual_hours
+               and existing[user_id].leave_hours != hours]
+    invalid = [entitlement.user_id for entitlement, hours in changed if hours < entitlement.other_leave_hours]
+    if invalid:
+        raise InvalidLeaveHours("Het verlofsaldo wordt lager dan de uren per verlofsoort voor: {}.".format(
+            ', '.join(User.objects.filter(pk__in=invalid).order_by('username').values_list('username', flat=True))))
+    recalculation = Recalculation(len(missing), len(changed), len(leave_hours) - len(missing) - len(changed))
+    if dry_run or not (missing or changed):
+        return recalculation
+    events = [LedgerEvent(entitlement_id=entitlement.pk, leave_hours_delta=hours - entitlement.leave_hours)
+              for entitlement, hours in changed]
+    now = timezone.now()
+    for entitlement, hours in changed:
+        entitlement.leave_hours, entitlement.updated_at, entitlement.version = hours, now, F('version') + 1
+    Entitlement.objects.bulk_update([entitlement for entitlement, _ in changed],
+                                    ['leave_hours', 'updated_at', 'version'])
+    Entitlement.objects.bulk_create(missing)
+    if missing:
+        # Not every backend returns the primary keys of bulk-created rows.
+        created_ids = dict(Entitlement.objects.filter(year=year).values_list('user_id', 'pk'))
+        events += [LedgerEvent(entitlement_id=created_ids[entitlement.user_id],
+                               leave_hours_delta=entitlement.leave_hours) for entitlement in missing]
+    ledger.record_many(events)
+    balances.bump_on_commit()
+    return recalculation
@@ -0,0 +1,64 @@
+"""Prefix search on users through an indexed table of normalized terms.
+
+A prefix match is a range scan on the index (term >= prefix and term < prefix + the highest code point), which
+works on every database and does not depend on LIKE being able to use the index.
+"""
+import unicodedata
+
+from django.contrib.auth.models import User
+from django.db.models import IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Entitlement, LeaveRegistration, UserSearchTerm
+
+HIGHEST_CHARACTER = '\U0010ffff'
+TYPEAHEAD_LIMIT = 10
+
+
+def normalize(value):
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ''.join(character for character in decomposed if not unicodedata.combining(character)).lower().strip()
+
+
+def user_terms(username, first_name, last_name, email):
+    terms = {normalize(username), normalize(email)}
+    for name in (first_name, last_name):
+        terms.update(normalize(name).split())
+    terms.discard('')
+    max_length = UserSearchTerm._meta.get_field('term').max_length
+    return sorted({term[:max_length] for term in terms})
+
+
+def index_users(users):
+    users = list(users)
+    UserSearchTerm.objects.filter(user__in=[user.pk for user in users]).delete()
+    UserSearchTerm.objects.bulk_create(
+        (UserSearchTerm(user_id=user.pk, term=term)
+         for user in users for term in user_terms(user.username, user.first_name, user.last_name, user.email)),
+        batch_size=500)
+
+
+def matching_users(query, queryset=None):
+    queryset = User.objects.all() if queryset is None else queryset
+    for token in normalize(query).split():
+        terms = UserSearchTerm.objects.filter(term__gte=token, term__lt=token + HIGHEST_CHARACTER)
+        queryset = queryset.filter(pk__in=terms.values('user_id'))
+    return queryset
+
+
+def typeahead(query, year, limit=TYPEAHEAD_LIMIT):
+    if not normalize(query):
+        return []
+    leave_hours = Entitlement.objects.filter(user=OuterRef('pk'), year=year).values('leave_hours')
+    used_hours = LeaveRegistration.objects.counted() \
+        .filter(entitlement__user=OuterRef('pk'), entitlement__year=year) \
+        .order_by() \
+        .values('entitlement__user') \
+        .annotate(total=Sum('amount_of_hours')) \
+        .values('total')
+    used_hours = Coalesce(Subquery(used_hours, output_field=IntegerField()), 0)
+    return list(matching_users(query)
+                .annotate(leave_hours=Subquery(leave_hours), used_leave_hours=used_hours)
+                .order_by('username')
+                .values('id', 'username', 'first_name', 'last_name', 'email', 'leave_hours', 'used_leave_hours')
+                [:limit])
@@ -0,0 +1,49 @@
+"""Remaining leave hours over a year, as running totals computed by the database.
+
+One query per user or group: the entitlements are joined with their counted registrations, and a window sum of
+the hours, ordered by from_date, gives the used hours after every leave date. Registrations on the same date are
+peers in the window, so they share one point.
+"""
+import collections
+
+from django.core.cache import cache
+from django.db.models import F, FilteredRelation, Q, Sum, Window
+from django.db.models.functions import Coalesce
+
+from .models import LeaveRegistration
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+BalanceSeries = collections.namedtuple('BalanceSeries', ['user_id', 'username', 'year', 'leave_hours', 'dates',
+                                                         'remainder_hours'])
+
+
+def _rows(entitlements):
+    counted = FilteredRelation('leaveregistration',
+                               condition=Q(leaveregistration__status__in=LeaveRegistration.COUNTED_STATUSES))
+    used_hours = Window(Sum(Coalesce('counted__amount_of_hours', 0)), partition_by=[F('pk')],
+                        order_by=F('counted__from_date').asc())
+    return entitlements.annotate(counted=counted) \
+        .annotate(remainder_hours=F('leave_hours') - used_hours) \
+        .order_by('user__username', 'pk', 'counted__from_date') \
+        .values_list('pk', 'user_id', 'user__username', 'year', 'leave_hours', 'counted__from_date',
+                     'remainder_hours')
+
+
+def get_balance_series(entitlements, scope):
+    """The series of every entitlement in the queryset, cached per scope until their data version changes."""
+    key = 'balance-series:{}:{}'.format(scope, entitlements.data_version())
+    series = cache.get(key)
+    if series is None:
+        series = collections.OrderedDict()
+        for pk, user_id, username, year, leave_hours, from_date, remainder_hours in _rows(entitlements):
+            entitlement = series.setdefault(pk, BalanceSeries(user_id, username, year, leave_hours, [], []))
+            if from_date is None:
+                continue
+            if entitlement.dates and entitlement.dates[-1] == from_date:
+                continue
+            entitlement.dates.append(from_date)
+            entitlement.remainder_hours.append(remainder_hours)
+        series = list(series.values())
+        cache.set(key, series, CACHE_TIMEOUT)
+    return series
@@ -0,0 +1,81 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import allocation, balances, ledger, search
+from .models import Entitlement, LeaveRegistration
+
+
+@receiver(post_save, sender=LeaveRegistration)
+@receiver(post_delete, sender=LeaveRegistration)
+def touch_entitlement(sender, instance, **kwargs):
+    entitlement_ids = {instance.entitlement_id}
+    previous = getattr(instance, '_previous', None)
+    if previous:
+        entitlement_ids.add(previous['entitlement_id'])
+    Entitlement.objects.filter(pk__in=entitlement_ids).touch()
+
+
+@receiver(post_save, sender=Entitlement)
+def bump_entitlement_version(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        Entitlement.objects.filter(pk=instance.pk).update(version=F('version') + 1)
+
+
+@receiver(post_save, sender=Entitlement)
+@receiver(post_delete, sender=Entitlement)
+@receiver(post_save, sender=LeaveRegistration)
+@receiver(post_delete, sender=LeaveRegistration)
+def invalidate_balances(sender, **kwargs):
+    balances.bump_on_commit()
+
+
+@receiver(pre_save, sender=LeaveRegistration)
+def remember_previous_leave_registration(sender, instance, **kwargs):
+    instance._previous = LeaveRegistration.objects.filter(pk=instance.pk) \
+        .values('entitlement_id', 'amount_of_hours', 'status').first() if instance.pk else None
+
+
+@receiver(post_save, sender=LeaveRegistration)
+def record_leave_registration(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    previous_hours = LeaveRegistration(**previous).get_counted_hours() if previous else 0
+    if previous and previous['entitlement_id'] != instance.entitlement_id:
+        ledger.record(previous['entitlement_id'], used_hours_delta=-previous_hours, leave_registration_id=instance.pk)
+        previous_hours = 0
+    ledger.record(instance.entitlement_id, used_hours_delta=instance.get_counted_hours() - previous_hours,
+                  leave_registration_id=instance.pk)
+
+
+@receiver(post_save, sender=LeaveRegistration)
+def allocate_leave_registration(sender, instance, **kwargs):
+    allocation.sync(instance.pk)
+
+
+@receiver(post_delete, sender=LeaveRegistration)
+def record_leave_registration_delete(sender, instance, **kwargs):
+    ledger.record(instance.entitlement_id, used_hours_delta=-instance.get_counted_hours(),
+                  leave_registration_id=instance.pk)
+
+
+@receiver(pre_save, sender=Entitlement)
+def remember_previous_entitlement(sender, instance, **kwargs):
+    instance._previous_leave_hours = Entitlement.objects.filter(pk=instance.pk) \
+        .values_list('leave_hours', flat=True).first() if instance.pk else None
+
+
+@receiver(post_save, sender=Entitlement)
+def record_entitlement(sender, instance, **kwargs):
+    previous_leave_hours = getattr(instance, '_previous_leave_hours', None) or 0
+    ledger.record(instance.pk, leave_hours_delta=instance.leave_hours - previous_leave_hours)
+
+
+@receiver(post_delete, sender=Entitlement)
+def record_entitlement_delete(sender, instance, **kwargs):
+    ledger.record(instance.pk, leave_hours_delta=-instance.leave_hours)
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, **kwargs):
+    search.index_users([instance])
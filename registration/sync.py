@@ -0,0 +1,70 @@
+"""Write the entitlements from the HR system, the source of truth for leave hours, in a fixed number of queries.
+
+The usernames are resolved with one query and the existing rows read with another; missing rows are created with
+one bulk_create and changed rows rewritten with one bulk_update, so sending the same batch again changes nothing.
+"""
+import collections
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import archive, balances, ledger
+from .models import Entitlement, LedgerEvent
+
+BATCH_SIZE = 1000
+
+Record = collections.namedtuple('Record', ['username', 'year', 'leave_hours'])
+Upsert = collections.namedtuple('Upsert', ['created', 'updated', 'unchanged', 'unknown'])
+
+
+def parse(rows):
+    """Records from mappings with a username, year and leave_hours; the last record for a user and year wins."""
+    records = {}
+    for row in rows:
+        try:
+            record = Record(str(row['username']), int(row['year']), int(row['leave_hours']))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Invalid record: {!r}'.format(row))
+        records[record.username, record.year] = record
+    return list(records.values())
+
+
+@transaction.atomic
+def upsert_entitlements(records):
+    usernames = {record.username for record in records}
+    user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+    records = [record for record in records if record.username in user_ids]
+    archive.check_not_archived({record.year for record in records})
+    existing = {(entitlement.user_id, entitlement.year): entitlement for entitlement in Entitlement.objects
+                .filter(user_id__in=user_ids.values(), year__in={record.year for record in records})
+                .only('pk', 'user_id', 'year', 'leave_hours')}
+    missing, changed, events = [], [], []
+    now = timezone.now()
+    for record in records:
+        entitlement = existing.get((user_ids[record.username], record.year))
+        if entitlement is None:
+            missing.append(Entitlement(user_id=user_ids[record.username], year=record.year,
+                                       leave_hours=record.leave_hours))
+        elif entitlement.leave_hours != record.leave_hours:
+            events.append(LedgerEvent(entitlement_id=entitlement.pk,
+                                      leave_hours_delta=record.leave_hours - entitlement.leave_hours))
+            entitlement.leave_hours, entitlement.updated_at, entitlement.version = \
+                record.leave_hours, now, F('version') + 1
+            changed.append(entitlement)
+    Entitlement.objects.bulk_update(changed, ['leave_hours', 'updated_at', 'version'], batch_size=BATCH_SIZE)
+    Entitlement.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+    if missing:
+        # Not every backend returns the primary keys of bulk-created rows.
+        created_ids = {(user_id, year): pk for user_id, year, pk in Entitlement.objects
+                       .filter(user_id__in={entitlement.user_id for entitlement in missing},
+                               year__in={entitlement.year for entitlement in missing})
+                       .values_list('user_id', 'year', 'pk')}
+        events += [LedgerEvent(entitlement_id=created_ids[entitlement.user_id, entitlement.year],
+                               leave_hours_delta=entitlement.leave_hours) for entitlement in missing]
+    if events:
+        ledger.record_many(events)
+        balances.bump_on_commit()
+    return Upsert(len(missing), len(changed), len(records) - len(missing) - len(changed),
+                  sorted(usernames - set(user_ids)))
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+
+from django.core.mail import mail_managers
+from django.utils import timezone
+
+from .forecast import get_year_forecast
+from .jobs import task
+from .models import AbsenceAlert, Entitlement, LeaveRegistration
+
+
+@task
+def notify_leave_registration(leave_registration_id):
+    registration = LeaveRegistration.objects.select_related('entitlement__user') \
+        .filter(pk=leave_registration_id).first()
+    if registration is None:
+        return None
+    user = registration.entitlement.user
+    mail_managers(
+        'Verlof ingevoerd door {}'.format(user.get_full_name() or user.username),
+        '{} heeft {} uur verlof ingevoerd van {:%d-%m-%Y} tot en met {:%d-%m-%Y}.'.format(
+            user.get_full_name() or user.username, registration.amount_of_hours, registration.from_date,
+            registration.end_date),
+    )
+    return None
+
+
+@task
+def send_absence_digest():
+    alerts = list(AbsenceAlert.objects.filter(notified_at__isnull=True)
+                  .select_related('group', 'leave_registration__entitlement__user')
+                  .order_by('group__name', 'date', 'created_at'))
+    if not alerts:
+        return 0
+    lines = []
+    for alert in alerts:
+        user = alert.leave_registration.entitlement.user
+        lines.append('{}: {:%d-%m-%Y} {} van {} medewerkers afwezig na verlof van {}.'.format(
+            alert.group.name, alert.date, alert.absent, alert.members, user.get_full_name() or user.username))
+    mail_managers('Piekafwezigheid op {} dagen'.format(len({(alert.group_id, alert.date) for alert in alerts})),
+                  '\n'.join(lines))
+    AbsenceAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(notified_at=timezone.now())
+    return len(alerts)
+
+
+@task(content_type='application/json', extension='json')
+def compute_year_forecast(year):
+    return json.dumps(get_year_forecast(year)['organisation'])
+
+
+@task(content_type='text/csv', extension='csv')
+def export_year_entitlements(year):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['username', 'year', 'leave_hours', 'used_leave_hours'])
+    writer.writerows(Entitlement.objects.filter(year=year).annotate_used_leave_hours().order_by('user__username')
+                     .values_list('user__username', 'year', 'leave_hours', 'used_leave_hours').iterator())
+    return output.getvalue()
@@ -0,0 +1,50 @@
+import datetime
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from model_mommy import mommy
+
+from registration import accrual
+from registration.models import Entitlement, LedgerEvent
+
+
+class AccrualTest(TestCase):
+    def setUp(self):
+        self.current = Entitlement.objects.create(user=mommy.make(User), year=2026, leave_hours=0, accrual_hours=200)
+        self.previous = Entitlement.objects.create(user=self.current.user, year=2025, leave_hours=0,
+                                                   accrual_hours=200, accrued_months=10)
+        self.manual = Entitlement.objects.create(user=mommy.make(User), year=2026, leave_hours=160)
+
+    def leave_hours(self, entitlement):
+        entitlement.refresh_from_db()
+        return entitlement.leave_hours, entitlement.accrued_months
+
+    def test_accrues_missed_months_in_one_pass(self):
+        self.assertEqual(accrual.accrue(datetime.date(2026, 3, 15)), 1)
+        self.assertEqual(self.leave_hours(self.current), (50, 3))
+        self.assertEqual(self.leave_hours(self.previous), (0, 10))
+        self.assertEqual(self.leave_hours(self.manual), (160, 0))
+        self.assertEqual(LedgerEvent.objects.filter(entitlement=self.current).totals()['leave_hours'], 50)
+
+    def test_rerun_adds_nothing(self):
+        accrual.accrue(datetime.date(2026, 3, 1))
+        self.assertEqual(accrual.accrue(datetime.date(2026, 3, 31)), 0)
+        self.assertEqual(self.leave_hours(self.current), (50, 3))
+
+    def test_twelve_months_add_up_to_the_allowance(self):
+        for month in range(1, 13):
+            accrual.accrue(datetime.date(2026, month, 1))
+        self.assertEqual(self.leave_hours(self.current), (200, 12))
+        self.assertEqual(LedgerEvent.objects.filter(entitlement=self.current).count(), 12)
+
+    def test_catch_up_finishes_earlier_years(self):
+        self.assertEqual(accrual.accrue(datetime.date(2026, 1, 1), catch_up=True), 2)
+        self.assertEqual(self.leave_hours(self.previous), (34, 12))
+        self.assertEqual(self.leave_hours(self.current), (16, 1))
+
+    def test_command(self):
+        stdout = io.StringIO()
+        call_command('accrue_leave', '--date=2026-02-01', '--catch-up', stdout=stdout)
+        self.assertEqual(stdout.getvalue(), 'Accrued leave hours for 2 entitlements\n')
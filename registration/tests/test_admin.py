@@ -0,0 +1,67 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from registration.models import Entitlement, LeaveRegistration
+
+
+class EntitlementAdminTests(TestCase):
+    fixtures = ['users.json']
+
+    def setUp(self):
+        self.client.login(username='employer', password='employeremployer')
+        self.user = User.objects.get(username='employee')
+        self.entitlement = mommy.make(Entitlement, user=self.user, year=2019, leave_hours=100)
+        today = datetime.date(2019, 5, 1)
+        mommy.make(LeaveRegistration, entitlement=self.entitlement, from_date=today, end_date=today,
+                   amount_of_hours=8)
+
+    def test_changelist_shows_used_and_remaining(self):
+        response = self.client.get(reverse('admin:registration_entitlement_changelist'))
+        self.assertEqual(response.status_code, 200)
+        entitlement = response.context['cl'].result_list[0]
+        self.assertEqual(entitlement.used_leave_hours, 8)
+        self.assertEqual(entitlement.remainder_leave_hours, 92)
+
+    def test_changelist_filter_on_username(self):
+        other = mommy.make(Entitlement, user=User.objects.get(username='nonuser'), year=2019)
+        response = self.client.get(reverse('admin:registration_entitlement_changelist'), {'username': 'emp'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.entitlement, response.context['cl'].result_list)
+        self.assertNotIn(other, response.context['cl'].result_list)
+
+    def test_adjust_leave_hours(self):
+        response = self.client.post(reverse('admin:registration_entitlement_changelist'), {
+            'action': 'adjust_leave_hours', 'hours': '8', '_selected_action': [self.entitlement.pk]})
+        self.assertEqual(response.status_code, 302)
+        self.entitlement.refresh_from_db()
+        self.assertEqual(self.entitlement.leave_hours, 108)
+
+    def test_adjust_leave_hours_without_hours(self):
+        self.client.post(reverse('admin:registration_entitlement_changelist'), {
+            'action': 'adjust_leave_hours', 'hours': '', '_selected_action': [self.entitlement.pk]})
+        self.entitlement.refresh_from_db()
+        self.assertEqual(self.entitlement.leave_hours, 100)
+
+    def test_export_csv(self):
+        response = self.client.post(reverse('admin:registration_entitlement_changelist'), {
+            'action': 'export_csv', '_selected_action': [self.entitlement.pk]})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response.content.decode().splitlines()[1], 'employee,2019,100,8,92')
+
+
+class LeaveRegistrationAdminTests(TestCase):
+    fixtures = ['users.json']
+
+    def test_changelist_date_hierarchy(self):
+        self.client.login(username='employer', password='employeremployer')
+        entitlement = mommy.make(Entitlement, user=User.objects.get(username='employee'), year=2019)
+        day = datetime.date(2019, 5, 1)
+        mommy.make(LeaveRegistration, entitlement=entitlement, from_date=day, end_date=day)
+        response = self.client.get(reverse('admin:registration_leaveregistration_changelist'),
+                                   {'from_date__year': 2019, 'username': 'employee'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 1)
@@ -0,0 +1,56 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from model_mommy import mommy
+
+from registration import allocation
+from registration.models import DayAllocation, Entitlement, LeaveRegistration
+
+
+class AllocationTest(TestCase):
+    def setUp(self):
+        self.user = mommy.make(User)
+        self.entitlement = mommy.make(Entitlement, user=self.user, year=2019, leave_hours=100)
+
+    def make_registration(self, from_date, end_date, hours):
+        return LeaveRegistration.objects.create(entitlement=self.entitlement, from_date=from_date,
+                                                end_date=end_date, amount_of_hours=hours)
+
+    def test_leave_days_skips_weekend(self):
+        days = allocation.leave_days(datetime.date(2019, 3, 1), datetime.date(2019, 3, 4))
+        self.assertEqual(days, [datetime.date(2019, 3, 1), datetime.date(2019, 3, 4)])
+
+    def test_leave_days_only_weekend(self):
+        days = allocation.leave_days(datetime.date(2019, 3, 2), datetime.date(2019, 3, 3))
+        self.assertEqual(days, [datetime.date(2019, 3, 2), datetime.date(2019, 3, 3)])
+
+    def test_allocate_spreads_remainder(self):
+        allocations = allocation.allocate(1, self.user.pk, datetime.date(2019, 3, 4), datetime.date(2019, 3, 6), 20)
+        self.assertEqual([day.hours for day in allocations], [7, 7, 6])
+
+    def test_kept_in_sync(self):
+        registration = self.make_registration(datetime.date(2019, 3, 4), datetime.date(2019, 3, 8), 40)
+        self.assertEqual(DayAllocation.objects.filter(leave_registration=registration).count(), 5)
+        registration.end_date = datetime.date(2019, 3, 5)
+        registration.amount_of_hours = 16
+        registration.save()
+        self.assertEqual(list(DayAllocation.objects.values_list('date', 'hours').order_by('date')),
+                         [(datetime.date(2019, 3, 4), 8), (datetime.date(2019, 3, 5), 8)])
+        registration.delete()
+        self.assertFalse(DayAllocation.objects.exists())
+
+    def test_hours_per_day_and_week(self):
+        self.make_registration(datetime.date(2019, 3, 4), datetime.date(2019, 3, 12), 56)
+        per_day = DayAllocation.objects.between(datetime.date(2019, 3, 11), datetime.date(2019, 3, 11)).hours_per_day()
+        self.assertEqual(list(per_day), [{'date': datetime.date(2019, 3, 11), 'hours': 8}])
+        per_week = DayAllocation.objects.hours_per_week()
+        self.assertEqual([week['hours'] for week in per_week], [40, 16])
+
+    def test_rebuild_command(self):
+        self.make_registration(datetime.date(2019, 3, 4), datetime.date(2019, 3, 5), 16)
+        DayAllocation.objects.all().delete()
+        call_command('rebuild_day_allocations', stdout=mock.Mock())
+        self.assertEqual(DayAllocation.objects.filter(user=self.user).count(), 2)
@@ -0,0 +1,122 @@
+import datetime
+
+from django.contrib.auth.models import Group, User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from model_mommy import mommy
+
+from registration import approval, ledger
+from registration.models import DayAllocation, Entitlement, LeaveRegistration
+
+
+class ApprovalTest(TestCase):
+    def setUp(self):
+        self.user = mommy.make(User)
+        self.entitlement = mommy.make(Entitlement, user=self.user, year=2019, leave_hours=100)
+        self.day = datetime.date(2019, 3, 4)
+
+    def make_registration(self, hours, status=LeaveRegistration.REQUESTED):
+        return LeaveRegistration.objects.create(entitlement=self.entitlement, from_date=self.day, end_date=self.day,
+                                                amount_of_hours=hours, status=status)
+
+    def get_entitlement(self):
+        return Entitlement.objects.annotate_used_leave_hours().get(pk=self.entitlement.pk)
+
+    def test_annotations_split_approved_and_pending(self):
+        self.make_registration(8, LeaveRegistration.APPROVED)
+        self.make_registration(4)
+        self.make_registration(2, LeaveRegistration.REJECTED)
+        entitlement = self.get_entitlement()
+        self.assertEqual(entitlement.approved_leave_hours, 8)
+        self.assertEqual(entitlement.pending_leave_hours, 4)
+        self.assertEqual(entitlement.get_used_hours(), 12)
+        self.assertEqual(entitlement.get_remainder_hours(), 88)
+
+    def test_approve(self):
+        registrations = [self.make_registration(8) for _ in range(3)]
+        with self.assertNumQueries(5):
+            self.assertEqual(approval.decide(LeaveRegistration.objects.all(), LeaveRegistration.APPROVED), 3)
+        self.assertEqual(self.get_entitlement().approved_leave_hours, 24)
+        self.assertEqual(DayAllocation.objects.filter(leave_registration__in=registrations).count(), 3)
+
+    def test_reject_keeps_balances_consistent(self):
+        self.make_registration(8)
+        rejected = self.make_registration(4)
+        approval.decide(LeaveRegistration.objects.filter(pk=rejected.pk), LeaveRegistration.REJECTED)
+        self.assertEqual(self.get_entitlement().get_used_hours(), 8)
+        self.assertEqual(ledger.balance_at(self.entitlement.pk, timezone.now()).used_hours, 8)
+        self.assertFalse(DayAllocation.objects.filter(leave_registration=rejected).exists())
+
+    def test_only_pending_registrations_are_decided(self):
+        approved = self.make_registration(8, LeaveRegistration.APPROVED)
+        self.assertEqual(approval.decide(LeaveRegistration.objects.all(), LeaveRegistration.REJECTED), 0)
+        approved.refresh_from_db()
+        self.assertEqual(approved.status, LeaveRegistration.APPROVED)
+
+
+class LeaveRegistrationApprovalListTests(TestCase):
+    fixtures = ['users.json']
+
+    def setUp(self):
+        self.employee = User.objects.get(username='employee')
+        self.entitlement = mommy.make(Entitlement, user=self.employee, year=2019, leave_hours=100)
+        day = datetime.date(2019, 3, 4)
+        self.registration = LeaveRegistration.objects.create(entitlement=self.entitlement, from_date=day,
+                                                             end_date=day, amount_of_hours=8)
+
+    def test_logged_in_no_permission(self):
+        self.client.login(username='nonuser', password='nonusernonuser')
+        response = self.client.get(reverse('leave-registration-approval-list'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_list_per_group(self):
+        self.client.login(username='employer', password='employeremployer')
+        employee_group = Group.objects.get(name='Employee')
+        employer_group = Group.objects.get(name='Employer')
+        url = reverse('leave-registration-approval-list')
+        response = self.client.get(url, {'group': employee_group.pk})
+        self.assertQuerysetEqual(response.context['leaveregistration_list'], [repr(self.registration)])
+        response = self.client.get(url, {'group': employer_group.pk})
+        self.assertQuerysetEqual(response.context['leaveregistration_list'], [])
+
+    def test_invalid_group_selects_nothing(self):
+        self.client.login(username='employer', password='employeremployer')
+        url = reverse('leave-registration-approval-list')
+        for group in ('abc', '0'):
+            response = self.client.get(url, {'group': group})
+            self.assertEqual(response.status_code, 200)
+            self.assertQuerysetEqual(response.context['leaveregistration_list'], [])
+        self.client.post('{}?group=abc'.format(url), {'decision': 'reject', 'all': 'on'})
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.status, LeaveRegistration.REQUESTED)
+
+    def test_approve_selection(self):
+        self.client.login(username='employer', password='employeremployer')
+        response = self.client.post(reverse('leave-registration-approval-list'),
+                                    {'decision': 'approve', 'leave_registration': [self.registration.pk]})
+        self.assertEqual(response.status_code, 302)
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.status, LeaveRegistration.APPROVED)
+
+    def test_invalid_ids_are_ignored(self):
+        self.client.login(username='employer', password='employeremployer')
+        response = self.client.post(reverse('leave-registration-approval-list'),
+                                    {'decision': 'approve', 'leave_registration': ['abc', '', self.registration.pk]})
+        self.assertEqual(response.status_code, 302)
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.status, LeaveRegistration.APPROVED)
+
+    def test_reject_all(self):
+        self.client.login(username='employer', password='employeremployer')
+        self.client.post(reverse('leave-registration-approval-list'), {'decision': 'reject', 'all': 'on'})
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.status, LeaveRegistration.REJECTED)
+
+    def test_employee_edit_needs_new_approval(self):
+        LeaveRegistration.objects.filter(pk=self.registration.pk).update(status=LeaveRegistration.APPROVED)
+        self.client.login(username='employee', password='employeeemployee')
+        self.client.post(reverse('leave-registration-update', kwargs={'pk': self.registration.pk}),
+                         {'from_date': '2019-03-04', 'end_date': '2019-03-04', 'amount_of_hours': '16'})
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.status, LeaveRegistration.REQUESTED)
@@ -0,0 +1,105 @@
+import datetime
+import io
+
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from model_mommy import mommy
+
+from registration import archive, bulk, ledger, prorata, sync
+from registration.models import ArchivedEntitlement, ArchivedLeaveRegistration, Contract, Entitlement, \
+    LeaveRegistration, LedgerEvent
+
+
+class ArchiveTest(TestCase):
+    fixtures = ['users.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='employer')
+        self.old = Entitlement.objects.create(user=self.user, year=2017, leave_hours=100, special_leave_hours=8)
+        self.current = Entitlement.objects.create(user=self.user, year=2019, leave_hours=100)
+        for entitlement, leave_type, status in ((self.old, LeaveRegistration.STATUTORY, LeaveRegistration.APPROVED),
+                                                (self.old, LeaveRegistration.SPECIAL, LeaveRegistration.REQUESTED),
+                                                (self.current, LeaveRegistration.STATUTORY,
+                                                 LeaveRegistration.APPROVED)):
+            day = datetime.date(entitlement.year, 5, 1)
+            LeaveRegistration.objects.create(entitlement=entitlement, from_date=day, end_date=day, amount_of_hours=8,
+                                             leave_type=leave_type, status=status)
+
+    def archive(self):
+        stdout = io.StringIO()
+        call_command('archive_years', before=2019, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_archive_moves_closed_years(self):
+        self.assertEqual(self.archive(), 'Archived 1 entitlements and 2 leave registrations before 2019\n')
+        self.assertEqual(list(Entitlement.objects.values_list('year', flat=True)), [2019])
+        self.assertEqual(LeaveRegistration.objects.count(), 1)
+        archived = ArchivedEntitlement.objects.get()
+        self.assertEqual((archived.pk, archived.used_leave_hours, archived.approved_leave_hours,
+                          archived.pending_leave_hours, archived.special_used_leave_hours), (self.old.pk, 16, 8, 8, 8))
+        self.assertEqual(ArchivedLeaveRegistration.objects.filter(entitlement=archived).count(), 2)
+
+    def test_ledger_of_archived_years_is_kept(self):
+        self.archive()
+        self.assertEqual(ledger.balance_at(self.old.pk, timezone.now()), (100, 16, 84))
+        ledger.rebuild()
+        self.assertEqual(ledger.balance_at(self.old.pk, timezone.now()), (100, 16, 84))
+        self.assertEqual(ledger.balance_at(self.current.pk, timezone.now()), (100, 8, 92))
+        self.assertEqual(LedgerEvent.objects.filter(entitlement_id=self.old.pk).count(), 3)
+        self.client.login(username='employer', password='employeremployer')
+        url = reverse('admin-entitlement-detail', kwargs={'user_id': self.user.pk, 'year': 2017})
+        response = self.client.get(url, {'balance_date': timezone.localdate().isoformat()})
+        self.assertEqual(response.context['balance_at'], (100, 16, 84))
+
+    def test_archive_runs_a_fixed_number_of_queries(self):
+        LeaveRegistration.objects.bulk_create(
+            LeaveRegistration(entitlement=self.old, from_date=datetime.date(2017, 6, day),
+                              end_date=datetime.date(2017, 6, day), amount_of_hours=1) for day in range(1, 21))
+        # Two savepoints, the totals, two inserts, the registrations to copy and four deletes.
+        with self.assertNumQueries(10):
+            self.archive()
+        self.assertEqual(ArchivedLeaveRegistration.objects.count(), 22)
+
+    def test_archived_years_cannot_be_written_again(self):
+        self.archive()
+        self.client.login(username='employer', password='employeremployer')
+        response = self.client.post(reverse('admin-entitlement-create', kwargs={'user_id': self.user.pk}),
+                                    {'year': 2017, 'leave_hours': 100})
+        self.assertContains(response, 'Er zijn al verlofuren voor dit jaar ingevuld.')
+        group = Group.objects.create(name='Support')
+        group.user_set.add(self.user)
+        mommy.make(Contract, user=self.user, hours_per_week=40, start_date=datetime.date(2017, 1, 1))
+        for write in (lambda: bulk.apply(group, 2017, bulk.SET, 200), lambda: prorata.recalculate(2017),
+                      lambda: sync.upsert_entitlements([sync.Record(self.user.username, 2017, 200)])):
+            with self.assertRaises(archive.ArchivedYear):
+                write()
+        self.assertEqual(list(Entitlement.objects.values_list('year', flat=True)), [2019])
+
+    def test_entitlement_list_shows_archived_years(self):
+        self.archive()
+        self.client.login(username='employer', password='employeremployer')
+        response = self.client.get(reverse('entitlement-list'))
+        self.assertEqual([(entitlement.year, entitlement.get_remainder_hours())
+                          for entitlement in response.context_data['all_entitlements']], [(2017, 84), (2019, 92)])
+
+    def test_entitlement_detail_reads_through(self):
+        self.archive()
+        self.client.login(username='employer', password='employeremployer')
+        response = self.client.get(reverse('entitlement-detail', kwargs={'year': 2017}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(response.context['entitlement'].get_used_hours(), 16)
+        self.assertEqual(len(response.context['all_leave_registrations']), 2)
+        self.assertEqual([entitlement.year for entitlement in response.context['all_entitlements']], [2017, 2019])
+        self.assertNotContains(response, 'leave_registration/{}/update'.format(
+            response.context['all_leave_registrations'][0].pk))
+
+    def test_current_year_does_not_read_archive(self):
+        self.archive()
+        self.client.login(username='employer', password='employeremployer')
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('entitlement-detail', kwargs={'year': 2019}))
+        self.assertFalse(response.context['archived'])
@@ -0,0 +1,94 @@
+import datetime
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+from model_mommy import mommy
+
+from registration import balances
+from registration.models import BalanceSnapshotVersion, Entitlement, LeaveRegistration
+
+
+class BalanceSnapshotTest(TransactionTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(BALANCE_SNAPSHOT_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.today = datetime.date(2019, 7, 1)
+        self.user = mommy.make(User)
+        self.entitlement = Entitlement.objects.create(user=self.user, year=2019, leave_hours=100)
+
+    def make_registration(self, hours, **kwargs):
+        return LeaveRegistration.objects.create(entitlement=self.entitlement, from_date=self.today,
+                                                end_date=self.today, amount_of_hours=hours, **kwargs)
+
+    def test_balance(self):
+        self.make_registration(8)
+        self.make_registration(4, status=LeaveRegistration.REJECTED)
+        self.assertEqual(balances.get_balance(self.user.pk, 2019, self.today), (100, 8, 92))
+
+    def test_served_with_only_the_version_query(self):
+        balances.get_snapshot(self.today)
+        with self.assertNumQueries(2):
+            self.assertEqual(balances.get_balance(self.user.pk, 2019, self.today), (100, 0, 100))
+            self.assertIsNone(balances.get_balance(self.user.pk + 1, 2019, self.today))
+
+    def test_rebuilt_after_write(self):
+        first = balances.get_snapshot(self.today)
+        self.make_registration(8)
+        self.assertNotEqual(balances.version(), first.version)
+        self.assertEqual(balances.get_balance(self.user.pk, 2019, self.today).used_hours, 8)
+        self.assertFalse([name for name in os.listdir(balances._directory()) if name.endswith('.tmp')])
+
+    def test_version_is_stored_in_the_database(self):
+        self.make_registration(8)
+        self.make_registration(4)
+        self.assertEqual(BalanceSnapshotVersion.objects.count(), 1)
+        self.assertEqual(balances.get_balance(self.user.pk, 2019, self.today).used_hours, 12)
+        # Another host, or a restored database, has another token, so the local snapshot is not used.
+        BalanceSnapshotVersion.objects.update(token='restored')
+        LeaveRegistration.objects.filter(amount_of_hours=4).update(amount_of_hours=2)
+        self.assertEqual(balances.get_balance(self.user.pk, 2019, self.today).used_hours, 10)
+
+    def test_bump_when_another_process_creates_the_version(self):
+        BalanceSnapshotVersion.objects.all().delete()
+        versions = BalanceSnapshotVersion.objects.filter
+        competed = []
+
+        def find_nothing_then_compete(*args, **kwargs):
+            # The other process inserts the row right after our first update found nothing.
+            if competed:
+                return versions(*args, **kwargs)
+            competed.append(BalanceSnapshotVersion.objects.create(pk=1, token='other'))
+            return versions(*args, **kwargs).none()
+
+        with mock.patch.object(BalanceSnapshotVersion.objects, 'filter', side_effect=find_nothing_then_compete):
+            balances.bump()
+        self.assertEqual(BalanceSnapshotVersion.objects.count(), 1)
+        self.assertNotIn(balances.version(), ('', 'other'))
+
+    def test_inactive_year(self):
+        Entitlement.objects.create(user=self.user, year=2010, leave_hours=100)
+        self.assertIsNone(balances.get_balance(self.user.pk, 2010, self.today))
+
+    def test_other_years_cause_rebuild(self):
+        balances.get_snapshot(self.today)
+        Entitlement.objects.create(user=self.user, year=2021, leave_hours=80)
+        self.assertEqual(balances.get_snapshot(datetime.date(2020, 1, 1)).first_year, 2019)
+        self.assertEqual(balances.get_balance(self.user.pk, 2021, datetime.date(2020, 1, 1)), (80, 0, 80))
+
+    def test_attach_used_hours(self):
+        self.make_registration(8)
+        old = Entitlement.objects.create(user=self.user, year=2010, leave_hours=100)
+        LeaveRegistration.objects.create(entitlement=old, from_date=datetime.date(2010, 1, 4),
+                                         end_date=datetime.date(2010, 1, 4), amount_of_hours=16)
+        entitlements = list(Entitlement.objects.order_by('year'))
+        with self.assertRaises(AttributeError):
+            entitlements[0].get_used_hours()
+        balances.attach_used_hours(entitlements, self.today)
+        self.assertEqual([entitlement.get_used_hours() for entitlement in entitlements], [16, 8])
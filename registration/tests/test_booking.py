@@ -0,0 +1,96 @@
+import datetime
+import io
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+from model_mommy import mommy
+
+from registration import booking
+from registration.models import Entitlement, LeaveRegistration
+
+
+class SaveLeaveRegistrationTest(TestCase):
+    def setUp(self):
+        self.entitlement = Entitlement.objects.create(user=mommy.make(User), year=2019, leave_hours=40)
+        self.day = datetime.date(2019, 5, 1)
+
+    def registration(self, hours):
+        return LeaveRegistration(entitlement=self.entitlement, from_date=self.day, end_date=self.day,
+                                 amount_of_hours=hours)
+
+    def used_hours(self):
+        return Entitlement.objects.annotate_used_leave_hours().get(pk=self.entitlement.pk).used_leave_hours
+
+    def competing_write(self, hours):
+        read_balance = booking._read_balance
+        calls = []
+
+        def read_then_compete(*args):
+            balance = read_balance(*args)
+            if not calls:
+                calls.append(args)
+                self.registration(hours).save()
+            return balance
+
+        return mock.patch('registration.booking._read_balance', side_effect=read_then_compete)
+
+    def test_version_moves_forward(self):
+        version = Entitlement.objects.get(pk=self.entitlement.pk).version
+        booking.save_leave_registration(self.registration(8))
+        self.assertGreater(Entitlement.objects.get(pk=self.entitlement.pk).version, version)
+
+    def test_stale_entitlement_save_keeps_version(self):
+        stale = Entitlement.objects.get(pk=self.entitlement.pk)
+        booking.save_leave_registration(self.registration(8))
+        version = Entitlement.objects.get(pk=self.entitlement.pk).version
+        stale.leave_hours = 80
+        stale.save()
+        self.assertEqual(Entitlement.objects.get(pk=self.entitlement.pk).version, version + 1)
+
+    def test_retry_after_concurrent_write(self):
+        with self.competing_write(16):
+            booking.save_leave_registration(self.registration(8))
+        self.assertEqual(self.used_hours(), 24)
+
+    def test_no_overdraw(self):
+        with self.competing_write(32):
+            with self.assertRaises(booking.InsufficientBalance):
+                booking.save_leave_registration(self.registration(16), prevent_overdraw=True)
+        self.assertEqual(self.used_hours(), 32)
+
+    def test_update_does_not_count_itself(self):
+        registration = booking.save_leave_registration(self.registration(32), prevent_overdraw=True)
+        registration.amount_of_hours = 40
+        booking.save_leave_registration(registration, prevent_overdraw=True)
+        self.assertEqual(self.used_hours(), 40)
+
+    def test_conflict_after_retries(self):
+        with mock.patch('registration.booking._read_balance', return_value=(-1, 0)):
+            with self.assertRaises(booking.ConcurrentUpdate):
+                booking.save_leave_registration(self.registration(8))
+        self.assertEqual(self.used_hours(), 0)
+
+
+class LoadDriverTest(TransactionTestCase):
+    def test_no_lost_updates(self):
+        stdout = io.StringIO()
+        call_command('drive_concurrent_registrations', threads=1, writes=6, leave_hours=40, prevent_overdraw=True,
+                     stdout=stdout)
+        self.assertEqual(stdout.getvalue().splitlines(), [
+            'saved: 5', 'conflict: 0', 'insufficient balance: 1', 'database locked: 0',
+            'versions claimed: 5, final version: 10 (expected 10)',
+            'used hours: 40 (expected 40), ledger: 40, lost updates: 0, overdrawn: no'])
+        self.assertFalse(Entitlement.objects.exists())
+
+    def test_lost_update_fails(self):
+        save = LeaveRegistration.save
+
+        def save_and_reset_version(registration, *args, **kwargs):
+            save(registration, *args, **kwargs)
+            Entitlement.objects.filter(pk=registration.entitlement_id).update(version=0)
+
+        with mock.patch.object(LeaveRegistration, 'save', save_and_reset_version), self.assertRaisesMessage(
+                CommandError, 'Failed checks: unique versions, contiguous versions, final version'):
+            call_command('drive_concurrent_registrations', threads=1, writes=2, stdout=io.StringIO())
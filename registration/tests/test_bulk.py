@@ -0,0 +1,67 @@
+import io
+
+from django.contrib.auth.models import Group, User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from registration import bulk
+from registration.models import Entitlement, LedgerEvent
+
+
+class BulkEntitlementTest(TestCase):
+    fixtures = ['users.json']
+
+    def setUp(self):
+        self.group = Group.objects.create(name='Support')
+        self.members = [mommy.make(User, username='member{}'.format(number)) for number in range(3)]
+        self.group.user_set.add(*self.members)
+        Entitlement.objects.create(user=self.members[0], year=2026, leave_hours=100, special_leave_hours=10)
+        Entitlement.objects.create(user=self.members[1], year=2026, leave_hours=120)
+        Entitlement.objects.create(user=mommy.make(User), year=2026, leave_hours=50)
+
+    def leave_hours(self):
+        return dict(Entitlement.objects.filter(year=2026).values_list('user__username', 'leave_hours'))
+
+    def test_preview_in_one_query(self):
+        with self.assertNumQueries(1):
+            changes = bulk.preview(self.group, 2026, bulk.ADJUST, 8)
+        self.assertEqual([(change.username, change.leave_hours, change.new_leave_hours) for change in changes],
+                         [('member0', 100, 108), ('member1', 120, 128), ('member2', None, 8)])
+
+    def test_adjust(self):
+        self.assertEqual(bulk.apply(self.group, 2026, bulk.ADJUST, 8), (1, 2))
+        leave_hours = self.leave_hours()
+        self.assertEqual([leave_hours.pop('member{}'.format(number)) for number in range(3)], [108, 128, 8])
+        self.assertEqual(list(leave_hours.values()), [50])
+        member = Entitlement.objects.get(user=self.members[2])
+        self.assertEqual(LedgerEvent.objects.filter(entitlement=member).totals()['leave_hours'], 8)
+
+    def test_set_skips_unchanged_rows(self):
+        self.assertEqual(bulk.apply(self.group, 2026, bulk.SET, 120), (1, 1))
+        entitlement = Entitlement.objects.get(user=self.members[0])
+        self.assertEqual(LedgerEvent.objects.filter(entitlement=entitlement).totals()['leave_hours'], 120)
+
+    def test_command_refuses_dropping_below_leave_types(self):
+        with self.assertRaisesMessage(CommandError, 'member0'):
+            call_command('bulk_entitlements', 'Support', '2026', '--set=5', stdout=io.StringIO())
+        self.assertEqual(self.leave_hours()['member0'], 100)
+
+    def test_command(self):
+        stdout = io.StringIO()
+        call_command('bulk_entitlements', 'Support', '2026', '--set=110', '--dry-run', stdout=stdout)
+        self.assertEqual(stdout.getvalue(), 'member0: 100 -> 110\nmember1: 120 -> 110\nmember2: - -> 110\n')
+        stdout = io.StringIO()
+        call_command('bulk_entitlements', 'Support', '2026', '--adjust=8', stdout=stdout)
+        self.assertEqual(stdout.getvalue(), 'Created 1 and updated 2 entitlements for Support in 2026\n')
+
+    def test_view_previews_before_applying(self):
+        self.client.login(username='employer', password='employeremployer')
+        data = {'group': self.group.pk, 'year': 2026, 'mode': bulk.ADJUST, 'hours': 8}
+        response = self.client.post(reverse('admin-bulk-entitlement'), dict(data, preview=''))
+        self.assertEqual(len(response.context['changes']), 3)
+        self.assertEqual(self.leave_hours()['member0'], 100)
+        response = self.client.post(reverse('admin-bulk-entitlement'), dict(data, apply=''))
+        self.assertRedirects(response, reverse('admin-users-entitlement-list', kwargs={'year': 2026}))
+        self.assertEqual(self.leave_hours()['member0'], 108)
@@ -0,0 +1,154 @@
+import datetime
+
+from django.contrib.auth.models import Group, Permission, User
+from django.core import mail
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_mommy import mommy
+
+from registration import approval, capacity, tasks
+from registration.models import AbsenceAlert, Entitlement, LeaveRegistration
+
+
+class HeatmapTest(TransactionTestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='Support')
+        self.first, self.second = mommy.make(User, _quantity=2)
+        self.group.user_set.add(self.first, self.second)
+        self.entitlements = [Entitlement.objects.create(user=user, year=2026, leave_hours=200)
+                             for user in (self.first, self.second)]
+
+    def register(self, entitlement, from_date, end_date, status=LeaveRegistration.APPROVED):
+        return LeaveRegistration.objects.create(entitlement=entitlement, from_date=from_date, end_date=end_date,
+                                                amount_of_hours=8, status=status)
+
+    def absent(self, *days):
+        heatmap = capacity.get_heatmap(self.group.pk, 2026)
+        return [heatmap.absent[(day - datetime.date(2026, 1, 1)).days] for day in days]
+
+    def test_counts_absent_members_per_day(self):
+        self.register(self.entitlements[0], datetime.date(2026, 3, 2), datetime.date(2026, 3, 4))
+        self.register(self.entitlements[0], datetime.date(2026, 3, 3), datetime.date(2026, 3, 3))
+        self.register(self.entitlements[1], datetime.date(2026, 3, 4), datetime.date(2026, 3, 5))
+        heatmap = capacity.get_heatmap(self.group.pk, 2026)
+        self.assertEqual((heatmap.members, len(heatmap.absent)), (2, 365))
+        self.assertEqual(self.absent(*(datetime.date(2026, 3, day) for day in range(1, 7))), [0, 1, 1, 2, 1, 0])
+
+    def test_heatmap_follows_changes(self):
+        registration = self.register(self.entitlements[0], datetime.date(2026, 3, 2), datetime.date(2026, 3, 4))
+        self.assertEqual(self.absent(datetime.date(2026, 3, 2)), [1])
+        registration.from_date = registration.end_date = datetime.date(2026, 3, 10)
+        registration.save()
+        requested = self.register(self.entitlements[1], datetime.date(2026, 3, 10), datetime.date(2026, 3, 10),
+                                  status=LeaveRegistration.REQUESTED)
+        self.assertEqual(self.absent(datetime.date(2026, 3, 2), datetime.date(2026, 3, 10)), [0, 2])
+        with self.assertNumQueries(2):
+            self.assertEqual(self.absent(datetime.date(2026, 3, 10)), [2])
+        approval.decide(LeaveRegistration.objects.filter(pk=requested.pk), LeaveRegistration.REJECTED)
+        self.assertEqual(self.absent(datetime.date(2026, 3, 10)), [1])
+        registration.delete()
+        self.assertEqual(self.absent(datetime.date(2026, 3, 10)), [0])
+
+    def test_moved_registration_counts_once(self):
+        registration = self.register(self.entitlements[0], datetime.date(2026, 3, 2), datetime.date(2026, 3, 2))
+        self.register(self.entitlements[1], datetime.date(2026, 3, 2), datetime.date(2026, 3, 2))
+        self.assertEqual(self.absent(datetime.date(2026, 3, 2)), [2])
+        registration.entitlement = self.entitlements[1]
+        registration.save()
+        self.assertEqual(self.absent(datetime.date(2026, 3, 2)), [1])
+        registration.delete()
+        self.assertEqual(self.absent(datetime.date(2026, 3, 2)), [1])
+
+    def test_weekends_are_not_counted(self):
+        self.register(self.entitlements[0], datetime.date(2026, 3, 6), datetime.date(2026, 3, 9))
+        self.assertEqual(self.absent(*(datetime.date(2026, 3, day) for day in range(6, 10))), [1, 0, 0, 1])
+
+    def test_membership_change(self):
+        self.register(self.entitlements[1], datetime.date(2026, 3, 2), datetime.date(2026, 3, 2))
+        self.group.user_set.remove(self.second)
+        self.assertEqual(self.absent(datetime.date(2026, 3, 2)), [0])
+        self.group.user_set.add(self.second)
+        self.assertEqual(self.absent(datetime.date(2026, 3, 2)), [1])
+
+    def test_view(self):
+        self.register(self.entitlements[1], datetime.date(2026, 1, 2), datetime.date(2026, 1, 2))
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'adminadmin')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin-capacity-heatmap', kwargs={'group_id': self.group.pk,
+                                                                              'year': 2026}))
+        data = response.json()
+        self.assertEqual((data['start'], data['members'], data['absent'][:3], data['percentage'][:3]),
+                         ('2026-01-01', 2, [0, 1, 0], [0, 50, 0]))
+        response = self.client.get(reverse('admin-capacity-heatmap', kwargs={'group_id': 0, 'year': 2026}))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ABSENCE_THRESHOLD_PERCENTAGE=30, ABSENCE_THRESHOLD_PERCENTAGES={'Sales': 50},
+                   ABSENCE_THRESHOLD_MIN_MEMBERS=5, MANAGERS=[('Manager', 'manager@example.com')])
+class AbsenceThresholdTest(TransactionTestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='Support')
+        self.users = mommy.make(User, _quantity=5)
+        self.group.user_set.add(*self.users)
+        self.entitlements = [Entitlement.objects.create(user=user, year=2026, leave_hours=200) for user in self.users]
+        self.day = datetime.date(2026, 3, 2)
+        LeaveRegistration.objects.create(entitlement=self.entitlements[0], from_date=self.day, end_date=self.day,
+                                         amount_of_hours=8, status=LeaveRegistration.APPROVED)
+
+    def test_breaches(self):
+        self.assertEqual(capacity.breaches(self.users[1].pk, self.day, self.day + datetime.timedelta(days=1)),
+                         [capacity.Breach(self.group.pk, 'Support', self.day, 2, 5, 30)])
+        # The user who is already out that day does not add to the count.
+        self.assertEqual(capacity.breaches(self.users[0].pk, self.day, self.day), [])
+
+    def test_breaches_follow_the_day_allocations(self):
+        LeaveRegistration.objects.create(entitlement=self.entitlements[2], from_date=self.day, end_date=self.day,
+                                         amount_of_hours=8, status=LeaveRegistration.APPROVED)
+        with self.assertNumQueries(3):
+            self.assertEqual(capacity.breaches(self.users[1].pk, self.day, self.day),
+                             [capacity.Breach(self.group.pk, 'Support', self.day, 3, 5, 30)])
+        LeaveRegistration.objects.filter(entitlement__in=self.entitlements[::2]).delete()
+        self.assertEqual(capacity.breaches(self.users[1].pk, self.day, self.day), [])
+
+    def test_record_breaches_replaces_unsent_alerts(self):
+        registration = LeaveRegistration.objects.create(entitlement=self.entitlements[1], from_date=self.day,
+                                                        end_date=self.day, amount_of_hours=8)
+        breach = capacity.Breach(self.group.pk, 'Support', self.day, 2, 5, 30)
+        capacity.record_breaches(registration, [breach])
+        AbsenceAlert.objects.update(notified_at=timezone.now())
+        capacity.record_breaches(registration, [breach])
+        capacity.record_breaches(registration, [breach._replace(absent=3)])
+        self.assertEqual(sorted((alert.absent, alert.notified_at is None) for alert in AbsenceAlert.objects.all()),
+                         [(2, False), (3, True)])
+        capacity.record_breaches(registration, [])
+        self.assertEqual(AbsenceAlert.objects.filter(notified_at__isnull=True).count(), 0)
+
+    def test_threshold_per_group_and_minimum_size(self):
+        self.group.name = 'Sales'
+        self.group.save()
+        self.assertEqual(capacity.breaches(self.users[1].pk, self.day, self.day), [])
+        small = Group.objects.create(name='Small')
+        small.user_set.add(*self.users[:2])
+        self.group.user_set.remove(self.users[4])
+        self.assertEqual(capacity.breaches(self.users[1].pk, self.day, self.day), [])
+
+    def test_form_asks_for_confirmation_and_digest_reports(self):
+        user = self.users[1]
+        user.set_password('secretsecret')
+        user.save()
+        user.user_permissions.add(Permission.objects.get(codename='add_leaveregistration'))
+        self.client.login(username=user.username, password='secretsecret')
+        data = {'from_date': '2026-03-02', 'end_date': '2026-03-02', 'amount_of_hours': '8'}
+        response = self.client.post(reverse('leave-registration-create'), data)
+        self.assertContains(response, 'In Support is op 02-03-2026 meer dan 30% van de medewerkers afwezig.')
+        self.assertContains(response, 'type="checkbox" name="confirm_peak_absence"')
+        self.assertEqual(LeaveRegistration.objects.count(), 1)
+        response = self.client.post(reverse('leave-registration-create'), dict(data, confirm_peak_absence='on'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(AbsenceAlert.objects.values_list('group__name', 'date', 'absent', 'members')),
+                         [('Support', self.day, 2, 5)])
+        self.assertEqual(tasks.send_absence_digest(), 1)
+        self.assertEqual(mail.outbox[-1].body, 'Support: 02-03-2026 2 van 5 medewerkers afwezig na verlof van {}.'
+                         .format(user.username))
+        self.assertEqual(tasks.send_absence_digest(), 0)
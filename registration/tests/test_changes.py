@@ -0,0 +1,87 @@
+import datetime
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from registration import changes
+from registration.models import Entitlement, LeaveRegistration
+from registration.views import AdminEntitlementChanges
+
+
+class ChangeFeedTest(TestCase):
+    def setUp(self):
+        self.user = mommy.make(User)
+        self.entitlement = Entitlement.objects.create(user=self.user, year=2019, leave_hours=100)
+        self.other_year = Entitlement.objects.create(user=self.user, year=2018, leave_hours=100)
+        self.after = changes.latest_event_id()
+
+    def make_registration(self, entitlement, hours):
+        day = datetime.date(entitlement.year, 3, 1)
+        return LeaveRegistration.objects.create(entitlement=entitlement, from_date=day, end_date=day,
+                                                amount_of_hours=hours)
+
+    def test_no_changes(self):
+        self.assertEqual(changes.changed_rows(2019, self.after), (self.after, []))
+
+    def test_changed_rows_of_year(self):
+        registration = self.make_registration(self.entitlement, 80)
+        self.make_registration(self.other_year, 8)
+        registration.amount_of_hours = 40
+        registration.save()
+        registration.amount_of_hours = 80
+        registration.save()
+        with self.assertNumQueries(2):
+            last_event_id, rows = changes.changed_rows(2019, self.after)
+        self.assertEqual(last_event_id, changes.latest_event_id())
+        self.assertEqual(rows, [{'id': self.entitlement.pk, 'used': 80, 'remaining': 20, 'color': 'orange'}])
+
+    def test_stream(self):
+        self.make_registration(self.other_year, 8)
+        events = list(changes.stream(2019, self.after, timeout=0, poll_interval=0))
+        self.assertEqual(events, ['retry: 3000\n\n', 'id: {}\n\n'.format(changes.latest_event_id())])
+
+    def test_clients_retry_no_sooner_than_the_poll_interval(self):
+        events = changes.stream(2019, self.after, timeout=0, poll_interval=15)
+        self.assertEqual(next(events), 'retry: 15000\n\n')
+
+    def test_clients_too_far_behind_reload(self):
+        self.make_registration(self.entitlement, 8)
+        with mock.patch('registration.changes.MAX_PENDING_EVENTS', 0):
+            events = list(changes.stream(2019, self.after, timeout=60, poll_interval=0))
+        self.assertEqual(events[1:], ['id: {}\nevent: reload\ndata: reload\n\n'.format(changes.latest_event_id())])
+
+
+class AdminEntitlementChangesTests(TestCase):
+    fixtures = ['users.json']
+
+    def test_logged_in_no_permission(self):
+        self.client.login(username='nonuser', password='nonusernonuser')
+        response = self.client.get(reverse('admin-users-entitlement-changes', kwargs={'year': 2019}))
+        self.assertEqual(response.status_code, 403)
+
+    def test_resumes_from_last_event_id(self):
+        self.client.login(username='employer', password='employeremployer')
+        entitlement = Entitlement.objects.create(user=User.objects.get(username='employee'), year=2019,
+                                                 leave_hours=100)
+        after = changes.latest_event_id()
+        mommy.make(LeaveRegistration, entitlement=entitlement, amount_of_hours=8)
+        with mock.patch.object(AdminEntitlementChanges, 'timeout', 0):
+            response = self.client.get(reverse('admin-users-entitlement-changes', kwargs={'year': 2019}),
+                                       HTTP_LAST_EVENT_ID=str(after))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        message = b''.join(response.streaming_content).decode().split('\n\n')[1]
+        self.assertEqual(json.loads(message.split('data: ')[1]),
+                         [{'id': entitlement.pk, 'used': 8, 'remaining': 92, 'color': 'green'}])
+
+    def test_overview_subscribes_to_changes(self):
+        self.client.login(username='employer', password='employeremployer')
+        entitlement = Entitlement.objects.create(user=User.objects.get(username='employee'), year=2019,
+                                                 leave_hours=100)
+        response = self.client.get(reverse('admin-users-entitlement-list', kwargs={'year': 2019}))
+        self.assertEqual(response.context['last_event_id'], changes.latest_event_id())
+        self.assertContains(response, 'data-entitlement="{}"'.format(entitlement.pk))
+        self.assertContains(response, '/useradmin/2019/changes?after={}'.format(changes.latest_event_id()))
@@ -0,0 +1,56 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from registration.models import Entitlement, LeaveRegistration
+
+
+class ConditionalResponseTests(TestCase):
+    fixtures = ['users.json']
+
+    def setUp(self):
+        self.client.login(username='employer', password='employeremployer')
+        self.employer = User.objects.get(username='employer')
+        self.employee = User.objects.get(username='employee')
+        self.entitlement = mommy.make(Entitlement, user=self.employer, year=2019, leave_hours=100)
+        self.url = reverse('entitlement-detail', kwargs={'year': 2019})
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        with self.assertNumQueries(3):
+            self.assertEqual(self.revalidate(self.url, response).status_code, 304)
+
+    def test_modified_by_registration(self):
+        response = self.client.get(self.url)
+        day = datetime.date(2019, 5, 1)
+        LeaveRegistration.objects.create(entitlement=self.entitlement, from_date=day, end_date=day, amount_of_hours=8)
+        self.assertEqual(self.revalidate(self.url, response).status_code, 200)
+
+    def test_not_modified_after_session_change(self):
+        response = self.client.get(self.url)
+        session = self.client.session
+        session['last_visited'] = 'elsewhere'
+        session.save()
+        self.assertEqual(self.revalidate(self.url, response).status_code, 304)
+
+    def test_other_user_does_not_match(self):
+        response = self.client.get(reverse('entitlement-list'))
+        self.client.login(username='employee', password='employeeemployee')
+        self.assertNotEqual(self.client.get(reverse('entitlement-list'))['ETag'], response['ETag'])
+
+    def test_admin_detail_follows_target_user(self):
+        entitlement = mommy.make(Entitlement, user=self.employee, year=2019, leave_hours=100)
+        url = reverse('admin-entitlement-detail', kwargs={'user_id': self.employee.pk, 'year': 2019})
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        entitlement.leave_hours = 120
+        entitlement.save()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
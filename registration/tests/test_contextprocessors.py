@@ -38,3 +38,12 @@ class DefaultEntitlementTest(TestCase):
         request.user = user
         result = default_entitlement(request)
         self.assertEqual(result['default_entitlement'], entitlement)
+
+    def test_default_entitlement_loaded_by_view(self):
+        user = mommy.make(User)
+        entitlement = mommy.make(Entitlement, year=2018, user=user)
+        request = mock.Mock()
+        request.user = user
+        request.default_entitlement = entitlement
+        result = default_entitlement(request)
+        self.assertEqual(result['default_entitlement'], entitlement)
@@ -0,0 +1,90 @@
+import io
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from registration import directory, search
+from registration.models import DirectoryRecord
+
+LDIF = '''version: 1
+
+# Jan
+dn: uid=jan,ou=people,dc=example,dc=org
+uid: jan
+givenName: Jan
+sn: de Vries
+mail: jan@example.org
+
+dn: uid=zoe,ou=people,dc=example,dc=org
+uid: zoe
+givenName:: Wm/Dqw==
+sn: Jansen
+mail: zoe@exam
+ ple.org
+'''
+
+
+class ReaderTest(TestCase):
+    def test_ldif(self):
+        self.assertEqual(list(directory.read_ldif(io.StringIO(LDIF))), [
+            directory.Person('jan', 'Jan', 'de Vries', 'jan@example.org'),
+            directory.Person('zoe', 'Zoë', 'Jansen', 'zoe@example.org'),
+        ])
+
+    def test_csv_and_json(self):
+        person = directory.Person('jan', 'Jan', 'de Vries', 'jan@example.org')
+        self.assertEqual(list(directory.read_csv(io.StringIO(
+            'username,first_name,last_name,email\njan,Jan,de Vries,jan@example.org\n,,,\n'))), [person])
+        line = '{"username": "jan", "first_name": "Jan", "last_name": "de Vries", "email": "jan@example.org"}'
+        self.assertEqual(list(directory.read_json(io.StringIO(line + '\n\n' + line))), [person, person])
+        self.assertEqual(list(directory.read_json(io.StringIO('[\n' + line + '\n]'))), [person])
+        with self.assertRaises(ValueError):
+            list(directory.read_json(io.StringIO('["jan"]')))
+
+
+class DirectorySyncTest(TestCase):
+    def setUp(self):
+        self.people = [directory.Person('jan', 'Jan', 'de Vries', 'jan@example.org'),
+                       directory.Person('piet', 'Piet', 'Bakker', 'piet@example.org')]
+
+    def test_creates_users_with_unusable_password(self):
+        self.assertEqual(directory.sync(self.people), (2, 0, 0, 0))
+        jan = User.objects.get(username='jan')
+        self.assertEqual((jan.first_name, jan.email, jan.has_usable_password()), ('Jan', 'jan@example.org', False))
+        self.assertEqual(DirectoryRecord.objects.count(), 2)
+        self.assertEqual(list(search.matching_users('bakk').values_list('username', flat=True)), ['piet'])
+
+    def test_only_changed_users_are_written(self):
+        directory.sync(self.people)
+        self.people[1] = self.people[1]._replace(last_name='Visser')
+        self.assertEqual(directory.sync(self.people, batch_size=1), (0, 1, 0, 1))
+        self.assertEqual(User.objects.get(username='piet').last_name, 'Visser')
+        self.assertEqual(list(search.matching_users('viss').values_list('username', flat=True)), ['piet'])
+        self.assertEqual(directory.sync(self.people), (0, 0, 0, 2))
+
+    def test_missing_users_are_deactivated_and_come_back(self):
+        manual = User.objects.create_user('admin', password='adminadmin')
+        directory.sync(self.people)
+        self.assertEqual(directory.sync(self.people[:1]), (0, 0, 1, 1))
+        self.assertFalse(User.objects.get(username='piet').is_active)
+        self.assertTrue(User.objects.get(pk=manual.pk).is_active)
+        self.assertEqual(directory.sync(self.people, deactivate_missing=False), (0, 1, 0, 1))
+        self.assertTrue(User.objects.get(username='piet').is_active)
+
+    def test_existing_users_are_taken_over(self):
+        User.objects.create_user('jan', email='old@example.org', password='janjanjan')
+        self.assertEqual(directory.sync(self.people), (1, 1, 0, 0))
+        jan = User.objects.get(username='jan')
+        self.assertEqual((jan.email, jan.has_usable_password()), ('jan@example.org', True))
+
+    def test_command(self):
+        handle, path = tempfile.mkstemp(suffix='.ldif')
+        with os.fdopen(handle, 'w', encoding='utf-8') as export:
+            export.write(LDIF)
+        self.addCleanup(os.remove, path)
+        stdout = io.StringIO()
+        call_command('sync_directory', path, stdout=stdout)
+        self.assertEqual(stdout.getvalue(), '2 created, 0 updated, 0 deactivated, 0 unchanged\n')
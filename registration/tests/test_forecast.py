@@ -0,0 +1,92 @@
+import datetime
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from registration.forecast import build_year_forecast, get_year_forecast
+from registration.models import Entitlement, LeaveRegistration
+
+
+class YearForecastTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = mommy.make(Group, name='Support')
+        self.user1 = mommy.make(User, username='user1')
+        self.user2 = mommy.make(User, username='user2')
+        self.user1.groups.add(self.group)
+        self.entitlement1 = mommy.make(Entitlement, user=self.user1, year=2019, leave_hours=100)
+        self.entitlement2 = mommy.make(Entitlement, user=self.user2, year=2019, leave_hours=40)
+        self.today = datetime.date(2019, 7, 2)
+
+    def make_registration(self, entitlement, day, hours):
+        return mommy.make(LeaveRegistration, entitlement=entitlement, from_date=day, end_date=day,
+                          amount_of_hours=hours)
+
+    def test_taken_and_planned(self):
+        self.make_registration(self.entitlement1, datetime.date(2019, 3, 1), 16)
+        self.make_registration(self.entitlement1, datetime.date(2019, 9, 1), 8)
+        forecast = build_year_forecast(2019, self.today)
+        user1 = next(user for user in forecast['users'] if user['username'] == 'user1')
+        self.assertEqual(user1['taken_hours'], 16)
+        self.assertEqual(user1['planned_hours'], 8)
+        self.assertEqual(user1['remainder_hours'], 76)
+        self.assertFalse(user1['exceeding'])
+
+    def test_projection_extrapolates_pace(self):
+        self.make_registration(self.entitlement2, datetime.date(2019, 2, 1), 32)
+        forecast = build_year_forecast(2019, self.today)
+        user2 = forecast['users'][0]
+        self.assertEqual(user2['username'], 'user2')
+        self.assertEqual(user2['remainder_hours'], 8)
+        self.assertLess(user2['projected_remainder_hours'], 0)
+        self.assertTrue(user2['exceeding'])
+        self.assertEqual(forecast['organisation']['exceeding'], 1)
+
+    def test_groups_and_organisation(self):
+        self.make_registration(self.entitlement1, datetime.date(2019, 3, 1), 10)
+        self.make_registration(self.entitlement2, datetime.date(2019, 3, 1), 20)
+        forecast = build_year_forecast(2019, self.today)
+        self.assertEqual(len(forecast['groups']), 1)
+        self.assertEqual(forecast['groups'][0]['name'], 'Support')
+        self.assertEqual(forecast['groups'][0]['members'], 1)
+        self.assertEqual(forecast['groups'][0]['taken_hours'], 10)
+        self.assertEqual(forecast['organisation']['members'], 2)
+        self.assertEqual(forecast['organisation']['taken_hours'], 30)
+        self.assertEqual(forecast['organisation']['leave_hours'], 140)
+
+    def test_no_entitlements(self):
+        forecast = build_year_forecast(2000, self.today)
+        self.assertEqual(forecast['users'], [])
+        self.assertIsNone(forecast['organisation'])
+
+    def test_single_query_for_year_data(self):
+        self.make_registration(self.entitlement1, datetime.date(2019, 3, 1), 10)
+        with self.assertNumQueries(2):
+            build_year_forecast(2019, self.today)
+
+    def test_cached_until_data_changes(self):
+        forecast = get_year_forecast(2019, self.today)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_year_forecast(2019, self.today), forecast)
+        self.make_registration(self.entitlement1, datetime.date(2019, 3, 1), 10)
+        self.assertEqual(get_year_forecast(2019, self.today)['organisation']['taken_hours'], 10)
+
+
+class AdminYearForecastTests(TestCase):
+    fixtures = ['users.json']
+
+    def test_logged_in_no_permission(self):
+        self.client.login(username='nonuser', password='nonusernonuser')
+        response = self.client.get(reverse('admin-year-forecast', kwargs={'year': 2019}))
+        self.assertEqual(response.status_code, 403)
+
+    def test_logged_in_has_permission(self):
+        self.client.login(username='employer', password='employeremployer')
+        mommy.make(Entitlement, user=User.objects.get(username='employee'), year=2019, leave_hours=100)
+        response = self.client.get(reverse('admin-year-forecast', kwargs={'year': 2019}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'registration/admin_year_forecast.html')
+        self.assertEqual(response.context['forecast']['organisation']['members'], 1)
@@ -3,7 +3,7 @@ import datetime
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-from registration.forms import LeaveRegistrationForm, EntitlementForm
+from registration.forms import LeaveRegistrationForm, EntitlementForm, AdminEntitlementForm
 
 
 class LeaveRegistrationFormTest(TestCase):
@@ -71,3 +71,16 @@ class EntitlementFormTest(TestCase):
         form = EntitlementForm(years=[2019, 2018, 2017, 2016])
         form.cleaned_data = cleaned_data
         self.assertRaisesMessage(ValidationError, "Er zijn al verlofuren voor dit jaar ingevuld.", form.clean)
+
+
+class AdminEntitlementFormTest(TestCase):
+    def test_leave_type_hours_within_leave_hours(self):
+        form = AdminEntitlementForm(data={'leave_hours': 100, 'extra_statutory_leave_hours': 40,
+                                          'special_leave_hours': 16, 'unpaid_leave_hours': 0})
+        self.assertTrue(form.is_valid())
+
+    def test_leave_type_hours_exceed_leave_hours(self):
+        form = AdminEntitlementForm(data={'leave_hours': 40, 'extra_statutory_leave_hours': 40,
+                                          'special_leave_hours': 16, 'unpaid_leave_hours': 0})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors(), ['De uren per verlofsoort zijn samen meer dan het verlofsaldo.'])
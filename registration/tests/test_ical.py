@@ -0,0 +1,85 @@
+import datetime
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from registration import ical
+from registration.models import Entitlement, LeaveRegistration
+
+
+class IcalTest(TestCase):
+    def test_escape(self):
+        self.assertEqual(ical.escape('a,b;c\\d'), 'a\\,b\\;c\\\\d')
+
+    def test_calendar_lines(self):
+        registrations = [(1, datetime.date(2019, 3, 4), datetime.date(2019, 3, 5), 16, 'test', 'Test', 'User')]
+        content = ''.join(ical.calendar_lines('Verlof', registrations))
+        self.assertIn('DTSTART;VALUE=DATE:20190304\r\n', content)
+        self.assertIn('DTEND;VALUE=DATE:20190306\r\n', content)
+        self.assertIn('SUMMARY:Verlof Test User (16 uur)\r\n', content)
+        self.assertTrue(content.endswith('END:VCALENDAR\r\n'))
+
+
+class LeaveCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = mommy.make(Group, name='Support')
+        self.user = mommy.make(User, username='test', first_name='', last_name='')
+        self.user.groups.add(self.group)
+        self.entitlement = mommy.make(Entitlement, user=self.user, year=2019, leave_hours=100)
+        day = datetime.date(2019, 3, 4)
+        self.registration = LeaveRegistration.objects.create(entitlement=self.entitlement, from_date=day,
+                                                             end_date=day, amount_of_hours=8)
+        self.user_url = reverse('user-leave-calendar',
+                                kwargs={'token': ical.feed_token(self.user.pk, ical.USER_FEED_SALT)})
+        self.group_url = reverse('group-leave-calendar',
+                                 kwargs={'token': ical.feed_token(self.group.pk, ical.GROUP_FEED_SALT)})
+
+    def test_invalid_token(self):
+        response = self.client.get(reverse('user-leave-calendar', kwargs={'token': 'invalid'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_token_not_valid_for_group(self):
+        response = self.client.get(reverse('group-leave-calendar',
+                                           kwargs={'token': ical.feed_token(self.group.pk, ical.USER_FEED_SALT)}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_feed(self):
+        response = self.client.get(self.user_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar')
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('SUMMARY:Verlof test (8 uur)', content)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_group_feed(self):
+        response = self.client.get(self.group_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-WR-CALNAME:Verlof Support', b''.join(response.streaming_content).decode())
+
+    def test_not_modified(self):
+        response = self.client.get(self.user_url)
+        b''.join(response.streaming_content)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.user_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_content(self):
+        b''.join(self.client.get(self.user_url).streaming_content)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.user_url)
+        self.assertIn(b'SUMMARY:Verlof test (8 uur)', response.content)
+
+    def test_changed_after_new_registration(self):
+        response = self.client.get(self.user_url)
+        b''.join(response.streaming_content)
+        day = datetime.date(2019, 4, 1)
+        LeaveRegistration.objects.create(entitlement=self.entitlement, from_date=day, end_date=day,
+                                         amount_of_hours=4)
+        response = self.client.get(self.user_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('(4 uur)', b''.join(response.streaming_content).decode())
@@ -0,0 +1,128 @@
+import datetime
+import io
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_mommy import mommy
+
+from registration import jobs, tasks
+from registration.models import Entitlement, Job, LeaveRegistration
+
+
+@jobs.task
+def failing_task():
+    raise ValueError('failing')
+
+
+class JobQueueTest(TestCase):
+    def test_enqueue_and_run(self):
+        user = mommy.make(User, username='test')
+        mommy.make(Entitlement, user=user, year=2019, leave_hours=100)
+        job = tasks.export_year_entitlements.delay(year=2019)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(jobs.work(burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.result.splitlines()[1], 'test,2019,100,0')
+
+    def test_claim_is_exclusive(self):
+        job = tasks.compute_year_forecast.delay(year=2019)
+        self.assertEqual(jobs.claim().pk, job.pk)
+        self.assertIsNone(jobs.claim())
+
+    def test_claim_skips_future_jobs(self):
+        job = tasks.compute_year_forecast.delay(year=2019)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now() + datetime.timedelta(minutes=1))
+        self.assertIsNone(jobs.claim())
+
+    def test_visibility_timeout(self):
+        job = tasks.compute_year_forecast.delay(year=2019)
+        jobs.claim()
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+        reclaimed = jobs.claim()
+        self.assertEqual(reclaimed.pk, job.pk)
+        self.assertEqual(reclaimed.attempts, 2)
+
+    def test_visibility_timeout_after_last_attempt(self):
+        job = jobs.enqueue(failing_task.task_name, max_attempts=1)
+        jobs.claim()
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertIsNone(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_retry_then_fail(self):
+        job = jobs.enqueue(failing_task.task_name, max_attempts=2)
+        with self.assertLogs('registration.jobs', 'ERROR'):
+            jobs.run(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('ValueError', job.error)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('registration.jobs', 'ERROR'):
+            jobs.run(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    @override_settings(MANAGERS=[('HR', 'hr@yellenge.nl')])
+    def test_notify_leave_registration(self):
+        user = mommy.make(User, username='test', first_name='', last_name='')
+        entitlement = mommy.make(Entitlement, user=user, year=2019, leave_hours=100)
+        registration = mommy.make(LeaveRegistration, entitlement=entitlement, amount_of_hours=8,
+                                  from_date=datetime.date(2019, 3, 4), end_date=datetime.date(2019, 3, 4))
+        tasks.notify_leave_registration(registration.pk)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('test heeft 8 uur verlof ingevoerd', mail.outbox[0].body)
+
+    def test_run_worker_command(self):
+        tasks.compute_year_forecast.delay(year=2019)
+        stdout = io.StringIO()
+        call_command('run_worker', burst=True, stdout=stdout)
+        self.assertEqual(stdout.getvalue(), 'Processed 1 jobs\n')
+
+
+class JobViewTests(TestCase):
+    fixtures = ['users.json']
+
+    def test_export_and_poll(self):
+        self.client.login(username='employer', password='employeremployer')
+        response = self.client.post(reverse('admin-year-export', kwargs={'year': 2019}))
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse('job-detail', kwargs={'pk': job.pk}))
+        self.assertEqual(self.client.get(reverse('job-detail', kwargs={'pk': job.pk})).json()['status'], 'queued')
+        self.assertEqual(self.client.get(reverse('job-result', kwargs={'pk': job.pk})).status_code, 404)
+        jobs.work(burst=True)
+        self.assertEqual(self.client.get(reverse('job-detail', kwargs={'pk': job.pk})).json()['status'], 'done')
+        response = self.client.get(reverse('job-result', kwargs={'pk': job.pk}))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="job-{}.csv"'.format(job.pk))
+
+    def test_result_type_per_task(self):
+        self.client.login(username='employer', password='employeremployer')
+        job = jobs.enqueue(tasks.compute_year_forecast.task_name, year=2019)
+        unknown = jobs.enqueue('registration.tasks.removed_task')
+        Job.objects.filter(pk__in=[job.pk, unknown.pk]).update(status=Job.DONE, result='{}')
+        response = self.client.get(reverse('job-result', kwargs={'pk': job.pk}))
+        self.assertEqual((response['Content-Type'], response['Content-Disposition']),
+                         ('application/json', 'attachment; filename="job-{}.json"'.format(job.pk)))
+        response = self.client.get(reverse('job-result', kwargs={'pk': unknown.pk}))
+        self.assertEqual(response['Content-Type'], 'text/plain')
+
+    def test_job_of_other_user(self):
+        job = jobs.enqueue(tasks.compute_year_forecast.task_name, created_by=User.objects.get(username='employer'),
+                           year=2019)
+        self.client.login(username='nonuser', password='nonusernonuser')
+        self.assertEqual(self.client.get(reverse('job-detail', kwargs={'pk': job.pk})).status_code, 404)
+
+    def test_leave_registration_create_enqueues_notification(self):
+        self.client.login(username='employee', password='employeeemployee')
+        mommy.make(Entitlement, year=2019, user=User.objects.get(username='employee'))
+        self.client.post(reverse('leave-registration-create'),
+                         {'from_date': '2019-01-01', 'end_date': '2019-01-01', 'amount_of_hours': '8'})
+        self.assertEqual(Job.objects.get().task, tasks.notify_leave_registration.task_name)
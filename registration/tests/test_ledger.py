@@ -0,0 +1,128 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from model_mommy import mommy
+
+from registration import ledger
+from registration.models import Entitlement, LeaveRegistration, LedgerEvent, LedgerSnapshot
+
+
+class LedgerTest(TestCase):
+    def setUp(self):
+        self.user = mommy.make(User)
+        self.day = datetime.date(2019, 3, 1)
+
+    def at(self, moment):
+        return mock.patch('django.utils.timezone.now', return_value=moment)
+
+    def make_registration(self, entitlement, hours):
+        return LeaveRegistration.objects.create(entitlement=entitlement, from_date=self.day, end_date=self.day,
+                                                amount_of_hours=hours)
+
+    def test_point_in_time_balance(self):
+        january = timezone.make_aware(datetime.datetime(2019, 1, 1))
+        february = timezone.make_aware(datetime.datetime(2019, 2, 1))
+        april = timezone.make_aware(datetime.datetime(2019, 4, 1))
+        with self.at(january):
+            entitlement = Entitlement.objects.create(user=self.user, year=2019, leave_hours=100)
+            registration = self.make_registration(entitlement, 8)
+        with self.at(february):
+            registration.amount_of_hours = 16
+            registration.save()
+        with self.at(april):
+            entitlement.leave_hours = 120
+            entitlement.save()
+            registration.delete()
+        self.assertEqual(ledger.balance_at(entitlement.pk, january), (100, 8, 92))
+        self.assertEqual(ledger.balance_at(entitlement.pk, february), (100, 16, 84))
+        self.assertEqual(ledger.balance_at(entitlement.pk, april), (120, 0, 120))
+        self.assertEqual(ledger.balance_at(entitlement.pk, january - datetime.timedelta(days=1)), (0, 0, 0))
+
+    def test_move_registration_to_other_entitlement(self):
+        entitlement2019 = Entitlement.objects.create(user=self.user, year=2019, leave_hours=100)
+        entitlement2020 = Entitlement.objects.create(user=self.user, year=2020, leave_hours=100)
+        registration = self.make_registration(entitlement2019, 8)
+        registration.entitlement = entitlement2020
+        registration.save()
+        now = timezone.now()
+        self.assertEqual(ledger.balance_at(entitlement2019.pk, now).used_hours, 0)
+        self.assertEqual(ledger.balance_at(entitlement2020.pk, now).used_hours, 8)
+
+    def test_snapshot_taken_periodically(self):
+        entitlement = Entitlement.objects.create(user=self.user, year=2019, leave_hours=100)
+        with mock.patch('registration.ledger.SNAPSHOT_INTERVAL', 3):
+            for hours in range(1, 6):
+                self.make_registration(entitlement, hours)
+        snapshots = LedgerSnapshot.objects.filter(entitlement=entitlement).order_by('last_event_id')
+        self.assertEqual([(snapshot.leave_hours, snapshot.used_hours) for snapshot in snapshots],
+                         [(100, 3), (100, 15)])
+        self.make_registration(entitlement, 1)
+        self.assertEqual(ledger.balance_at(entitlement.pk, timezone.now()), (100, 16, 84))
+
+    def test_record_many_takes_due_snapshots(self):
+        entitlements = [Entitlement.objects.create(user=user, year=2019, leave_hours=100)
+                        for user in mommy.make(User, _quantity=2)]
+        with mock.patch('registration.ledger.SNAPSHOT_INTERVAL', 4):
+            for _ in range(2):
+                ledger.record_many([LedgerEvent(entitlement=entitlements[0], leave_hours_delta=1),
+                                    LedgerEvent(entitlement=entitlements[1], leave_hours_delta=0)])
+            self.assertFalse(LedgerSnapshot.objects.filter(entitlement__in=entitlements).exists())
+            ledger.record_many([LedgerEvent(entitlement=entitlements[0], leave_hours_delta=1)])
+        snapshots = LedgerSnapshot.objects.filter(entitlement__in=entitlements)
+        self.assertEqual([(snapshot.entitlement_id, snapshot.leave_hours) for snapshot in snapshots],
+                         [(entitlements[0].pk, 103)])
+        with self.assertNumQueries(2):
+            self.assertEqual(ledger.balance_at(entitlements[0].pk, timezone.now()), (103, 0, 103))
+
+    def test_balance_reads_from_snapshot(self):
+        entitlement = Entitlement.objects.create(user=self.user, year=2019, leave_hours=100)
+        self.make_registration(entitlement, 8)
+        ledger.take_snapshot(entitlement.pk)
+        self.make_registration(entitlement, 4)
+        with self.assertNumQueries(2):
+            self.assertEqual(ledger.balance_at(entitlement.pk, timezone.now()), (100, 12, 88))
+
+    def test_rebuild_keeps_moments_of_source_rows(self):
+        january = timezone.make_aware(datetime.datetime(2019, 1, 1))
+        february = timezone.make_aware(datetime.datetime(2019, 2, 1))
+        with self.at(january):
+            entitlement = Entitlement.objects.create(user=self.user, year=2019, leave_hours=100)
+        with self.at(february):
+            self.make_registration(entitlement, 8)
+        LeaveRegistration.objects.create(entitlement=entitlement, from_date=self.day, end_date=self.day,
+                                         amount_of_hours=4)
+        LeaveRegistration.objects.filter(amount_of_hours=4).update(created_at=None)
+        Entitlement.objects.filter(pk=entitlement.pk).update(updated_at=timezone.make_aware(
+            datetime.datetime(2019, 3, 1)))
+        ledger.rebuild()
+        self.assertEqual(ledger.balance_at(entitlement.pk, january), (0, 0, 0))
+        self.assertEqual(ledger.balance_at(entitlement.pk, february), (100, 8, 92))
+        self.assertEqual(ledger.balance_at(entitlement.pk, timezone.now()), (100, 12, 88))
+
+    def test_rebuild(self):
+        entitlement = mommy.make(Entitlement, user=self.user, year=2019, leave_hours=100)
+        self.make_registration(entitlement, 8)
+        self.make_registration(entitlement, 4)
+        call_command('rebuild_ledger', stdout=mock.Mock())
+        self.assertEqual(LedgerEvent.objects.count(), 3)
+        snapshot = LedgerSnapshot.objects.get()
+        self.assertEqual((snapshot.leave_hours, snapshot.used_hours), (100, 12))
+        self.assertEqual(ledger.balance_at(entitlement.pk, timezone.now()), (100, 12, 88))
+
+
+class AdminEntitlementDetailBalanceTests(TestCase):
+    fixtures = ['users.json']
+
+    def test_balance_at_date(self):
+        self.client.login(username='employer', password='employeremployer')
+        user = User.objects.get(username='employee')
+        Entitlement.objects.create(user=user, year=2019, leave_hours=100)
+        response = self.client.get(reverse('admin-entitlement-detail', kwargs={'user_id': user.pk, 'year': 2019}),
+                                   {'balance_date': timezone.localdate().isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['balance_at'], (100, 0, 100))
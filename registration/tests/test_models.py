@@ -123,6 +123,34 @@ class EntitlementTest(TestCase):
         self.assertEqual(entitlement.get_used_hours(), 10)
 
 
+    def test_leave_type_balances(self):
+        user = mommy.make(User)
+        entitlement = mommy.make(Entitlement, user=user, year=2019, leave_hours=200, extra_statutory_leave_hours=40,
+                                 special_leave_hours=16)
+        day = datetime.date(2019, 5, 1)
+        for leave_type, hours, status in ((LeaveRegistration.STATUTORY, 24, LeaveRegistration.APPROVED),
+                                          (LeaveRegistration.EXTRA_STATUTORY, 8, LeaveRegistration.REQUESTED),
+                                          (LeaveRegistration.SPECIAL, 8, LeaveRegistration.REJECTED),
+                                          (LeaveRegistration.UNPAID, 4, LeaveRegistration.APPROVED)):
+            mommy.make(LeaveRegistration, entitlement=entitlement, from_date=day, end_date=day,
+                       amount_of_hours=hours, leave_type=leave_type, status=status)
+        with self.assertNumQueries(1):
+            entitlement = Entitlement.objects.annotate_used_leave_hours().annotate_leave_type_hours() \
+                .get(pk=entitlement.pk)
+        self.assertEqual(entitlement.get_used_hours(), 36)
+        self.assertEqual([(balance.leave_type, balance.leave_hours, balance.used_hours, balance.remainder_hours,
+                           balance.expires_on) for balance in entitlement.get_leave_type_balances()],
+                         [('statutory', 144, 24, 120, datetime.date(2020, 6, 30)),
+                          ('extra_statutory', 40, 8, 32, datetime.date(2024, 12, 31)),
+                          ('special', 16, 0, 16, datetime.date(2019, 12, 31)),
+                          ('unpaid', 0, 4, -4, datetime.date(2019, 12, 31))])
+
+    def test_leave_type_balances_no_attribute(self):
+        entitlement = mommy.make(Entitlement, year=2019, leave_hours=100)
+        with self.assertRaises(AttributeError):
+            entitlement.get_leave_type_balances()
+
+
 class LeaveRegistrationTest(TestCase):
     def test_leaveregistration(self):
         amount_of_hours = 8
@@ -0,0 +1,61 @@
+import cProfile
+import os
+import pstats
+import shutil
+import tempfile
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from absence import profiling
+
+
+def recurse(depth):
+    return recurse(depth - 1) if depth else sum(range(10000))
+
+
+class CollapsedStacksTest(TestCase):
+    def test_recursion_is_folded(self):
+        profile = cProfile.Profile()
+        profile.runcall(recurse, 5)
+        lines = profiling.collapsed_stacks(pstats.Stats(profile))
+        stacks = [line.rsplit(' ', 1)[0].split(';') for line in lines]
+        self.assertTrue(all(int(line.rsplit(' ', 1)[1]) > 0 for line in lines))
+        self.assertTrue(any(stack[0].endswith(':recurse') for stack in stacks))
+        self.assertTrue(any(stack[-1].endswith('sum>') for stack in stacks))
+        self.assertTrue(all(sum(frame.endswith(':recurse') for frame in stack) <= 1 for stack in stacks))
+
+
+class ProfilingMiddlewareTest(TestCase):
+    fixtures = ['users.json']
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.url = reverse('admin-users-entitlement-list', kwargs={'year': 2019})
+
+    def profiles(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_staff_request_with_header_is_profiled(self):
+        self.client.login(username='employer', password='employeremployer')
+        with override_settings(PROFILING_DIR=self.directory):
+            response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertTrue(response['X-Profile'].endswith('-admin-users-entitlement-list-AdminUsersEntitlementList'))
+        self.assertEqual(self.profiles(), [response['X-Profile'] + '.collapsed', response['X-Profile'] + '.prof'])
+        stats = pstats.Stats(os.path.join(self.directory, response['X-Profile'] + '.prof'))
+        self.assertTrue(any(name == 'get_queryset' for _, _, name in stats.stats))
+
+    def test_other_requests_are_not_profiled(self):
+        with override_settings(PROFILING_DIR=self.directory):
+            self.client.login(username='employer', password='employeremployer')
+            self.assertNotIn('X-Profile', self.client.get(self.url))
+            self.client.login(username='nonuser', password='nonusernonuser')
+            self.client.get(self.url + '?_profile=1')
+        self.assertEqual(self.profiles(), [])
+
+    def test_disabled_without_directory(self):
+        with override_settings(PROFILING_DIR=None):
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling.ProfilingMiddleware(lambda request: None)
@@ -0,0 +1,79 @@
+import datetime
+import io
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from model_mommy import mommy
+
+from registration import prorata
+from registration.models import Contract, Entitlement, LedgerEvent
+
+
+@override_settings(FULL_TIME_LEAVE_HOURS=200, FULL_TIME_HOURS_PER_WEEK=40)
+class ProRataTest(TestCase):
+    def setUp(self):
+        self.full_time, self.part_time, self.joiner = mommy.make(User, _quantity=3)
+        Contract.objects.create(user=self.full_time, hours_per_week=40, start_date=datetime.date(2015, 1, 1))
+        Contract.objects.create(user=self.part_time, hours_per_week=20, start_date=datetime.date(2020, 1, 1),
+                                end_date=datetime.date(2025, 12, 31))
+        Contract.objects.create(user=self.part_time, hours_per_week=32, start_date=datetime.date(2026, 1, 1))
+        # Joins on 2 July, 183 of the 365 days.
+        Contract.objects.create(user=self.joiner, hours_per_week=36, start_date=datetime.date(2026, 7, 2))
+        Entitlement.objects.create(user=self.full_time, year=2026, leave_hours=200)
+        Entitlement.objects.create(user=self.part_time, year=2026, leave_hours=100)
+
+    def leave_hours(self):
+        return dict(Entitlement.objects.filter(year=2026).values_list('user_id', 'leave_hours'))
+
+    def test_compute(self):
+        self.assertEqual(prorata.compute(2026), {self.full_time.pk: 200, self.part_time.pk: 160, self.joiner.pk: 90})
+        self.assertEqual(prorata.compute(2025), {self.full_time.pk: 200, self.part_time.pk: 100})
+
+    def test_recalculate_only_writes_changes(self):
+        self.assertEqual(prorata.recalculate(2026), (1, 1, 1))
+        self.assertEqual(self.leave_hours(), {self.full_time.pk: 200, self.part_time.pk: 160, self.joiner.pk: 90})
+        self.assertEqual(LedgerEvent.objects.filter(entitlement__user=self.part_time).totals()['leave_hours'], 160)
+        self.assertEqual(prorata.recalculate(2026), (0, 0, 3))
+
+    def test_collective_agreement_change(self):
+        prorata.recalculate(2026)
+        version = Entitlement.objects.get(user=self.full_time).version
+        self.assertEqual(prorata.recalculate(2026, full_time_leave_hours=216), (0, 3, 0))
+        self.assertEqual(self.leave_hours()[self.part_time.pk], 173)
+        self.assertEqual(Entitlement.objects.get(user=self.full_time).version, version + 1)
+
+    def test_accruing_entitlements_are_left_alone(self):
+        Entitlement.objects.filter(user=self.part_time).update(accrual_hours=100)
+        self.assertEqual(prorata.recalculate(2026), (1, 0, 2))
+        self.assertEqual(self.leave_hours()[self.part_time.pk], 100)
+
+    def test_refuses_less_than_the_other_leave_types(self):
+        for user, username in ((self.full_time, 'full-time'), (self.part_time, 'part-time')):
+            user.username = username
+            user.save()
+        Entitlement.objects.filter(user=self.full_time).update(special_leave_hours=150, unpaid_leave_hours=40)
+        Entitlement.objects.filter(user=self.part_time).update(extra_statutory_leave_hours=170)
+        with self.assertRaisesMessage(prorata.InvalidLeaveHours, 'Het verlofsaldo wordt lager dan de uren per '
+                                                                 'verlofsoort voor: full-time, part-time.'):
+            prorata.recalculate(2026, full_time_leave_hours=180)
+        self.assertEqual(self.leave_hours(), {self.full_time.pk: 200, self.part_time.pk: 100})
+        with self.assertRaisesMessage(CommandError, 'part-time'):
+            call_command('recalculate_entitlements', 2026, dry_run=True, stdout=io.StringIO())
+
+    def test_contract_cannot_end_before_it_starts(self):
+        contract = Contract(user=self.joiner, hours_per_week=36, start_date=datetime.date(2026, 7, 2),
+                            end_date=datetime.date(2026, 7, 1))
+        with self.assertRaises(ValidationError):
+            contract.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            contract.save()
+
+    def test_command_dry_run(self):
+        stdout = io.StringIO()
+        call_command('recalculate_entitlements', 2026, dry_run=True, stdout=stdout)
+        self.assertEqual(stdout.getvalue(),
+                         'Would recalculate entitlements for 2026: 1 created, 1 updated, 1 unchanged\n')
+        self.assertEqual(len(self.leave_hours()), 2)
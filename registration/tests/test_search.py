@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from registration import search
+from registration.models import Entitlement, LeaveRegistration, UserSearchTerm
+
+
+class UserSearchTest(TestCase):
+    def setUp(self):
+        self.jan = User.objects.create(username='jvries', first_name='Jan', last_name='de Vries',
+                                       email='jan@example.com')
+        self.jose = User.objects.create(username='jose', first_name='José', last_name='Álvarez',
+                                        email='jose@example.com')
+
+    def test_terms_are_normalized(self):
+        self.assertEqual(search.user_terms('JVries', 'Jan', 'de Vries', 'Jan@Example.com'),
+                         ['de', 'jan', 'jan@example.com', 'jvries', 'vries'])
+        self.assertEqual(sorted(UserSearchTerm.objects.filter(user=self.jose).values_list('term', flat=True)),
+                         ['alvarez', 'jose', 'jose@example.com'])
+
+    def test_prefix_search(self):
+        self.assertEqual(list(search.matching_users('j').order_by('username')), [self.jose, self.jan])
+        self.assertEqual(list(search.matching_users('VRI')), [self.jan])
+        self.assertEqual(list(search.matching_users('alv')), [self.jose])
+        self.assertEqual(list(search.matching_users('jan vr')), [self.jan])
+        self.assertEqual(list(search.matching_users('jan alv')), [])
+
+    def test_index_follows_changes(self):
+        self.jan.last_name = 'Bakker'
+        self.jan.save()
+        self.assertEqual(list(search.matching_users('vries')), [])
+        self.assertEqual(list(search.matching_users('bak')), [self.jan])
+
+    def test_typeahead_in_one_query(self):
+        entitlement = mommy.make(Entitlement, user=self.jan, year=2019, leave_hours=100)
+        mommy.make(LeaveRegistration, entitlement=entitlement, amount_of_hours=8, _quantity=2)
+        mommy.make(LeaveRegistration, entitlement=entitlement, amount_of_hours=8, status=LeaveRegistration.REJECTED)
+        with self.assertNumQueries(1):
+            results = search.typeahead('j', 2019)
+        self.assertEqual([(result['username'], result['leave_hours'], result['used_leave_hours'])
+                          for result in results], [('jose', None, 0), ('jvries', 100, 16)])
+
+
+class UserSearchViewTests(TestCase):
+    fixtures = ['users.json']
+
+    def test_logged_in_no_permission(self):
+        self.client.login(username='nonuser', password='nonusernonuser')
+        response = self.client.get(reverse('user-search'), {'q': 'emp'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_typeahead(self):
+        self.client.login(username='employer', password='employeremployer')
+        employee = User.objects.get(username='employee')
+        Entitlement.objects.create(user=employee, year=2019, leave_hours=100)
+        response = self.client.get(reverse('user-search'), {'q': 'employe', 'year': 2019})
+        results = response.json()['results']
+        self.assertEqual([result['title'] for result in results], ['employee', 'employer'])
+        self.assertEqual(results[0]['remainder_hours'], 100)
+        self.assertEqual(results[0]['url'], reverse('admin-entitlement-list', kwargs={'user_id': employee.pk}))
+
+    def test_user_list_filtered(self):
+        self.client.login(username='employer', password='employeremployer')
+        response = self.client.get(reverse('user-list'), {'q': 'employee'})
+        self.assertEqual([user.username for user in response.context['users']], ['employee'])
@@ -0,0 +1,59 @@
+import datetime
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from registration import series
+from registration.models import Entitlement, LeaveRegistration
+
+
+class BalanceSeriesTest(TestCase):
+    fixtures = ['users.json']
+
+    def setUp(self):
+        cache.clear()
+        self.employee = User.objects.get(username='employee')
+        self.entitlement = Entitlement.objects.create(user=self.employee, year=2026, leave_hours=100)
+        Entitlement.objects.create(user=self.employee, year=2025, leave_hours=100)
+        for day, hours, status in ((5, 8, LeaveRegistration.APPROVED), (2, 4, LeaveRegistration.REQUESTED),
+                                   (5, 2, LeaveRegistration.APPROVED), (7, 8, LeaveRegistration.REJECTED)):
+            self.register(datetime.date(2026, 3, day), hours, status)
+
+    def register(self, day, hours, status=LeaveRegistration.APPROVED):
+        LeaveRegistration.objects.create(entitlement=self.entitlement, from_date=day, end_date=day,
+                                         amount_of_hours=hours, status=status)
+
+    def test_running_balance_in_one_query(self):
+        entitlements = Entitlement.objects.filter(user=self.employee, year=2026)
+        with self.assertNumQueries(2):
+            balance_series, = series.get_balance_series(entitlements, 'test')
+        self.assertEqual(balance_series.dates, [datetime.date(2026, 3, 2), datetime.date(2026, 3, 5)])
+        self.assertEqual(balance_series.remainder_hours, [96, 86])
+
+    def test_cached_until_data_changes(self):
+        entitlements = Entitlement.objects.filter(user=self.employee, year=2026)
+        series.get_balance_series(entitlements, 'test')
+        with self.assertNumQueries(1):
+            series.get_balance_series(entitlements, 'test')
+        self.register(datetime.date(2026, 4, 1), 6)
+        self.assertEqual(series.get_balance_series(entitlements, 'test')[0].remainder_hours, [96, 86, 80])
+
+    def test_views(self):
+        self.client.login(username='employee', password='employeeemployee')
+        response = self.client.get(reverse('entitlement-balance-series', kwargs={'year': 2026}))
+        self.assertEqual(response.json(), {'year': 2026, 'series': [{
+            'user': self.employee.pk, 'username': 'employee', 'leave_hours': 100,
+            'dates': ['2026-03-02', '2026-03-05'], 'remainder_hours': [96, 86]}]})
+        group = Group.objects.create(name='Support')
+        group.user_set.add(self.employee, User.objects.get(username='employer'))
+        Entitlement.objects.create(user=User.objects.get(username='employer'), year=2026, leave_hours=50)
+        self.client.login(username='employer', password='employeremployer')
+        response = self.client.get(reverse('admin-group-balance-series', kwargs={'group_id': group.pk, 'year': 2026}))
+        self.assertEqual([(user['username'], user['remainder_hours']) for user in response.json()['series']],
+                         [('employee', [96, 86]), ('employer', [])])
+        response = self.client.get(reverse('admin-entitlement-detail', kwargs={'user_id': self.employee.pk,
+                                                                               'year': 2026}))
+        self.assertContains(response, reverse('admin-entitlement-balance-series', kwargs={
+            'user_id': self.employee.pk, 'year': 2026}))
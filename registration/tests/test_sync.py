@@ -0,0 +1,84 @@
+import base64
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from registration import sync
+from registration.models import Entitlement, LedgerEvent
+
+
+class UpsertEntitlementsTest(TestCase):
+    def setUp(self):
+        self.alice = mommy.make(User, username='alice')
+        self.bob = mommy.make(User, username='bob')
+        Entitlement.objects.create(user=self.alice, year=2026, leave_hours=200)
+        Entitlement.objects.create(user=self.bob, year=2026, leave_hours=160)
+        self.records = sync.parse([
+            {'username': 'alice', 'year': 2026, 'leave_hours': 200},
+            {'username': 'bob', 'year': '2026', 'leave_hours': '100'},
+            {'username': 'bob', 'year': 2026, 'leave_hours': 180},
+            {'username': 'bob', 'year': 2027, 'leave_hours': 180},
+            {'username': 'carol', 'year': 2026, 'leave_hours': 200},
+        ])
+
+    def test_parse_rejects_malformed_records(self):
+        with self.assertRaisesMessage(ValueError, 'Invalid record'):
+            sync.parse([{'username': 'alice', 'year': 2026}])
+
+    def test_upsert(self):
+        with self.assertNumQueries(10):
+            upsert = sync.upsert_entitlements(self.records)
+        self.assertEqual(upsert, (1, 1, 1, ['carol']))
+        self.assertEqual(sorted(Entitlement.objects.values_list('user__username', 'year', 'leave_hours')),
+                         [('alice', 2026, 200), ('bob', 2026, 180), ('bob', 2027, 180)])
+        self.assertEqual(LedgerEvent.objects.filter(entitlement__user=self.bob).totals()['leave_hours'], 360)
+
+    def test_rerun_changes_nothing(self):
+        sync.upsert_entitlements(self.records)
+        versions = list(Entitlement.objects.order_by('pk').values_list('version', flat=True))
+        self.assertEqual(sync.upsert_entitlements(self.records), (0, 0, 3, ['carol']))
+        self.assertEqual(list(Entitlement.objects.order_by('pk').values_list('version', flat=True)), versions)
+
+    def test_command(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as records:
+            records.write('username,year,leave_hours\nalice,2026,210\ncarol,2026,200\n')
+        self.addCleanup(os.remove, path)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('sync_entitlements', path, stdout=stdout, stderr=stderr)
+        self.assertEqual((stdout.getvalue(), stderr.getvalue()),
+                         ('0 created, 1 updated, 0 unchanged\n', 'Unknown users: carol\n'))
+        with self.assertRaises(CommandError):
+            call_command('sync_entitlements', path + '.missing', stdout=stdout)
+
+
+class EntitlementSyncViewTest(TestCase):
+    def setUp(self):
+        self.hr = User.objects.create_user('hr', password='hrhrhrhrhr')
+        self.hr.user_permissions.add(*Permission.objects.filter(codename__in=('add_entitlement',
+                                                                              'change_entitlement')))
+        mommy.make(User, username='alice')
+
+    def post(self, records, username='hr', password='hrhrhrhrhr'):
+        credentials = base64.b64encode('{}:{}'.format(username, password).encode()).decode()
+        return self.client.post(reverse('entitlement-sync'), json.dumps(records), content_type='application/json',
+                                HTTP_AUTHORIZATION='Basic {}'.format(credentials))
+
+    def test_upsert(self):
+        response = self.post([{'username': 'alice', 'year': 2026, 'leave_hours': 200}])
+        self.assertEqual(response.json(), {'created': 1, 'updated': 0, 'unchanged': 0, 'unknown': []})
+
+    def test_authentication_and_validation(self):
+        self.assertEqual(self.post([], password='wrong').status_code, 401)
+        self.assertEqual(self.client.post(reverse('entitlement-sync'), '[]',
+                                          content_type='application/json').status_code, 401)
+        User.objects.create_user('other', password='otherother')
+        self.assertEqual(self.post([], username='other', password='otherother').status_code, 403)
+        self.assertEqual(self.post({'username': 'alice'}).status_code, 400)
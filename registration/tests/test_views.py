@@ -177,6 +177,19 @@ class EntitlementDetailTests(TestCase):
                                  ordered=False)
         self.assertContains(response, '<tr>', count=9)
 
+    def test_entitlement_data_in_two_queries(self):
+        self.client.login(username='employer', password='employeremployer')
+        user = User.objects.get(username='employer')
+        for year in (2018, 2019, 2020):
+            entitlement = mommy.make(Entitlement, year=year, user=user)
+            mommy.make(LeaveRegistration, entitlement=entitlement)
+        # Session and user lookups, the data version, then one query for the entitlements and one for the
+        # registrations.
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('entitlement-detail', kwargs={'year': 2019}))
+        self.assertEqual(response.context['default_entitlement'].year, 2020)
+        self.assertEqual(len(response.context_data['all_entitlements']), 3)
+
 
 class LeaveRegistrationCreateTests(TestCase):
     fixtures = ['users.json']
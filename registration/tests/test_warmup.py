@@ -0,0 +1,24 @@
+import io
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from absence import warmup
+
+
+class WarmUpTest(SimpleTestCase):
+    def test_resolve_urls(self):
+        self.assertGreater(warmup.resolve_urls(), 30)
+
+    def test_compile_templates(self):
+        names = set(warmup.template_names())
+        self.assertIn('base.html', names)
+        self.assertIn('registration/entitlement_detail.html', names)
+        self.assertEqual(warmup.compile_templates(), len(names))
+
+    def test_benchmark_startup(self):
+        stdout = io.StringIO()
+        call_command('benchmark_startup', runs=1, stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual([line.split(':')[0] for line in lines], ['cold', 'warm'])
+        self.assertTrue(all(line.endswith('(200 OK)') for line in lines))
@@ -4,10 +4,15 @@ from .views import EntitlementDetail, LeaveRegistrationCreate, LeaveRegistration
     EntitlementList, UserList, UserCreate, UserUpdate, UserDelete, \
     AdminEntitlementList, AdminEntitlementDetail, AdminEntitlementCreate, AdminEntitlementUpdate, \
     AdminEntitlementDelete, AdminLeaveRegistrationDelete, \
-    AdminLeaveRegistrationCreate, AdminLeaveRegistrationUpdate, AdminUsersEntitlementList
+    AdminLeaveRegistrationCreate, AdminLeaveRegistrationUpdate, AdminUsersEntitlementList, AdminYearForecast, \
+    UserLeaveCalendar, GroupLeaveCalendar, AdminYearExport, JobDetail, JobResult, \
+    LeaveRegistrationApprovalList, AdminEntitlementChanges, UserSearch, \
+    AdminBulkEntitlement, AdminCapacityHeatmap, EntitlementSync, EntitlementBalanceSeries, \
+    AdminEntitlementBalanceSeries, AdminGroupBalanceSeries
 
 urlpatterns = [
     path('entitlement/<int:year>', EntitlementDetail.as_view(), name='entitlement-detail'),
+    path('entitlement/<int:year>/balance', EntitlementBalanceSeries.as_view(), name='entitlement-balance-series'),
     path('leave_registration/create', LeaveRegistrationCreate.as_view(), name='leave-registration-create'),
     path('leave_registration/<int:pk>/update', LeaveRegistrationUpdate.as_view(),
          name='leave-registration-update'),
@@ -16,6 +21,20 @@ urlpatterns = [
     path('entitlement_list', EntitlementList.as_view(), name='entitlement-list'),
     path('useradmin/<int:year>', AdminUsersEntitlementList.as_view(),
          name='admin-users-entitlement-list'),
+    path('useradmin/<int:year>/changes', AdminEntitlementChanges.as_view(),
+         name='admin-users-entitlement-changes'),
+    path('useradmin/forecast/<int:year>', AdminYearForecast.as_view(), name='admin-year-forecast'),
+    path('useradmin/capacity/<int:group_id>/<int:year>', AdminCapacityHeatmap.as_view(),
+         name='admin-capacity-heatmap'),
+    path('useradmin/balance/<int:group_id>/<int:year>', AdminGroupBalanceSeries.as_view(),
+         name='admin-group-balance-series'),
+    path('useradmin/export/<int:year>', AdminYearExport.as_view(), name='admin-year-export'),
+    path('api/entitlements', EntitlementSync.as_view(), name='entitlement-sync'),
+    path('jobs/<int:pk>', JobDetail.as_view(), name='job-detail'),
+    path('jobs/<int:pk>/result', JobResult.as_view(), name='job-result'),
+    path('useradmin/approvals', LeaveRegistrationApprovalList.as_view(), name='leave-registration-approval-list'),
+    path('useradmin/bulk', AdminBulkEntitlement.as_view(), name='admin-bulk-entitlement'),
+    path('useradmin/search', UserSearch.as_view(), name='user-search'),
     path('useradmin/createuser', UserCreate.as_view(), name='user-create'),
     path('useradmin/<int:pk>/update', UserUpdate.as_view(), name='user-update'),
     path('useradmin/<int:pk>/delete', UserDelete.as_view(), name='user-delete'),
@@ -23,6 +42,8 @@ urlpatterns = [
          name='admin-entitlement-list'),
     path('useradmin/entitlement/<int:user_id>/<int:year>', AdminEntitlementDetail.as_view(),
          name='admin-entitlement-detail'),
+    path('useradmin/entitlement/<int:user_id>/<int:year>/balance', AdminEntitlementBalanceSeries.as_view(),
+         name='admin-entitlement-balance-series'),
     path('useradmin/entitlement/<int:user_id>/create', AdminEntitlementCreate.as_view(),
          name='admin-entitlement-create'),
     path('useradmin/entitlement/<int:pk>/update', AdminEntitlementUpdate.as_view(),
@@ -37,5 +58,7 @@ urlpatterns = [
          name='admin-leaveregistration-delete'),
     path('useradmin/users/', UserList.as_view(),
          name='user-list'),
+    path('ical/user/<str:token>.ics', UserLeaveCalendar.as_view(), name='user-leave-calendar'),
+    path('ical/group/<str:token>.ics', GroupLeaveCalendar.as_view(), name='group-leave-calendar'),
     path('', views.Index.as_view(), name='index')
 ]
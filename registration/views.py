@@ -1,13 +1,35 @@
-from django.contrib.auth.models import User
+import base64
+import datetime
+import hashlib
+import json
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import Group, User
+from django.core import signing
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
-from django.urls import reverse_lazy
-from django.views.generic import TemplateView, DetailView, CreateView, UpdateView, DeleteView, ListView
-from django.http import HttpResponseRedirect
-
-from .models import Entitlement, LeaveRegistration
-from .forms import LeaveRegistrationForm, UserForm, EntitlementForm, AdminEntitlementForm
-
-from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.generic import View, TemplateView, FormView, DetailView, CreateView, UpdateView, DeleteView, ListView
+from django.forms import CheckboxInput
+from django.http import Http404, HttpResponse, HttpResponseForbidden, HttpResponseRedirect, JsonResponse, \
+    StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+
+from . import approval, archive, balances, booking, bulk, capacity, changes, ical, jobs, ledger, search, series, sync, \
+    tasks
+from .context_processors import get_default_entitlement
+from .forecast import get_year_forecast
+from .models import ArchivedEntitlement, ArchivedLeaveRegistration, Entitlement, Job, LeaveRegistration
+from .forms import LeaveRegistrationForm, UserForm, EntitlementForm, AdminEntitlementForm, BalanceDateForm, \
+    BulkEntitlementForm, ApprovalGroupForm
+
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 
 
 class Index(PermissionRequiredMixin, TemplateView):
@@ -16,7 +38,34 @@ class Index(PermissionRequiredMixin, TemplateView):
     login_url = reverse_lazy('login')
 
 
-class EntitlementList(PermissionRequiredMixin, ListView):
+class EntitlementVersionConditionalMixin:
+    """Answer 304 Not Modified while the entitlements and registrations shown on the page are unchanged.
+
+    The validators are derived from the entitlements of the users on the page only, so changes to the session do
+    not invalidate them.
+    """
+
+    def get_version_user_ids(self):
+        return {self.request.user.pk}
+
+    def get(self, request, *args, **kwargs):
+        change_stamp = Entitlement.objects.filter(user_id__in=self.get_version_user_ids()).change_stamp()
+        version = '{}:{}:{}'.format(request.get_full_path(), request.user.pk,
+                                    Entitlement.objects.data_version(change_stamp))
+        etag = '"{}"'.format(hashlib.md5(version.encode()).hexdigest())
+        last_modified = change_stamp['last_update'] and int(change_stamp['last_update'].timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super(EntitlementVersionConditionalMixin, self).get(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+
+class EntitlementList(PermissionRequiredMixin, EntitlementVersionConditionalMixin, ListView):
     permission_required = 'registration.view_entitlement'
     template_name = 'registration/entitlement_list.html'
     model = Entitlement
@@ -24,31 +73,104 @@ class EntitlementList(PermissionRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super(EntitlementList, self).get_context_data(**kwargs)
-        entitlements = Entitlement.objects.filter(user=self.request.user).annotate_used_leave_hours()
-        context['all_entitlements'] = entitlements
+        entitlements = Entitlement.objects.filter(user=self.request.user) \
+            .annotate_used_leave_hours() \
+            .annotate_leave_type_hours()
+        archived_entitlements = ArchivedEntitlement.objects.filter(user=self.request.user)
+        context['all_entitlements'] = sorted(chain(archived_entitlements, entitlements),
+                                             key=lambda entitlement: entitlement.year)
+        context['calendar_url'] = self.request.build_absolute_uri(reverse(
+            'user-leave-calendar', kwargs={'token': ical.feed_token(self.request.user.pk, ical.USER_FEED_SALT)}))
         return context
 
 
-class EntitlementDetail(PermissionRequiredMixin, DetailView):
-    permission_required = 'registration.view_entitlement'
-    model = Entitlement
-    login_url = reverse_lazy('login')
+class UserEntitlementYearMixin:
+    """Load all entitlements of a user in one query and pick the requested year from them.
 
-    def get_object(self, queryset=None):
-        return get_object_or_404(self.get_queryset(), user=self.request.user, year=self.kwargs['year'])
+    Years that are not in the entitlement table are read from the archive.
+    """
+    archived = False
+    context_object_name = 'entitlement'
+    # The URL keyword argument with the id of the user whose entitlements are shown; None for the logged-in user.
+    entitlement_user_kwarg = None
+
+    def get_entitlement_user_id(self):
+        if self.entitlement_user_kwarg is None:
+            return self.request.user.pk
+        return self.kwargs[self.entitlement_user_kwarg]
 
     def get_queryset(self):
-        return super(EntitlementDetail, self).get_queryset().annotate_used_leave_hours()
+        return super(UserEntitlementYearMixin, self).get_queryset() \
+            .filter(user_id=self.get_entitlement_user_id()) \
+            .select_related('user') \
+            .annotate_used_leave_hours() \
+            .order_by('year')
+
+    def get_object(self, queryset=None):
+        self.all_entitlements = list(self.get_queryset())
+        if self.get_entitlement_user_id() == self.request.user.pk:
+            self.request.default_entitlement = get_default_entitlement(self.all_entitlements)
+        for entitlement in self.all_entitlements:
+            if entitlement.year == self.kwargs['year']:
+                return entitlement
+        archived_entitlements = list(ArchivedEntitlement.objects.filter(user_id=self.get_entitlement_user_id())
+                                     .select_related('user').order_by('year'))
+        for entitlement in archived_entitlements:
+            if entitlement.year == self.kwargs['year']:
+                self.archived = True
+                self.all_entitlements = archived_entitlements + self.all_entitlements
+                return entitlement
+        raise Http404('No entitlement for this year')
 
     def get_context_data(self, **kwargs):
-        context = super(EntitlementDetail, self).get_context_data(**kwargs)
-        context['all_entitlements'] = Entitlement.objects.filter(user=self.request.user)
-        leave_registrations = LeaveRegistration.objects.filter(entitlement=self.object)
-        context['all_leave_registrations'] = leave_registrations
+        context = super(UserEntitlementYearMixin, self).get_context_data(**kwargs)
+        context['all_entitlements'] = self.all_entitlements
+        context['archived'] = self.archived
+        if self.archived:
+            context['all_leave_registrations'] = ArchivedLeaveRegistration.objects.filter(entitlement=self.object)
+        else:
+            context['all_leave_registrations'] = LeaveRegistration.objects.filter(entitlement=self.object)
         return context
 
 
-class LeaveRegistrationCreate(PermissionRequiredMixin, CreateView):
+class EntitlementDetail(PermissionRequiredMixin, EntitlementVersionConditionalMixin, UserEntitlementYearMixin,
+                        DetailView):
+    permission_required = 'registration.view_entitlement'
+    model = Entitlement
+    template_name = 'registration/entitlement_detail.html'
+    login_url = reverse_lazy('login')
+
+
+class LeaveRegistrationSaveMixin:
+    """Save the registration against the entitlement of its year, with a clean form error when that fails."""
+
+    def save_leave_registration(self, form, user_id, status):
+        self.object = form.save(commit=False)
+        self.object.entitlement = Entitlement.objects.get(user_id=user_id, year=self.object.from_date.year)
+        self.object.status = status
+        breaches = capacity.breaches(user_id, self.object.from_date, self.object.end_date)
+        if breaches and not form.cleaned_data.get('confirm_peak_absence'):
+            form.add_error(None, self.describe_breaches(breaches))
+            form.fields['confirm_peak_absence'].widget = CheckboxInput()
+            return self.form_invalid(form)
+        try:
+            booking.save_leave_registration(self.object)
+        except (booking.ConcurrentUpdate, booking.InsufficientBalance) as error:
+            form.add_error(None, str(error))
+            return self.form_invalid(form)
+        capacity.record_breaches(self.object, breaches)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def describe_breaches(self, breaches):
+        groups = {}
+        for breach in breaches:
+            groups.setdefault((breach.group_name, breach.threshold), []).append(breach.date)
+        return ' '.join('In {} is op {} meer dan {}% van de medewerkers afwezig.'.format(
+            name, ', '.join('{:%d-%m-%Y}'.format(date) for date in dates), threshold)
+            for (name, threshold), dates in groups.items()) + ' Vink "Toch opslaan" aan om het verlof op te slaan.'
+
+
+class LeaveRegistrationCreate(PermissionRequiredMixin, LeaveRegistrationSaveMixin, CreateView):
     permission_required = 'registration.add_leaveregistration'
     template_name = 'registration/leaveregistration_create.html'
     model = LeaveRegistration
@@ -65,17 +187,16 @@ class LeaveRegistrationCreate(PermissionRequiredMixin, CreateView):
         return kwargs
 
     def form_valid(self, form):
-        self.object = form.save(commit=False)
-        self.object.user = self.request.user
-        self.object.entitlement = Entitlement.objects.get(user=self.object.user, year=self.object.from_date.year)
-        self.object.save()
-        return HttpResponseRedirect(self.get_success_url())
+        response = self.save_leave_registration(form, self.request.user.pk, LeaveRegistration.REQUESTED)
+        if self.object.pk:
+            tasks.notify_leave_registration.delay(created_by=self.request.user, leave_registration_id=self.object.pk)
+        return response
 
     def get_success_url(self):
         return reverse_lazy('entitlement-detail', kwargs={'year': self.object.from_date.year})
 
 
-class LeaveRegistrationUpdate(PermissionRequiredMixin, UpdateView):
+class LeaveRegistrationUpdate(PermissionRequiredMixin, LeaveRegistrationSaveMixin, UpdateView):
     permission_required = 'registration.change_leaveregistration'
     template_name = 'registration/leaveregistration_update.html'
     model = LeaveRegistration
@@ -94,6 +215,9 @@ class LeaveRegistrationUpdate(PermissionRequiredMixin, UpdateView):
     def get_queryset(self):
         return super(LeaveRegistrationUpdate, self).get_queryset().filter(entitlement__user=self.request.user)
 
+    def form_valid(self, form):
+        return self.save_leave_registration(form, self.request.user.pk, LeaveRegistration.REQUESTED)
+
     def get_success_url(self):
         return reverse_lazy('entitlement-detail', kwargs={'year': self.object.from_date.year})
 
@@ -120,10 +244,43 @@ class UserList(PermissionRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super(UserList, self).get_context_data(**kwargs)
-        context['users'] = User.objects.all()
+        context['query'] = self.request.GET.get('q', '')
+        context['users'] = search.matching_users(context['query'])
+        context['group_calendars'] = [
+            (group, self.request.build_absolute_uri(reverse(
+                'group-leave-calendar', kwargs={'token': ical.feed_token(group.pk, ical.GROUP_FEED_SALT)})))
+            for group in Group.objects.order_by('name')
+        ]
         return context
 
 
+class UserSearch(PermissionRequiredMixin, View):
+    """Typeahead results: the first users matching the query with their balance of the year."""
+    permission_required = 'auth.view_user'
+    login_url = reverse_lazy('login')
+
+    def get(self, request, *args, **kwargs):
+        try:
+            year = int(request.GET.get('year', ''))
+        except ValueError:
+            year = timezone.localdate().year
+        results = []
+        for user in search.typeahead(request.GET.get('q', ''), year):
+            remainder_hours = None if user['leave_hours'] is None else user['leave_hours'] - user['used_leave_hours']
+            results.append({
+                'id': user['id'],
+                'title': user['username'],
+                'name': ' '.join(filter(None, (user['first_name'], user['last_name']))),
+                'email': user['email'],
+                'description': '{} uur over in {}'.format(remainder_hours, year) if remainder_hours is not None else '',
+                'leave_hours': user['leave_hours'],
+                'used_hours': user['used_leave_hours'],
+                'remainder_hours': remainder_hours,
+                'url': reverse('admin-entitlement-list', kwargs={'user_id': user['id']}),
+            })
+        return JsonResponse({'results': results})
+
+
 class UserCreate(PermissionRequiredMixin, CreateView):
     permission_required = 'auth.add_user'
     template_name = 'registration/user_create.html'
@@ -177,23 +334,26 @@ class AdminEntitlementList(PermissionRequiredMixin, ListView):
         return context
 
 
-class AdminEntitlementDetail(PermissionRequiredMixin, DetailView):
+class AdminEntitlementDetail(PermissionRequiredMixin, EntitlementVersionConditionalMixin, UserEntitlementYearMixin,
+                             DetailView):
     permission_required = ('auth.view_user', 'registration.change_entitlement')
     model = Entitlement
     template_name = 'registration/admin_entitlement_detail.html'
     login_url = reverse_lazy('login')
+    entitlement_user_kwarg = 'user_id'
 
-    def get_object(self, queryset=None):
-        return get_object_or_404(self.get_queryset(), user_id=self.kwargs['user_id'], year=self.kwargs['year'])
-
-    def get_queryset(self):
-        return super(AdminEntitlementDetail, self).get_queryset().annotate_used_leave_hours()
+    def get_version_user_ids(self):
+        return {self.request.user.pk, self.kwargs['user_id']}
 
     def get_context_data(self, **kwargs):
         context = super(AdminEntitlementDetail, self).get_context_data(**kwargs)
-        leave_registrations = LeaveRegistration.objects.filter(entitlement=self.object)
-        context['all_leave_registrations'] = leave_registrations
         context['user_id'] = self.kwargs['user_id']
+        balance_date_form = BalanceDateForm(self.request.GET or None)
+        if balance_date_form.is_valid():
+            balance_date = balance_date_form.cleaned_data['balance_date']
+            end_of_day = timezone.make_aware(datetime.datetime.combine(balance_date, datetime.time.max))
+            context['balance_at'] = ledger.balance_at(self.object.pk, end_of_day)
+        context['balance_date_form'] = balance_date_form
         return context
 
 
@@ -209,7 +369,8 @@ class AdminEntitlementCreate(PermissionRequiredMixin, CreateView):
         year = []
         for entitlement in all_entitlements:
             year.append(entitlement.year)
-        kwargs['years'] = year
+        # An archived year cannot be entered again; archive_years would fail on it.
+        kwargs['years'] = year + sorted(archive.archived_years(self.kwargs['user_id']))
         return kwargs
 
     def form_valid(self, form):
@@ -241,7 +402,25 @@ class AdminEntitlementDelete(PermissionRequiredMixin, DeleteView):
         return reverse_lazy('admin-entitlement-list', kwargs={'user_id': self.object.user_id})
 
 
-class AdminLeaveRegistrationCreate(PermissionRequiredMixin, CreateView):
+class AdminBulkEntitlement(PermissionRequiredMixin, FormView):
+    """Set or adjust the leave hours of a whole group; the first submit only previews the affected rows."""
+    permission_required = ('auth.view_user', 'registration.add_entitlement', 'registration.change_entitlement')
+    template_name = 'registration/admin_bulk_entitlement.html'
+    form_class = BulkEntitlementForm
+    login_url = reverse_lazy('login')
+
+    def get_initial(self):
+        return {'year': datetime.date.today().year, 'mode': bulk.ADJUST}
+
+    def form_valid(self, form):
+        if 'apply' not in self.request.POST:
+            return self.render_to_response(self.get_context_data(form=form, changes=form.changes))
+        bulk.apply(form.cleaned_data['group'], form.cleaned_data['year'], form.cleaned_data['mode'],
+                   form.cleaned_data['hours'])
+        return HttpResponseRedirect(reverse('admin-users-entitlement-list', kwargs={'year': form.cleaned_data['year']}))
+
+
+class AdminLeaveRegistrationCreate(PermissionRequiredMixin, LeaveRegistrationSaveMixin, CreateView):
     permission_required = ('auth.view_user', 'registration.add_leaveregistration')
     template_name = 'registration/admin_leaveregistration_create.html'
     model = LeaveRegistration
@@ -257,23 +436,22 @@ class AdminLeaveRegistrationCreate(PermissionRequiredMixin, CreateView):
         return kwargs
 
     def form_valid(self, form):
-        self.object = form.save(commit=False)
-        self.object.user = self.kwargs['user_id']
-        self.object.entitlement = Entitlement.objects.get(user=self.object.user, year=self.object.from_date.year)
-        self.object.save()
-        return HttpResponseRedirect(self.get_success_url())
+        return self.save_leave_registration(form, self.kwargs['user_id'], LeaveRegistration.APPROVED)
 
     def get_success_url(self):
         return reverse_lazy('admin-entitlement-detail',
                             kwargs={'user_id': self.object.entitlement.user_id, 'year': self.object.from_date.year})
 
 
-class AdminLeaveRegistrationUpdate(PermissionRequiredMixin, UpdateView):
+class AdminLeaveRegistrationUpdate(PermissionRequiredMixin, LeaveRegistrationSaveMixin, UpdateView):
     permission_required = ('auth.view_user', 'registration.change_leaveregistration')
     template_name = 'registration/admin_leaveregistration_update.html'
     model = LeaveRegistration
     form_class = LeaveRegistrationForm
 
+    def form_valid(self, form):
+        return self.save_leave_registration(form, self.object.entitlement.user_id, self.object.status)
+
     def get_form_kwargs(self, *args, **kwargs):
         kwargs = super(AdminLeaveRegistrationUpdate, self).get_form_kwargs()
         all_entitlements = Entitlement.objects.filter(user_id=self.object.entitlement.user_id)
@@ -305,11 +483,17 @@ class AdminUsersEntitlementList(PermissionRequiredMixin, ListView):
     login_url = reverse_lazy('login')
 
     def get_queryset(self):
-        return super(AdminUsersEntitlementList, self).get_queryset() \
+        # Read before the rows, so the live updates replay anything that changes while rendering.
+        self.last_event_id = changes.latest_event_id()
+        queryset = super(AdminUsersEntitlementList, self).get_queryset() \
             .select_related('user') \
-            .filter(year=self.kwargs['year']) \
-            .annotate_used_leave_hours() \
-            .order_by("-used_leave_hours")
+            .filter(year=self.kwargs['year'])
+        if self.request.GET.get('q'):
+            queryset = queryset.filter(user__in=search.matching_users(self.request.GET['q']))
+        if self.kwargs['year'] in balances.active_years():
+            entitlements = balances.attach_used_hours(list(queryset))
+            return sorted(entitlements, key=lambda entitlement: entitlement.used_leave_hours, reverse=True)
+        return queryset.annotate_used_leave_hours().annotate_leave_type_hours().order_by("-used_leave_hours")
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super(AdminUsersEntitlementList, self).get_context_data()
@@ -319,9 +503,293 @@ class AdminUsersEntitlementList(PermissionRequiredMixin, ListView):
         leave_hours = Entitlement.objects.values_list('leave_hours', flat=True)
         total_leave_hours = sum(leave_hours)
         context['total_leave_hours'] = total_leave_hours
-        amount_of_hours = LeaveRegistration.objects.values_list('amount_of_hours', flat=True)
+        amount_of_hours = LeaveRegistration.objects.counted().values_list('amount_of_hours', flat=True)
         total_amount_of_hours = sum(amount_of_hours)
         context['total_amount_of_hours'] = total_amount_of_hours
         not_used_leave_hours = total_leave_hours - total_amount_of_hours
         context['not_used_leave_hours'] = not_used_leave_hours
+        context['last_event_id'] = self.last_event_id
+        return context
+
+
+class AdminEntitlementChanges(PermissionRequiredMixin, View):
+    """Server-sent events with the rows of the balance overview that changed since the last event."""
+    permission_required = ('auth.view_user', 'registration.view_entitlement')
+    login_url = reverse_lazy('login')
+    # None: BALANCE_CHANGES_TIMEOUT and BALANCE_CHANGES_POLL_INTERVAL from the settings
+    timeout = None
+    poll_interval = None
+
+    def get(self, request, *args, **kwargs):
+        try:
+            after = int(request.META.get('HTTP_LAST_EVENT_ID') or request.GET['after'])
+        except (KeyError, ValueError):
+            after = changes.latest_event_id()
+        timeout = settings.BALANCE_CHANGES_TIMEOUT if self.timeout is None else self.timeout
+        poll_interval = settings.BALANCE_CHANGES_POLL_INTERVAL if self.poll_interval is None else self.poll_interval
+        response = StreamingHttpResponse(changes.stream(self.kwargs['year'], after, timeout, poll_interval),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class AdminYearForecast(PermissionRequiredMixin, TemplateView):
+    permission_required = ('auth.view_user', 'registration.view_entitlement')
+    template_name = 'registration/admin_year_forecast.html'
+    login_url = reverse_lazy('login')
+
+    def get_context_data(self, **kwargs):
+        context = super(AdminYearForecast, self).get_context_data(**kwargs)
+        context['forecast'] = get_year_forecast(self.kwargs['year'])
+        return context
+
+
+class AdminCapacityHeatmap(PermissionRequiredMixin, View):
+    """The number and percentage of absent group members for every day of the year, as arrays from 1 January."""
+    permission_required = ('auth.view_user', 'registration.view_entitlement')
+    login_url = reverse_lazy('login')
+
+    def get(self, request, group_id, year):
+        group = get_object_or_404(Group, pk=group_id)
+        heatmap = capacity.get_heatmap(group.pk, year)
+        absent = heatmap.absent.tolist()
+        return JsonResponse({
+            'group': group.name,
+            'year': year,
+            'start': datetime.date(year, 1, 1).isoformat(),
+            'members': heatmap.members,
+            'absent': absent,
+            'percentage': [round(100 * count / heatmap.members) if heatmap.members else 0 for count in absent],
+        })
+
+
+class BalanceSeriesView(PermissionRequiredMixin, View):
+    """Remaining leave hours after every leave date of the year, as date and hour arrays per user."""
+    permission_required = 'registration.view_entitlement'
+    login_url = reverse_lazy('login')
+    # 'user' for the series of one user, 'group' for those of every member of a group.
+    scope = 'user'
+    # The URL keyword argument with the id of the user or group; None for the logged-in user.
+    owner_kwarg = None
+
+    def get_owner_id(self):
+        if self.owner_kwarg is None:
+            return self.request.user.pk
+        return self.kwargs[self.owner_kwarg]
+
+    def get_entitlements(self):
+        return Entitlement.objects.filter(user_id=self.get_owner_id())
+
+    def get_scope(self):
+        return '{}:{}:{}'.format(self.scope, self.get_owner_id(), self.kwargs['year'])
+
+    def get(self, request, *args, **kwargs):
+        entitlements = self.get_entitlements().filter(year=self.kwargs['year'])
+        return JsonResponse({
+            'year': self.kwargs['year'],
+            'series': [{
+                'user': balance_series.user_id,
+                'username': balance_series.username,
+                'leave_hours': balance_series.leave_hours,
+                'dates': [date.isoformat() for date in balance_series.dates],
+                'remainder_hours': balance_series.remainder_hours,
+            } for balance_series in series.get_balance_series(entitlements, self.get_scope())],
+        })
+
+
+class EntitlementBalanceSeries(BalanceSeriesView):
+    pass
+
+
+class AdminEntitlementBalanceSeries(BalanceSeriesView):
+    permission_required = ('auth.view_user', 'registration.view_entitlement')
+    owner_kwarg = 'user_id'
+
+
+class AdminGroupBalanceSeries(BalanceSeriesView):
+    permission_required = ('auth.view_user', 'registration.view_entitlement')
+    scope = 'group'
+    owner_kwarg = 'group_id'
+
+    def get_entitlements(self):
+        return Entitlement.objects.filter(user__groups=get_object_or_404(Group, pk=self.get_owner_id()))
+
+
+class LeaveCalendar(View):
+    model = None
+    salt = None
+    cache_timeout = 60 * 60 * 24
+    # The Entitlement lookup that selects the entitlements of the feed's owner.
+    owner_lookup = 'user'
+
+    def get_entitlements(self, owner):
+        return Entitlement.objects.filter(**{self.owner_lookup: owner})
+
+    def get_calendar_name(self, owner):
+        return 'Verlof {}'.format(owner)
+
+    def get(self, request, token):
+        try:
+            pk = ical.feed_pk(token, self.salt)
+        except signing.BadSignature:
+            raise Http404
+        owner = get_object_or_404(self.model, pk=pk)
+        entitlements = self.get_entitlements(owner)
+        change_stamp = entitlements.change_stamp()
+        etag = '"{}"'.format(entitlements.data_version(change_stamp))
+        last_modified = change_stamp['last_update'] and int(change_stamp['last_update'].timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            cache_key = 'ical:{}:{}:{}'.format(self.salt, owner.pk, etag)
+            content = cache.get(cache_key)
+            if content is None:
+                registrations = LeaveRegistration.objects.counted().filter(entitlement__in=entitlements) \
+                    .order_by('from_date') \
+                    .values_list('id', 'from_date', 'end_date', 'amount_of_hours', 'entitlement__user__username',
+                                 'entitlement__user__first_name', 'entitlement__user__last_name')
+                lines = ical.calendar_lines(self.get_calendar_name(owner), registrations.iterator())
+                response = StreamingHttpResponse(self.stream(cache_key, lines), content_type='text/calendar')
+            else:
+                response = HttpResponse(content, content_type='text/calendar')
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def stream(self, cache_key, lines):
+        content = []
+        for line in lines:
+            content.append(line)
+            yield line
+        cache.set(cache_key, ''.join(content), self.cache_timeout)
+
+
+class UserLeaveCalendar(LeaveCalendar):
+    model = User
+    salt = ical.USER_FEED_SALT
+
+    def get_calendar_name(self, owner):
+        return 'Verlof {}'.format(owner.get_full_name() or owner.username)
+
+
+class GroupLeaveCalendar(LeaveCalendar):
+    model = Group
+    salt = ical.GROUP_FEED_SALT
+    owner_lookup = 'user__groups'
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class EntitlementSync(View):
+    """Create or update entitlements from a JSON list of {username, year, leave_hours} records.
+
+    The HR system calls this without a session, so it only accepts HTTP Basic credentials of a user allowed to
+    add and change entitlements.
+    """
+    permissions = ('registration.add_entitlement', 'registration.change_entitlement')
+
+    def get_user(self, request):
+        method, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if method.lower() != 'basic':
+            return None
+        try:
+            username, _, password = base64.b64decode(credentials).decode().partition(':')
+        except ValueError:
+            return None
+        return authenticate(request, username=username, password=password)
+
+    def post(self, request, *args, **kwargs):
+        user = self.get_user(request)
+        if user is None:
+            response = HttpResponse(status=401)
+            response['WWW-Authenticate'] = 'Basic realm="absence"'
+            return response
+        if not user.has_perms(self.permissions):
+            return HttpResponseForbidden()
+        try:
+            records = sync.parse(json.loads(request.body.decode()))
+            upsert = sync.upsert_entitlements(records)
+        except (TypeError, ValueError) as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        return JsonResponse(upsert._asdict())
+
+
+class AdminYearExport(PermissionRequiredMixin, View):
+    permission_required = ('auth.view_user', 'registration.view_entitlement')
+    login_url = reverse_lazy('login')
+
+    def post(self, request, year):
+        job = tasks.export_year_entitlements.delay(created_by=request.user, year=year)
+        return HttpResponseRedirect(reverse('job-detail', kwargs={'pk': job.pk}))
+
+
+class JobDetail(LoginRequiredMixin, DetailView):
+    model = Job
+    login_url = reverse_lazy('login')
+
+    def get_queryset(self):
+        queryset = super(JobDetail, self).get_queryset()
+        if self.request.user.has_perm('auth.view_user'):
+            return queryset
+        return queryset.filter(created_by=self.request.user)
+
+    def render_to_response(self, context, **response_kwargs):
+        job = self.object
+        return JsonResponse({
+            'id': job.pk,
+            'task': job.task,
+            'status': job.status,
+            'attempts': job.attempts,
+            'created_at': job.created_at,
+            'finished_at': job.finished_at,
+            'result_url': reverse('job-result', kwargs={'pk': job.pk}) if job.status == Job.DONE else None,
+        })
+
+
+class JobResult(JobDetail):
+    def render_to_response(self, context, **response_kwargs):
+        if self.object.status != Job.DONE:
+            raise Http404
+        result_type = jobs.result_type(self.object.task)
+        response = HttpResponse(self.object.result, content_type=result_type.content_type)
+        response['Content-Disposition'] = 'attachment; filename="job-{}.{}"'.format(self.object.pk,
+                                                                                   result_type.extension)
+        return response
+
+
+class LeaveRegistrationApprovalList(PermissionRequiredMixin, ListView):
+    permission_required = ('auth.view_user', 'registration.change_leaveregistration')
+    template_name = 'registration/leaveregistration_approval_list.html'
+    model = LeaveRegistration
+    login_url = reverse_lazy('login')
+    decisions = {'approve': LeaveRegistration.APPROVED, 'reject': LeaveRegistration.REJECTED}
+
+    def get_queryset(self):
+        queryset = super(LeaveRegistrationApprovalList, self).get_queryset() \
+            .filter(status=LeaveRegistration.REQUESTED) \
+            .select_related('entitlement__user') \
+            .order_by('from_date')
+        group_form = ApprovalGroupForm(self.request.GET)
+        # An unknown group selects nothing, so deciding "all" never falls back to every group.
+        if not group_form.is_valid():
+            return queryset.none()
+        if group_form.cleaned_data['group']:
+            queryset = queryset.filter(entitlement__user__groups=group_form.cleaned_data['group'])
+        return queryset
+
+    def get_context_data(self, *, object_list=None, **kwargs):
+        context = super(LeaveRegistrationApprovalList, self).get_context_data(**kwargs)
+        context['groups'] = Group.objects.order_by('name')
+        context['selected_group'] = self.request.GET.get('group', '')
         return context
+
+    def post(self, request, *args, **kwargs):
+        status = self.decisions.get(request.POST.get('decision'))
+        leave_registrations = self.get_queryset()
+        if 'all' not in request.POST:
+            # Ids that are not numbers select nothing instead of failing the query.
+            leave_registrations = leave_registrations.filter(
+                pk__in=[pk for pk in request.POST.getlist('leave_registration') if pk.isdigit()])
+        if status:
+            approval.decide(leave_registrations, status)
+        return HttpResponseRedirect(request.get_full_path())